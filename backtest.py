@@ -1,11 +1,14 @@
+import heapq
+import sys
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
 import sqlite3
 import json
 import logging
-from strategies_v2 import analyze_market
-from risk_manager import RiskManager
+import performance
+from risk_manager import RiskManager, HistoricalMarketContext
+from price_store import PriceStore, to_epoch_ms
 from ta.trend import SMAIndicator, EMAIndicator
 from ta.momentum import RSIIndicator
 from ta.volatility import BollingerBands
@@ -15,25 +18,38 @@ logging.basicConfig(level=logging.INFO,
                    format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Strategy parameters (indicator windows and signal thresholds) tunable by optimizer.py
+DEFAULT_PARAMS = {
+    'sma_fast': 20,
+    'sma_slow': 50,
+    'ema_fast': 12,
+    'ema_slow': 26,
+    'rsi_period': 14,
+    'rsi_oversold': 30,
+    'rsi_overbought': 70,
+    'bb_period': 20,
+    'bb_dev': 2,
+    'bb_squeeze': 0.03,       # Band width / price below which the market counts as squeezed
+    'band_proximity': 0.02    # How close to a band the price must be (fraction of the band)
+}
+
 class Backtester:
-    def __init__(self, start_date, end_date, initial_balance=10000):
+    def __init__(self, start_date, end_date, initial_balance=10000, params=None, interval='1', store=None,
+                 symbol='BTCUSDT'):
+        self.params = {**DEFAULT_PARAMS, **(params or {})}
+        self.symbol = symbol
+        self.interval = interval
+        self.store = store or PriceStore()
         self.start_date = start_date
         self.end_date = end_date
         self.initial_balance = initial_balance
         self.current_balance = initial_balance
         self.trades = []
         self.positions = []
-        self.risk_manager = RiskManager()
-        self.metrics = {
-            'total_trades': 0,
-            'winning_trades': 0,
-            'losing_trades': 0,
-            'total_profit': 0,
-            'total_loss': 0,
-            'max_drawdown': 0,
-            'best_trade': 0,
-            'worst_trade': 0
-        }
+        # Risk inputs come from the backtest's own bars, never from live market data
+        self.market_context = HistoricalMarketContext()
+        self.risk_manager = RiskManager(market_context=self.market_context)
+        self.metrics = performance.summarize([], [])
         
         # Load config
         with open('config.json', 'r') as f:
@@ -41,26 +57,43 @@ class Backtester:
     
     def prepare_data(self):
         """Load and prepare historical data with technical indicators"""
+        return self.add_indicators(self.load_prices())
+    
+    def load_prices(self, symbol=None):
+        """Load raw OHLCV bars for the backtest period from the price store"""
+        symbol = symbol or self.symbol
+        df = self.store.read_frame(symbol, self.interval, to_epoch_ms(self.start_date), to_epoch_ms(self.end_date))
+        if not df.empty:
+            return df
+        
+        # Fall back to a legacy historical_prices table if one exists
         conn = sqlite3.connect('trades.db')
-        query = f"""
-        SELECT timestamp, open, high, low, close, volume 
-        FROM historical_prices 
-        WHERE symbol = 'BTCUSDT' 
-        AND timestamp BETWEEN '{self.start_date}' AND '{self.end_date}'
-        ORDER BY timestamp ASC
-        """
-        df = pd.read_sql_query(query, conn)
-        conn.close()
-
-        # Add technical indicators
-        df['sma_20'] = SMAIndicator(df['close'], window=20).sma_indicator()
-        df['sma_50'] = SMAIndicator(df['close'], window=50).sma_indicator()
-        df['ema_12'] = EMAIndicator(df['close'], window=12).ema_indicator()
-        df['ema_26'] = EMAIndicator(df['close'], window=26).ema_indicator()
-        df['rsi'] = RSIIndicator(df['close']).rsi()
+        try:
+            query = """
+            SELECT timestamp, open, high, low, close, volume 
+            FROM historical_prices 
+            WHERE symbol = ? 
+            AND timestamp BETWEEN ? AND ?
+            ORDER BY timestamp ASC
+            """
+            return pd.read_sql_query(query, conn, params=(symbol, self.start_date, self.end_date))
+        except Exception as e:
+            logger.warning(f"No stored prices for {symbol}: {e}")
+            return df
+        finally:
+            conn.close()
+    
+    def add_indicators(self, df):
+        """Add the technical indicators used by the signal rules"""
+        p = self.params
+        df['sma_fast'] = SMAIndicator(df['close'], window=p['sma_fast']).sma_indicator()
+        df['sma_slow'] = SMAIndicator(df['close'], window=p['sma_slow']).sma_indicator()
+        df['ema_fast'] = EMAIndicator(df['close'], window=p['ema_fast']).ema_indicator()
+        df['ema_slow'] = EMAIndicator(df['close'], window=p['ema_slow']).ema_indicator()
+        df['rsi'] = RSIIndicator(df['close'], window=p['rsi_period']).rsi()
         
         # Add Bollinger Bands
-        bb = BollingerBands(df['close'])
+        bb = BollingerBands(df['close'], window=p['bb_period'], window_dev=p['bb_dev'])
         df['bb_upper'] = bb.bollinger_hband()
         df['bb_lower'] = bb.bollinger_lband()
         
@@ -69,80 +102,127 @@ class Backtester:
         
         return df
     
-    def run_backtest(self):
-        """Execute backtest with enhanced strategy"""
+    def run_backtest(self, prices=None):
+        """Execute backtest with enhanced strategy (on `prices` bars if given, else the stored history)"""
         logger.info("Starting backtest...")
         
-        data = self.prepare_data()
+        data = self.prepare_data() if prices is None else self.add_indicators(prices.copy())
         if data.empty:
             logger.error("No historical data available")
             return
         
-        balance_history = []
-        max_balance = self.initial_balance
+        self.market_context.add_symbol(self.symbol, data['high'], data['low'], data['close'],
+                                       data['volume'], self.bars_per_day(data))
         
-        for i in range(len(data)):
-            current_data = data.iloc[i]
-            
-            # Update max balance and calculate drawdown
-            if self.current_balance > max_balance:
-                max_balance = self.current_balance
-            current_drawdown = (max_balance - self.current_balance) / max_balance * 100
-            if current_drawdown > self.metrics['max_drawdown']:
-                self.metrics['max_drawdown'] = current_drawdown
-            
-            # Check existing positions
-            self.check_positions(current_data)
-            
-            # Only look for new trades if we have no open positions
-            if not self.positions:
-                signal = self.analyze_trade_opportunity(current_data)
-                
-                if signal:
-                    self.open_position(signal, current_data)
-            
-            balance_history.append({
-                'timestamp': current_data['timestamp'],
-                'balance': self.current_balance
-            })
+        close = data['close'].to_numpy(dtype=np.float64)
+        timestamps = data['timestamp'].to_numpy()
+        buy, sell = self.generate_signals(data)
+        entries = np.flatnonzero(buy | sell)
         
-        return pd.DataFrame(balance_history)
-    
-    def analyze_trade_opportunity(self, data):
-        """Enhanced trade analysis with multiple confirmations"""
-        price = data['close']
+        # Realized PnL booked on each exit bar (the first element also carries the initial balance)
+        realized = np.zeros(len(data))
+        realized[0] = self.initial_balance
         
-        # Trend Analysis
-        trend_up = data['sma_20'] > data['sma_50'] and data['ema_12'] > data['ema_26']
-        trend_down = data['sma_20'] < data['sma_50'] and data['ema_12'] < data['ema_26']
+        # Only one position is open at a time: jump from each entry straight to its exit,
+        # then to the next signal at or after the exit bar
+        next_bar = 0
+        while True:
+            pos = np.searchsorted(entries, next_bar)
+            if pos == len(entries):
+                break
+            i = entries[pos]
+            signal = {'side': 'Buy' if buy[i] else 'Sell', 'confidence': 0.8}
+            self.market_context.seek(self.symbol, i)
+            self.open_position(signal, data.iloc[i])
+            position = self.positions[-1]
+            
+            exit_bar, reason = self.find_exit(position, close, i + 1)
+            if exit_bar is None:
+                break  # Still open at the end of the data
+            self.close_position(position, close[exit_bar], timestamps[exit_bar], reason)
+            self.positions.remove(position)
+            realized[exit_bar] += self.trades[-1]['pnl']
+            next_bar = exit_bar
         
-        # RSI Conditions
-        rsi = data['rsi']
-        rsi_oversold = rsi < 30
-        rsi_overbought = rsi > 70
+        balance = np.cumsum(realized)
+        self.update_metrics(timestamps, balance)
         
-        # Bollinger Band Analysis
-        bb_squeeze = (data['bb_upper'] - data['bb_lower']) / data['close'] < 0.03
-        price_near_lower = price <= data['bb_lower'] * 1.02
-        price_near_upper = price >= data['bb_upper'] * 0.98
+        return pd.DataFrame({'timestamp': timestamps, 'balance': balance})
+    
+    @staticmethod
+    def bars_per_day(data):
+        """Number of bars in 24 hours, from the typical spacing of the timestamps"""
+        timestamps = pd.to_datetime(data['timestamp'])
+        if len(timestamps) < 2:
+            return 1
+        step = timestamps.diff().median()
+        return max(1, round(pd.Timedelta(days=1) / step)) if step > pd.Timedelta(0) else 1
+    
+    def generate_signals(self, data):
+        """Entry signals for every bar as (buy, sell) boolean arrays"""
+        p = self.params
+        price = data['close'].to_numpy(dtype=np.float64)
+        sma_fast = data['sma_fast'].to_numpy(dtype=np.float64)
+        sma_slow = data['sma_slow'].to_numpy(dtype=np.float64)
+        ema_fast = data['ema_fast'].to_numpy(dtype=np.float64)
+        ema_slow = data['ema_slow'].to_numpy(dtype=np.float64)
+        rsi = data['rsi'].to_numpy(dtype=np.float64)
+        bb_upper = data['bb_upper'].to_numpy(dtype=np.float64)
+        bb_lower = data['bb_lower'].to_numpy(dtype=np.float64)
         
-        # Enhanced Signal Generation
-        if trend_up and rsi_oversold and price_near_lower and not bb_squeeze:
-            return {'side': 'Buy', 'confidence': 0.8}
-        elif trend_down and rsi_overbought and price_near_upper and not bb_squeeze:
-            return {'side': 'Sell', 'confidence': 0.8}
+        # Comparisons against NaN warm-up values are False, as in the row-by-row rules
+        with np.errstate(invalid='ignore'):
+            # Trend Analysis
+            trend_up = (sma_fast > sma_slow) & (ema_fast > ema_slow)
+            trend_down = (sma_fast < sma_slow) & (ema_fast < ema_slow)
+            
+            # RSI Conditions
+            rsi_oversold = rsi < p['rsi_oversold']
+            rsi_overbought = rsi > p['rsi_overbought']
+            
+            # Bollinger Band Analysis
+            bb_squeeze = (bb_upper - bb_lower) / price < p['bb_squeeze']
+            price_near_lower = price <= bb_lower * (1 + p['band_proximity'])
+            price_near_upper = price >= bb_upper * (1 - p['band_proximity'])
         
-        return None
+        buy = trend_up & rsi_oversold & price_near_lower & ~bb_squeeze
+        sell = trend_down & rsi_overbought & price_near_upper & ~bb_squeeze & ~buy
+        return buy, sell
     
-    def open_position(self, signal, data):
+    def find_exit(self, position, close, start):
+        """
+        First bar at or after `start` whose close hits the stop loss or take profit.
+        Returns (index, reason) or (None, None); the stop loss wins when both hit.
+        """
+        stop_loss = position['stop_loss']
+        take_profit = position['take_profit']
+        chunk = 1024  # Search in growing windows so short trades don't scan the whole series
+        while start < len(close):
+            window = close[start:start + chunk]
+            if position['side'] == 'Buy':
+                sl_hit = window <= stop_loss
+                tp_hit = window >= take_profit
+            else:
+                sl_hit = window >= stop_loss
+                tp_hit = window <= take_profit
+            hits = np.flatnonzero(sl_hit | tp_hit)
+            if len(hits):
+                offset = hits[0]
+                return start + offset, 'Stop Loss' if sl_hit[offset] else 'Take Profit'
+            start += chunk
+            chunk *= 2
+        return None, None
+    
+    def open_position(self, signal, data, symbol=None):
         """Open a new position with dynamic risk management"""
+        symbol = symbol or self.symbol
         price = data['close']
         volatility = data['volatility']
         
         # Calculate position size based on current volatility and balance
-        risk_pct = self.risk_manager.calculate_risk_percentage('BTCUSDT')
+        risk_pct = self.risk_manager.calculate_risk_percentage(symbol)
         position_size = self.risk_manager.calculate_position_size(
-            'BTCUSDT',
+            symbol,
             self.current_balance,
             price,
             volatility,
@@ -151,19 +231,20 @@ class Backtester:
         
         # Calculate stop loss and take profit levels
         stop_loss = self.risk_manager.calculate_dynamic_stop_loss(
-            'BTCUSDT',
+            symbol,
             signal['side'],
             price
         )
         
         take_profit = self.risk_manager.calculate_take_profit(
-            'BTCUSDT',
+            symbol,
             signal['side'],
             price,
             stop_loss
         )
         
         position = {
+            'symbol': symbol,
             'side': signal['side'],
             'entry_price': price,
             'size': position_size,
@@ -173,32 +254,7 @@ class Backtester:
         }
         
         self.positions.append(position)
-        logger.info(f"Opened {signal['side']} position: Size={position_size:.4f}, Price=${price:.2f}")
-    
-    def check_positions(self, data):
-        """Check and update existing positions"""
-        current_price = data['close']
-        
-        for position in self.positions[:]:
-            # Calculate current PnL
-            if position['side'] == 'Buy':
-                pnl = (current_price - position['entry_price']) * position['size']
-            else:
-                pnl = (position['entry_price'] - current_price) * position['size']
-            
-            # Check stop loss
-            if ((position['side'] == 'Buy' and current_price <= position['stop_loss']) or
-                (position['side'] == 'Sell' and current_price >= position['stop_loss'])):
-                self.close_position(position, current_price, data['timestamp'], 'Stop Loss')
-                self.positions.remove(position)
-                continue
-            
-            # Check take profit
-            if ((position['side'] == 'Buy' and current_price >= position['take_profit']) or
-                (position['side'] == 'Sell' and current_price <= position['take_profit'])):
-                self.close_position(position, current_price, data['timestamp'], 'Take Profit')
-                self.positions.remove(position)
-                continue
+        logger.info(f"Opened {signal['side']} {symbol} position: Size={position_size:.4f}, Price=${price:.2f}")
     
     def close_position(self, position, current_price, timestamp, reason):
         """Close position and update metrics"""
@@ -206,6 +262,7 @@ class Backtester:
         self.current_balance += pnl
         
         trade_record = {
+            'symbol': position['symbol'],
             'entry_time': position['entry_time'],
             'exit_time': timestamp,
             'side': position['side'],
@@ -218,9 +275,8 @@ class Backtester:
         }
         
         self.trades.append(trade_record)
-        self.update_metrics(trade_record)
         
-        logger.info(f"Closed {position['side']} position: PnL=${pnl:.2f} ({reason})")
+        logger.info(f"Closed {position['side']} {position['symbol']} position: PnL=${pnl:.2f} ({reason})")
     
     def calculate_pnl(self, position, current_price):
         """Calculate position PnL"""
@@ -229,24 +285,25 @@ class Backtester:
         else:
             return position['size'] * (position['entry_price'] - current_price)
     
-    def update_metrics(self, trade):
-        """Update performance metrics"""
-        self.metrics['total_trades'] += 1
-        
-        if trade['pnl'] > 0:
-            self.metrics['winning_trades'] += 1
-            self.metrics['total_profit'] += trade['pnl']
-            self.metrics['best_trade'] = max(self.metrics['best_trade'], trade['pnl'])
-        else:
-            self.metrics['losing_trades'] += 1
-            self.metrics['total_loss'] += abs(trade['pnl'])
-            self.metrics['worst_trade'] = min(self.metrics['worst_trade'], trade['pnl'])
+    def update_metrics(self, times, equity, start=None, end=None):
+        """Recompute the performance metrics from the equity curve and the closed trades"""
+        self.metrics = performance.summarize(times, equity, self.trades, start, end)
+    
+    def summary(self):
+        """Headline results as a flat dict (used to rank optimizer runs)"""
+        return {
+            'total_return': (self.current_balance - self.initial_balance) / self.initial_balance * 100,
+            'final_balance': self.current_balance,
+            'total_trades': self.metrics['total_trades'],
+            'win_rate': self.metrics['win_rate'],
+            'profit_factor': self.metrics['profit_factor'],
+            'max_drawdown': self.metrics['max_drawdown'],
+            'sharpe_ratio': self.metrics['sharpe_ratio'],
+            'sortino_ratio': self.metrics['sortino_ratio']
+        }
     
     def generate_report(self):
         """Generate comprehensive backtest report"""
-        win_rate = (self.metrics['winning_trades'] / self.metrics['total_trades'] * 100) if self.metrics['total_trades'] > 0 else 0
-        profit_factor = abs(self.metrics['total_profit'] / self.metrics['total_loss']) if self.metrics['total_loss'] != 0 else float('inf')
-        
         report = f"""
         Backtest Report ({self.start_date} to {self.end_date})
         ================================================
@@ -259,28 +316,155 @@ class Backtester:
         Total Trades: {self.metrics['total_trades']}
         Winning Trades: {self.metrics['winning_trades']}
         Losing Trades: {self.metrics['losing_trades']}
-        Win Rate: {win_rate:.2f}%
+        Win Rate: {self.metrics['win_rate']:.2f}%
+        Exposure: {self.metrics['exposure']:.2f}%
+        Average Hold: {self.metrics['avg_hold_hours']:.2f}h
         
         Profitability:
         -------------
         Total Profit: ${self.metrics['total_profit']:.2f}
         Total Loss: ${self.metrics['total_loss']:.2f}
-        Profit Factor: {profit_factor:.2f}
+        Profit Factor: {self.metrics['profit_factor']:.2f}
+        Expectancy: ${self.metrics['expectancy']:.2f}
         Best Trade: ${self.metrics['best_trade']:.2f}
         Worst Trade: ${self.metrics['worst_trade']:.2f}
+        
+        Risk:
+        ----
         Max Drawdown: {self.metrics['max_drawdown']:.2f}%
+        CAGR: {self.metrics['cagr']:.2f}%
+        Sharpe Ratio: {self.metrics['sharpe_ratio']:.2f}
+        Sortino Ratio: {self.metrics['sortino_ratio']:.2f}
         """
         
         return report
 
+class PortfolioBacktester(Backtester):
+    """
+    Backtest many symbols on one merged, time-ordered event stream with a
+    shared balance and the live position cap (one position per symbol).
+    Only close, time and entry-bar data are kept per symbol, so memory grows
+    by about 16 bytes per bar per symbol.
+    """
+    
+    EXIT, ENTRY = 0, 1  # Exits at a timestamp are processed before entries
+    
+    def __init__(self, symbols, start_date, end_date, initial_balance=10000, params=None, interval='1',
+                 store=None, max_positions=None):
+        super().__init__(start_date, end_date, initial_balance, params, interval, store, symbol=None)
+        self.symbols = list(symbols) if symbols else self.store.symbols(interval)
+        self.max_positions = max_positions or self.risk_manager.config['max_positions']
+    
+    def load_stream(self, symbol):
+        """Signals plus the arrays the event loop needs for one symbol (the indicator frame is dropped)"""
+        data = self.load_prices(symbol)
+        self.store.release(symbol)  # The frame holds a copy; don't keep every symbol's files mapped
+        if data.empty:
+            return None
+        data = self.add_indicators(data)
+        buy, sell = self.generate_signals(data)
+        entries = np.flatnonzero(buy | sell)
+        self.market_context.add_symbol(symbol, data['high'], data['low'], data['close'],
+                                       data['volume'], self.bars_per_day(data), keep=entries)
+        return {
+            'close': data['close'].to_numpy(dtype=np.float64, copy=True),  # Don't pin the whole frame
+            'time': pd.to_datetime(data['timestamp']).to_numpy().astype('datetime64[ms]').astype(np.int64),
+            'entries': entries,
+            'buy': buy[entries],
+            'volatility': data['volatility'].to_numpy(dtype=np.float64)[entries]
+        }
+    
+    def run_backtest(self):
+        """Replay every symbol's entries and exits in time order"""
+        logger.info(f"Starting portfolio backtest over {len(self.symbols)} symbols...")
+        
+        streams = {}
+        for symbol in self.symbols:
+            stream = self.load_stream(symbol)
+            if stream is not None:
+                streams[symbol] = stream
+        if not streams:
+            logger.error("No historical data available")
+            return
+        
+        # Every symbol has exactly one pending event (next entry or its exit), so heap
+        # ordering never needs to compare beyond (time, kind, symbol order)
+        order = {symbol: k for k, symbol in enumerate(streams)}
+        events = []
+        
+        def schedule_entry(symbol, from_bar):
+            stream = streams[symbol]
+            slot = np.searchsorted(stream['entries'], from_bar)
+            if slot < len(stream['entries']):
+                bar = stream['entries'][slot]
+                heapq.heappush(events, (stream['time'][bar], self.ENTRY, order[symbol], symbol, bar, slot))
+        
+        for symbol in streams:
+            schedule_entry(symbol, 0)
+        
+        open_positions = {}
+        balance_history = []
+        while events:
+            time_ms, kind, _, symbol, bar, detail = heapq.heappop(events)
+            stream = streams[symbol]
+            timestamp = pd.Timestamp(time_ms, unit='ms')
+            
+            if kind == self.EXIT:
+                position = open_positions.pop(symbol)
+                self.close_position(position, stream['close'][bar], timestamp, detail)
+                self.positions.remove(position)
+                balance_history.append({'timestamp': timestamp, 'balance': self.current_balance})
+                schedule_entry(symbol, bar)  # The exit bar may open the next trade
+                continue
+            
+            if len(self.positions) >= self.max_positions:
+                schedule_entry(symbol, bar + 1)  # Cap reached: wait for this symbol's next signal
+                continue
+            
+            signal = {'side': 'Buy' if stream['buy'][detail] else 'Sell', 'confidence': 0.8}
+            self.market_context.seek(symbol, bar)
+            self.open_position(signal, {'close': stream['close'][bar],
+                                        'volatility': stream['volatility'][detail],
+                                        'timestamp': timestamp}, symbol)
+            position = self.positions[-1]
+            open_positions[symbol] = position
+            
+            exit_bar, reason = self.find_exit(position, stream['close'], bar + 1)
+            if exit_bar is not None:
+                heapq.heappush(events, (stream['time'][exit_bar], self.EXIT, order[symbol], symbol, exit_bar, reason))
+        
+        # Equity is the realized balance after every exit, from the first bar to the last
+        start = min(stream['time'][0] for stream in streams.values())
+        end = max(stream['time'][-1] for stream in streams.values())
+        history = pd.DataFrame(balance_history, columns=['timestamp', 'balance'])
+        self.update_metrics(np.r_[start, performance.to_ms(history['timestamp'])],
+                            np.r_[self.initial_balance, history['balance'].to_numpy()], start, end)
+        
+        return history
+    
+    def symbol_report(self):
+        """Per-symbol trade statistics as a DataFrame"""
+        return performance.symbol_breakdown([t['symbol'] for t in self.trades], [t['pnl'] for t in self.trades])
+    
+    def generate_report(self):
+        """Aggregate report followed by the per-symbol breakdown"""
+        return super().generate_report() + "\n        Per-Symbol Results:\n        -------------------\n" + \
+            self.symbol_report().to_string(index=False, float_format=lambda v: f"{v:.2f}")
+
 def main():
     # Set up backtest parameters
     start_date = '2025-01-01'
     end_date = '2025-05-22'
     initial_balance = 10000
     
+    # "python backtest.py SYM1 SYM2 ..." (or "all") runs a portfolio backtest
+    symbols = sys.argv[1:]
+    
     # Initialize and run backtest
-    backtester = Backtester(start_date, end_date, initial_balance)
+    if symbols:
+        backtester = PortfolioBacktester([] if symbols == ['all'] else symbols, start_date, end_date, initial_balance)
+    else:
+        backtester = Backtester(start_date, end_date, initial_balance)
     balance_history = backtester.run_backtest()
     
     # Generate and save report
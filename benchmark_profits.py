@@ -0,0 +1,99 @@
+"""
+Profit Metrics Benchmark
+Builds a synthetic trades database and times database.get_profit_metrics()
+against the previous full-scan implementation.
+
+Usage: python benchmark_profits.py [trade_count]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+import database
+
+DAY_MS = 24 * database.HOUR_MS
+
+
+def build_synthetic_db(trade_count: int, days: int = 365):
+    """Fill the current database with closed trades spread over the last `days` days"""
+    conn = database.get_connection()
+    now = database.now_ms()
+    rng = random.Random(42)
+    rows = ((f"bench-{i}",
+             rng.choice(["BTCUSDT", "ETHUSDT", "SOLUSDT", "XRPUSDT"]),
+             rng.choice(["Buy", "Sell"]),
+             1.0,
+             100.0,
+             100.0,
+             round(rng.gauss(0.5, 20), 2),
+             'closed',
+             now - rng.randrange(days * DAY_MS),
+             None,
+             None) for i in range(trade_count))
+    with conn:
+        conn.executemany("INSERT INTO trades VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        database.rebuild_profit_rollups(conn)
+
+
+def full_scan_profit_metrics() -> dict:
+    """The previous implementation: four window queries, two aggregates and a drawdown scan"""
+    c = database.get_connection().cursor()
+    now = database.now_ms()
+    result = {}
+    for name, span in (("hourly_profit", database.HOUR_MS), ("daily_profit", DAY_MS),
+                       ("weekly_profit", 7 * DAY_MS), ("monthly_profit", 30 * DAY_MS)):
+        c.execute("SELECT SUM(pnl) FROM trades WHERE timestamp >= ? AND status = 'closed'", (now - span,))
+        result[name] = round(c.fetchone()[0] or 0, 2)
+    c.execute("""SELECT COUNT(CASE WHEN pnl > 0 THEN 1 END), COUNT(CASE WHEN pnl < 0 THEN 1 END), COUNT(*)
+                 FROM trades WHERE status = 'closed'""")
+    result["wins"], result["losses"], result["total_trades"] = c.fetchone()
+    c.execute("""SELECT SUM(CASE WHEN pnl > 0 THEN pnl ELSE 0 END), SUM(CASE WHEN pnl < 0 THEN ABS(pnl) ELSE 0 END)
+                 FROM trades WHERE status = 'closed'""")
+    c.fetchone()
+    balance = peak_balance = database.STARTING_BALANCE
+    max_drawdown = 0
+    for (pnl,) in c.execute("SELECT pnl FROM trades WHERE status = 'closed' ORDER BY timestamp"):
+        balance += pnl or 0
+        peak_balance = max(peak_balance, balance)
+        max_drawdown = max(max_drawdown, (peak_balance - balance) / peak_balance * 100 if peak_balance > 0 else 0)
+    result["max_drawdown"] = round(max_drawdown, 2)
+    return result
+
+
+def time_call(func, repeat: int = 5) -> float:
+    """Best wall time of `repeat` calls, in milliseconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    trade_count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as tmp:
+        database.set_db_path(os.path.join(tmp, "bench_trades.db"))
+        database.initialize_db()
+
+        print(f"Building synthetic database with {trade_count:,} closed trades...")
+        start = time.perf_counter()
+        build_synthetic_db(trade_count)
+        print(f"Built in {time.perf_counter() - start:.1f}s")
+
+        rollup = database.get_profit_metrics()
+        legacy = full_scan_profit_metrics()
+        for key, value in legacy.items():
+            if abs(rollup[key] - value) > 0.011:
+                print(f"⚠️ {key} differs: rollups={rollup[key]} full scan={value}")
+
+        print(f"get_profit_metrics (rollups): {time_call(database.get_profit_metrics):.2f} ms")
+        print(f"full-scan implementation:     {time_call(full_scan_profit_metrics, repeat=1):.2f} ms")
+        database.close_connections()
+
+
+if __name__ == "__main__":
+    main()
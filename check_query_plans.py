@@ -0,0 +1,78 @@
+"""
+Query Plan Check
+Migrates a scratch database, runs the trade and profit queries the dashboard
+uses, and asserts that SQLite answers each one with an index search on trades
+instead of a full table scan. Exits non-zero if any plan regresses.
+
+Usage: python check_query_plans.py
+"""
+
+import os
+import re
+import sys
+import tempfile
+
+import database
+
+# (name, call, index every trades lookup of that call must search)
+CHECKS = [
+    ("get_active_trades", database.get_active_trades, "idx_trades_status_page"),
+    ("get_closed_trades", database.get_closed_trades, "idx_trades_status_page"),
+    ("get_profit_metrics", database.get_profit_metrics, "idx_trades_status_page"),
+    ("query_trades", lambda: database.query_trades(after=(1, "a")), "idx_trades_page"),
+    ("query_trades(start, end)", lambda: database.query_trades(start=0, end=1), "idx_trades_page"),
+    ("query_trades(status)", lambda: database.query_trades(status="closed", after=(1, "a")), "idx_trades_status_page"),
+    ("query_trades(symbol)", lambda: database.query_trades(symbol="BTCUSDT", after=(1, "a")), "idx_trades_symbol_time"),
+    ("query_trades(symbol, status)",
+     lambda: database.query_trades(status="closed", symbol="BTCUSDT", after=(1, "a")), "idx_trades_symbol_page"),
+]
+
+
+def captured_statements(call) -> list:
+    """SQL statements (with bound values inlined) executed by call()"""
+    statements = []
+    conn = database.get_connection()
+    conn.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        conn.set_trace_callback(None)
+    return [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+
+
+def check(name, call, index) -> list:
+    """Plan problems for every SELECT call() runs against trades"""
+    search = re.compile(rf"SEARCH trades USING (COVERING )?INDEX {index} ")
+    problems = []
+    statements = [s for s in captured_statements(call) if re.search(r"\btrades\b", s)]
+    if not statements:
+        problems.append(f"{name}: no query against trades was captured")
+    for sql in statements:
+        plan = database.explain_query_plan(sql)
+        lookups = [d for d in plan if re.match(r"(SEARCH|SCAN) trades\b", d)]
+        if not lookups or not all(search.match(d) for d in lookups):
+            problems.append(f"{name}: expected SEARCH trades USING INDEX {index}\n    {sql}\n    " + "\n    ".join(plan))
+        if any("TEMP B-TREE" in d for d in plan):
+            problems.append(f"{name}: sorts in a temp b-tree\n    {sql}")
+    return problems
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        database.set_db_path(os.path.join(tmp, "plan_check.db"))
+        database.initialize_db()
+
+        problems = []
+        for name, call, index in CHECKS:
+            found = check(name, call, index)
+            print(f"{'❌' if found else '✅'} {name}")
+            problems.extend(found)
+        database.close_connections()
+
+    for problem in problems:
+        print(problem)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+"""
+Return Correlation Tracker
+Rolling log returns of every tracked symbol kept in one (window, symbols) ring
+buffer, with running sums, sums of squares and the cross-product matrix updated
+incrementally as bars close (one outer product per bar). The correlation of a
+candidate with k open positions is read from those sums in O(k), which is what
+RiskManager checks against max_correlation before sizing a trade.
+A symbol that misses a bar is cleared rather than given a zero return, and is
+reseeded from its history the next time it is synced; when the buffer is full,
+the symbol that has gone longest without data gives up its column.
+"""
+
+import logging
+import threading
+
+import numpy as np
+
+logger = logging.getLogger('correlation')
+
+
+class ReturnCorrelation:
+    """Incrementally maintained rolling correlation matrix of log returns"""
+
+    def __init__(self, window=96, interval_ms=30 * 60 * 1000, capacity=200, min_periods=24):
+        self.window = window            # Returns per symbol in the rolling window
+        self.interval_ms = interval_ms  # Bar length, used to align seeded history
+        self.capacity = capacity        # Maximum tracked symbols
+        self.min_periods = min_periods  # Returns a symbol needs before its correlations count
+        self.index = {}
+        self.symbols = []
+        self.bar_time = None            # Start time of the newest bar in the window
+        self._buffer = np.zeros((window, capacity))
+        self._pos = 0                   # Ring row the next bar overwrites (the oldest)
+        self._last_close = np.zeros(capacity)
+        self._count = np.zeros(capacity, dtype=np.int64)
+        self._seen = np.zeros(capacity, dtype=np.int64)  # Newest bar time each column has data for
+        self._stale = set()             # Symbols cleared after a missed bar, reseeded on the next sync
+        self._sum = np.zeros(capacity)
+        self._sum_sq = np.zeros(capacity)
+        self._cross = np.zeros((capacity, capacity))
+        self._updates = 0
+        self._lock = threading.Lock()
+
+    def _column(self, symbol):
+        j = self.index.get(symbol)
+        if j is not None:
+            return j
+        if len(self.symbols) < self.capacity:
+            j = len(self.symbols)
+            self.symbols.append(symbol)
+        else:
+            # Full: recycle the column of the symbol that has gone longest without data
+            j = int(np.argmin(self._seen[:self.capacity]))
+            evicted = self.symbols[j]
+            del self.index[evicted]
+            self._stale.discard(evicted)
+            self.symbols[j] = symbol
+            self._clear(j)
+            logger.info(f"Correlation tracker full, replacing {evicted} with {symbol}")
+        self.index[symbol] = j
+        return j
+
+    def _clear(self, j):
+        """Drop every return of column j (lock held)"""
+        self._buffer[:, j] = 0
+        self._sum[j] = self._sum_sq[j] = 0
+        self._cross[j, :] = 0
+        self._cross[:, j] = 0
+        self._count[j] = 0
+        self._last_close[j] = 0
+
+    def _rebuild(self):
+        """Recompute the sums from the buffer (clears floating-point drift)"""
+        n = len(self.symbols)
+        data = self._buffer[:, :n]
+        self._sum[:n] = data.sum(axis=0)
+        self._sum_sq[:n] = (data * data).sum(axis=0)
+        self._cross[:n, :n] = data.T @ data
+
+    def update(self, bar_time, closes):
+        """Append one closed bar ({symbol: close}); tracked symbols without a close are cleared"""
+        with self._lock:
+            if self.bar_time is not None and bar_time <= self.bar_time:
+                return
+            returns = np.zeros(self.capacity)
+            present = np.zeros(self.capacity, dtype=bool)
+            for symbol, close in closes.items():
+                if not close or close <= 0:
+                    continue
+                j = self._column(symbol)
+                present[j] = True
+                self._seen[j] = bar_time
+                if self._last_close[j] > 0:
+                    returns[j] = np.log(close / self._last_close[j])
+                    self._count[j] = min(self._count[j] + 1, self.window)
+                else:
+                    returns[j] = 0.0  # First close of the column (or of a recycled one)
+                self._last_close[j] = close
+            # A missed bar would otherwise read as a zero return and the next close
+            # as one return spanning the gap: clear those symbols until they are reseeded
+            for j in np.flatnonzero(~present[:len(self.symbols)]):
+                if self._count[j] or self._last_close[j]:
+                    self._clear(j)
+                    self._stale.add(self.symbols[j])
+
+            n = len(self.symbols)
+            new, old = returns[:n], self._buffer[self._pos, :n].copy()
+            self._buffer[self._pos, :n] = new
+            self._pos = (self._pos + 1) % self.window
+            self.bar_time = bar_time
+            self._updates += 1
+            if self._updates % self.window == 0:
+                self._rebuild()
+            else:
+                self._sum[:n] += new - old
+                self._sum_sq[:n] += new * new - old * old
+                self._cross[:n, :n] += np.outer(new, new) - np.outer(old, old)
+
+    def seed(self, symbol, times, closes):
+        """Fill a symbol's window from historical bars (start times and closes, oldest first)"""
+        times = np.asarray(times, dtype=np.int64)
+        closes = np.asarray(closes, dtype=np.float64)
+        with self._lock:
+            j = self._column(symbol)
+            self._stale.discard(symbol)
+            if self.bar_time is None:
+                self.bar_time = int(times[-1]) if len(times) else None
+            keep = times <= self.bar_time if self.bar_time is not None else np.zeros(len(times), bool)
+            times, closes = times[keep], closes[keep]
+            self._buffer[:, j] = 0
+            self._count[j] = 0
+            if len(closes) >= 2:
+                returns = np.log(closes[1:] / closes[:-1])
+                age = (self.bar_time - times[1:]) // self.interval_ms  # 0 = newest bar in the window
+                recent = (age >= 0) & (age < self.window)
+                self._buffer[(self._pos - 1 - age[recent]) % self.window, j] = returns[recent]
+                self._count[j] = int(recent.sum())
+            self._last_close[j] = closes[-1] if len(closes) else 0.0
+            self._seen[j] = times[-1] if len(times) else 0
+
+            n = len(self.symbols)
+            column = self._buffer[:, j]
+            self._sum[j] = column.sum()
+            self._sum_sq[j] = column @ column
+            self._cross[j, :n] = self._cross[:n, j] = self._buffer[:, :n].T @ column
+
+    def sync(self, klines):
+        """
+        Feed {symbol: kline array} (kline cache layout, oldest first, newest row
+        still open): unseen symbols, and symbols cleared after missing bars, are
+        seeded from their history, then every bar that closed since the last
+        sync is applied in time order.
+        """
+        closed = {s: rows[:-1] for s, rows in klines.items() if rows is not None and len(rows) > 1}
+        for symbol, rows in closed.items():
+            if symbol not in self.index or symbol in self._stale:
+                self.seed(symbol, rows[:, 0], rows[:, 4])
+        if self.bar_time is None or not closed:
+            return
+        new_times = np.unique(np.concatenate([rows[rows[:, 0] > self.bar_time, 0] for rows in closed.values()]))
+        for bar_time in new_times:
+            bar_closes = {}
+            for symbol, rows in closed.items():
+                k = np.searchsorted(rows[:, 0], bar_time)
+                if k < len(rows) and rows[k, 0] == bar_time:
+                    bar_closes[symbol] = float(rows[k, 4])
+            self.update(int(bar_time), bar_closes)
+
+    def correlations(self, symbol, others):
+        """Correlation of symbol with each of others (NaN where either lacks min_periods of data)"""
+        others = list(others)
+        result = np.full(len(others), np.nan)
+        i = self.index.get(symbol)
+        if i is None or self._count[i] < self.min_periods:
+            return result
+        cols = np.array([self.index.get(s, -1) for s in others], dtype=np.int64)
+        known = cols >= 0
+        known[known] &= self._count[cols[known]] >= self.min_periods
+        if not known.any():
+            return result
+        cols = cols[known]
+        w = self.window
+        with self._lock:
+            var_i = self._sum_sq[i] - self._sum[i] ** 2 / w
+            var_o = self._sum_sq[cols] - self._sum[cols] ** 2 / w
+            cov = self._cross[i, cols] - self._sum[i] * self._sum[cols] / w
+        with np.errstate(divide='ignore', invalid='ignore'):
+            result[known] = np.clip(cov / np.sqrt(var_i * var_o), -1, 1)
+        return result
+
+    def check(self, symbol, open_symbols, max_correlation):
+        """(allowed, most correlated open symbol, its correlation) for a candidate position"""
+        others = [s for s in dict.fromkeys(open_symbols) if s != symbol]
+        corr = self.correlations(symbol, others)
+        if not len(others) or np.all(np.isnan(corr)):
+            return True, None, None
+        k = int(np.nanargmax(corr))
+        return bool(corr[k] <= max_correlation), others[k], float(corr[k])
+
+    def matrix(self):
+        """Full correlation matrix of the tracked symbols as (symbols, array)"""
+        n = len(self.symbols)
+        w = self.window
+        with self._lock:
+            var = self._sum_sq[:n] - self._sum[:n] ** 2 / w
+            cov = self._cross[:n, :n] - np.outer(self._sum[:n], self._sum[:n]) / w
+        with np.errstate(divide='ignore', invalid='ignore'):
+            corr = np.clip(cov / np.sqrt(np.outer(var, var)), -1, 1)
+        thin = self._count[:n] < self.min_periods
+        corr[thin, :] = np.nan
+        corr[:, thin] = np.nan
+        return list(self.symbols), corr
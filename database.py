@@ -1,12 +1,89 @@
+import os
 import sqlite3
-from datetime import datetime, timedelta
+import threading
+import time
+from datetime import datetime
 
-def initialize_db():
-    """Initialize database tables"""
-    conn = sqlite3.connect('trades.db')
-    c = conn.cursor()
+import numpy as np
+
+import performance
+
+# Database location (override with TRADES_DB_PATH or set_db_path)
+DB_PATH = os.getenv('TRADES_DB_PATH', 'trades.db')
+
+# Connection tuning
+DB_TIMEOUT = 30                # Seconds to wait on a locked database
+DB_CACHE_SIZE_KB = 16000       # Page cache per connection
+DB_CACHED_STATEMENTS = 256     # Prepared statements kept per connection
+
+_local = threading.local()
+_connections = []
+_connections_lock = threading.Lock()
+_generation = 0  # Bumped whenever connections are closed so threads reopen theirs
+_migrated_paths = set()
+
+def set_db_path(path: str):
+    """Point all subsequent database access at another file"""
+    global DB_PATH
+    DB_PATH = path
+    close_connections()
+
+def get_connection() -> sqlite3.Connection:
+    """Return this thread's persistent connection, opening it on first use"""
+    conn = getattr(_local, 'conn', None)
+    if conn is not None and _local.generation == _generation:
+        return conn
     
-    c.execute('''CREATE TABLE IF NOT EXISTS trades
+    conn = sqlite3.connect(DB_PATH, timeout=DB_TIMEOUT, cached_statements=DB_CACHED_STATEMENTS,
+                           check_same_thread=False)
+    # WAL lets dashboard reads run while the strategy loop writes
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    
+    # Bring the schema up to date once per database file
+    if DB_PATH not in _migrated_paths:
+        run_migrations(conn)
+        _migrated_paths.add(DB_PATH)
+    
+    _local.conn = conn
+    _local.generation = _generation
+    with _connections_lock:
+        _connections.append(conn)
+    return conn
+
+def close_connections():
+    """Close every connection opened by this module (e.g. on shutdown)"""
+    global _generation
+    with _connections_lock:
+        _generation += 1
+        for conn in _connections:
+            try:
+                conn.close()
+            except Exception:
+                pass
+        _connections.clear()
+
+# Time source for trade timestamps (replays swap in a virtual clock)
+clock = time.time
+
+def now_ms() -> int:
+    """Current time as integer epoch milliseconds (the trades.timestamp format)"""
+    return int(clock() * 1000)
+
+def _to_epoch_ms(value):
+    """Convert a legacy datetime string (local time) to epoch milliseconds"""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    try:
+        return int(datetime.fromisoformat(str(value)).timestamp() * 1000)
+    except ValueError:
+        return value
+
+# ========== SCHEMA MIGRATIONS ==========
+def _create_trades_table(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS trades
                  (id TEXT PRIMARY KEY,
                   symbol TEXT,
                   side TEXT,
@@ -18,44 +95,207 @@ def initialize_db():
                   timestamp DATETIME,
                   stop_loss REAL,
                   take_profit REAL)''')
-    conn.commit()
-    conn.close()
+
+def _add_trade_indexes(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_status_timestamp ON trades (status, timestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_symbol_status ON trades (symbol, status)")
+
+def _store_timestamps_as_epoch_ms(conn):
+    conn.create_function("to_epoch_ms", 1, _to_epoch_ms, deterministic=True)
+    conn.execute("UPDATE trades SET timestamp = to_epoch_ms(timestamp) WHERE typeof(timestamp) = 'text'")
+
+def _add_profit_rollups(conn):
+    conn.execute('''CREATE TABLE IF NOT EXISTS trade_pnl_hourly
+                 (bucket INTEGER PRIMARY KEY,
+                  pnl REAL NOT NULL DEFAULT 0)''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS trade_stats
+                 (id INTEGER PRIMARY KEY CHECK (id = 1),
+                  total INTEGER NOT NULL DEFAULT 0,
+                  wins INTEGER NOT NULL DEFAULT 0,
+                  losses INTEGER NOT NULL DEFAULT 0,
+                  gross_profit REAL NOT NULL DEFAULT 0,
+                  gross_loss REAL NOT NULL DEFAULT 0,
+                  balance REAL NOT NULL,
+                  peak_balance REAL NOT NULL,
+                  max_drawdown REAL NOT NULL DEFAULT 0)''')
+    _fill_profit_rollups_v4(conn)
+
+def _add_keyset_indexes(conn):
+    # (timestamp, id) suffixes let paged trade queries seek straight to the next page;
+    # the old two-column indexes are prefixes of these
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_status_page ON trades (status, timestamp, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_symbol_page ON trades (symbol, status, timestamp, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_page ON trades (timestamp, id)")
+    conn.execute("DROP INDEX IF EXISTS idx_trades_status_timestamp")
+    conn.execute("DROP INDEX IF EXISTS idx_trades_symbol_status")
+
+def _add_symbol_page_index(conn):
+    # /trades?symbol=X without a status filter can't use (symbol, status, ...) for its ORDER BY
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_trades_symbol_time ON trades (symbol, timestamp, id)")
+
+# Ordered (version, migration) pairs; append new entries, never edit applied ones
+MIGRATIONS = [
+    (1, _create_trades_table),
+    (2, _add_trade_indexes),
+    (3, _store_timestamps_as_epoch_ms),
+    (4, _add_profit_rollups),
+    (5, _add_keyset_indexes),
+    (6, _add_symbol_page_index),
+]
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Highest migration version applied to this database"""
+    conn.execute('''CREATE TABLE IF NOT EXISTS schema_version
+                 (version INTEGER PRIMARY KEY,
+                  applied_at INTEGER)''')
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+def run_migrations(conn: sqlite3.Connection) -> int:
+    """Apply pending migrations in order, each in its own transaction; returns the schema version"""
+    version = get_schema_version(conn)
+    for target, migrate in MIGRATIONS:
+        if target <= version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have migrated while we waited for the lock
+            if get_schema_version(conn) < target:
+                migrate(conn)
+                conn.execute("INSERT INTO schema_version VALUES (?, ?)", (target, now_ms()))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        version = target
+    return version
+
+def explain_query_plan(query: str, params=()) -> list:
+    """Return SQLite's EXPLAIN QUERY PLAN details for a query (for checking index use)"""
+    rows = get_connection().execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+    return [row[-1] for row in rows]
+
+# ========== PROFIT ROLLUPS ==========
+HOUR_MS = 3600 * 1000
+STARTING_BALANCE = float(os.getenv('STARTING_BALANCE', 10000))  # Balance the equity curve starts from
+
+def _apply_closed_pnl(stats: list, pnl: float):
+    """Advance [total, wins, losses, gross_profit, gross_loss, balance, peak_balance, max_drawdown] by one trade"""
+    total, wins, losses, gross_profit, gross_loss, balance, peak_balance, max_drawdown = stats
+    balance += pnl
+    peak_balance = max(peak_balance, balance)
+    drawdown = (peak_balance - balance) / peak_balance * 100 if peak_balance > 0 else 0
+    stats[:] = [total + 1, wins + (pnl > 0), losses + (pnl < 0),
+                gross_profit + max(pnl, 0), gross_loss + max(-pnl, 0),
+                balance, peak_balance, max(max_drawdown, drawdown)]
+
+def _fill_profit_rollups_v4(conn: sqlite3.Connection):
+    """Migration 4's initial fill of the rollups (frozen with the migration; use rebuild_profit_rollups elsewhere)"""
+    conn.execute("DELETE FROM trade_pnl_hourly")
+    conn.execute('''INSERT INTO trade_pnl_hourly (bucket, pnl)
+                 SELECT timestamp / ?, SUM(COALESCE(pnl, 0)) FROM trades
+                 WHERE status = 'closed' AND typeof(timestamp) = 'integer'
+                 GROUP BY timestamp / ?''', (HOUR_MS, HOUR_MS))
+    
+    stats = [0, 0, 0, 0.0, 0.0, STARTING_BALANCE, STARTING_BALANCE, 0.0]
+    for (pnl,) in conn.execute("SELECT pnl FROM trades WHERE status = 'closed' ORDER BY timestamp"):
+        _apply_closed_pnl(stats, pnl or 0)
+    conn.execute("INSERT OR REPLACE INTO trade_stats VALUES (1, ?, ?, ?, ?, ?, ?, ?, ?)", stats)
+
+def rebuild_profit_rollups(conn: sqlite3.Connection):
+    """Recompute the hourly P&L buckets and the trade_stats row from the trades table"""
+    conn.execute("DELETE FROM trade_pnl_hourly")
+    conn.execute('''INSERT INTO trade_pnl_hourly (bucket, pnl)
+                 SELECT timestamp / ?, SUM(COALESCE(pnl, 0)) FROM trades
+                 WHERE status = 'closed' AND typeof(timestamp) = 'integer'
+                 GROUP BY timestamp / ?''', (HOUR_MS, HOUR_MS))
+    
+    pnl = np.array([row[0] or 0 for row in
+                    conn.execute("SELECT pnl FROM trades WHERE status = 'closed' ORDER BY timestamp")], dtype=np.float64)
+    equity = STARTING_BALANCE + np.cumsum(np.r_[0.0, pnl])
+    totals = performance.trade_stats(pnl)
+    stats = [len(pnl), int((pnl > 0).sum()), int((pnl < 0).sum()), totals['total_profit'], totals['total_loss'],
+             float(equity[-1]), float(equity.max()), performance.max_drawdown(equity)]
+    conn.execute("INSERT OR REPLACE INTO trade_stats VALUES (1, ?, ?, ?, ?, ?, ?, ?, ?)", stats)
+
+def _record_closed_trade(conn: sqlite3.Connection, trade_id: str, pnl: float):
+    """Fold one newly closed trade into the rollups (inside the closing transaction)"""
+    pnl = pnl or 0
+    timestamp = conn.execute("SELECT timestamp FROM trades WHERE id = ?", (trade_id,)).fetchone()[0]
+    conn.execute('''INSERT INTO trade_pnl_hourly (bucket, pnl) VALUES (?, ?)
+                 ON CONFLICT(bucket) DO UPDATE SET pnl = pnl + excluded.pnl''',
+                 (int(timestamp) // HOUR_MS, pnl))
+    
+    stats = list(conn.execute('''SELECT total, wins, losses, gross_profit, gross_loss,
+                                     balance, peak_balance, max_drawdown
+                              FROM trade_stats WHERE id = 1''').fetchone())
+    _apply_closed_pnl(stats, pnl)
+    conn.execute('''UPDATE trade_stats SET total = ?, wins = ?, losses = ?, gross_profit = ?,
+                 gross_loss = ?, balance = ?, peak_balance = ?, max_drawdown = ? WHERE id = 1''', stats)
+
+# Callables notified after trade writes commit: listener(event, trade_id, fields)
+# with event 'open' (fields: symbol, side, size, entry_price, stop_loss, leverage),
+# 'update' (fields: stop_loss, take_profit) or 'close' (fields: exit_price, pnl)
+_trade_listeners = []
+
+def add_trade_listener(listener):
+    """Subscribe to trade open/update/close events"""
+    if listener not in _trade_listeners:
+        _trade_listeners.append(listener)
+
+def remove_trade_listener(listener):
+    """Unsubscribe a trade listener"""
+    if listener in _trade_listeners:
+        _trade_listeners.remove(listener)
+
+def _notify(event: str, trade_id: str, fields: dict):
+    for listener in list(_trade_listeners):
+        try:
+            listener(event, trade_id, fields)
+        except Exception as e:
+            print(f"Trade listener error ({event} {trade_id}): {e}")
+
+def initialize_db():
+    """Initialize database tables"""
+    return run_migrations(get_connection())
 
 def save_trade(trade_data: dict):
     """Save new trade to database"""
-    conn = sqlite3.connect('trades.db')
-    c = conn.cursor()
+    conn = get_connection()
     
     # Check for stop loss and take profit in trade data
     stop_loss = trade_data.get('stopLoss', None)
     take_profit = trade_data.get('takeProfit', None)
     
-    c.execute('''INSERT INTO trades VALUES 
-              (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-              (trade_data['orderId'],
-               trade_data['symbol'],
-               trade_data['side'],
-               float(trade_data['qty']),
-               float(trade_data['avgPrice']),
-               None,
-               None,
-               'open',
-               datetime.now(),
-               stop_loss,
-               take_profit))
+    with conn:
+        conn.execute('''INSERT INTO trades VALUES 
+                     (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                     (trade_data['orderId'],
+                      trade_data['symbol'],
+                      trade_data['side'],
+                      float(trade_data['qty']),
+                      float(trade_data['avgPrice']),
+                      None,
+                      None,
+                      'open',
+                      now_ms(),
+                      stop_loss,
+                      take_profit))
     
-    conn.commit()
-    conn.close()
+    _notify('open', trade_data['orderId'], {
+        'symbol': trade_data['symbol'],
+        'side': trade_data['side'],
+        'size': float(trade_data['qty']),
+        'entry_price': float(trade_data['avgPrice']),
+        'stop_loss': stop_loss,
+        'leverage': trade_data.get('leverage')
+    })
 
 def get_active_trades() -> list:
     """Retrieve all active trades"""
     try:
-        conn = sqlite3.connect('trades.db')
-        c = conn.cursor()
+        c = get_connection().cursor()
         c.execute("SELECT * FROM trades WHERE status='open'")
-        result = c.fetchall()
-        conn.close()
-        return result
+        return c.fetchall()
     except Exception as e:
         print(f"DB error (active trades): {e}")
         return []
@@ -63,32 +303,74 @@ def get_active_trades() -> list:
 def get_closed_trades() -> list:
     """Retrieve trade history"""
     try:
-        conn = sqlite3.connect('trades.db')
-        c = conn.cursor()
+        c = get_connection().cursor()
         c.execute("SELECT * FROM trades WHERE status='closed'")
-        result = c.fetchall()
-        conn.close()
-        return result
+        return c.fetchall()
     except Exception as e:
         print(f"DB error (closed trades): {e}")
         return []
         
+TRADE_FIELDS = ('id', 'symbol', 'side', 'size', 'entry_price', 'exit_price', 'pnl',
+                'status', 'timestamp', 'stop_loss', 'take_profit')
+
+def query_trades(status=None, symbol=None, start=None, end=None, fields=None, limit=100, after=None) -> tuple:
+    """
+    One page of trades, newest first, as dicts of `fields` (default: all).
+    `after` is the (timestamp, id) key of the previous page's last row. Pages are
+    seeks on (timestamp, id), so their cost does not grow with the table.
+    Returns (rows, key of the last row or None when this is the final page).
+    """
+    fields = list(fields or TRADE_FIELDS)
+    unknown = set(fields) - set(TRADE_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown trade fields: {', '.join(sorted(unknown))}")
+    
+    where, params = [], []
+    if status:
+        where.append("status = ?")
+        params.append(status)
+    if symbol:
+        where.append("symbol = ?")
+        params.append(symbol)
+    if start is not None:
+        where.append("timestamp >= ?")
+        params.append(start)
+    if end is not None:
+        where.append("timestamp < ?")
+        params.append(end)
+    if after is not None:
+        where.append("(timestamp, id) < (?, ?)")
+        params.extend(after)
+    query = f"SELECT {', '.join(fields)}, timestamp, id FROM trades"
+    if where:
+        query += " WHERE " + " AND ".join(where)
+    query += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+    params.append(limit + 1)  # One extra row tells whether another page exists
+    
+    rows = get_connection().execute(query, params).fetchall()
+    more = len(rows) > limit
+    rows = rows[:limit]
+    n = len(fields)
+    page = [dict(zip(fields, row[:n])) for row in rows]
+    return page, (tuple(rows[-1][n:]) if more else None)
+
 def close_trade(trade_id: str, exit_price: float, pnl: float) -> bool:
     """Close a trade with exit price and PnL"""
     try:
-        conn = sqlite3.connect('trades.db')
-        c = conn.cursor()
+        conn = get_connection()
         
         # Update the trade with exit price, PnL and closed status
-        c.execute('''UPDATE trades 
-                  SET exit_price = ?, pnl = ?, status = 'closed' 
-                  WHERE id = ? AND status = 'open' ''',
-                  (exit_price, pnl, trade_id))
-        
-        updated = c.rowcount > 0
-        conn.commit()
-        conn.close()
-        return updated
+        with conn:
+            c = conn.execute('''UPDATE trades 
+                             SET exit_price = ?, pnl = ?, status = 'closed' 
+                             WHERE id = ? AND status = 'open' ''',
+                             (exit_price, pnl, trade_id))
+            if c.rowcount > 0:
+                _record_closed_trade(conn, trade_id, pnl)
+        
+        if c.rowcount > 0:
+            _notify('close', trade_id, {'exit_price': exit_price, 'pnl': pnl})
+        return c.rowcount > 0
     except Exception as e:
         print(f"DB error (close trade): {e}")
         return False
@@ -96,8 +378,7 @@ def close_trade(trade_id: str, exit_price: float, pnl: float) -> bool:
 def update_trade_settings(trade_id: str, stop_loss: float = None, take_profit: float = None) -> bool:
     """Update stop loss and take profit values for a trade"""
     try:
-        conn = sqlite3.connect('trades.db')
-        c = conn.cursor()
+        conn = get_connection()
         
         # Build SET part of query dynamically based on provided values
         set_clause = []
@@ -119,116 +400,91 @@ def update_trade_settings(trade_id: str, stop_loss: float = None, take_profit: f
         query = f"UPDATE trades SET {', '.join(set_clause)} WHERE id = ? AND status = 'open'"
         params.append(trade_id)
         
-        c.execute(query, params)
-        conn.commit()
+        with conn:
+            c = conn.execute(query, params)
         
         # Check if any row was updated
-        success = c.rowcount > 0
-        conn.close()
-        return success
+        if c.rowcount > 0:
+            _notify('update', trade_id, {'stop_loss': stop_loss, 'take_profit': take_profit})
+        return c.rowcount > 0
     except Exception as e:
         print(f"Error updating trade settings: {e}")
         return False
 
+def _window_profit_sql(name: str) -> str:
+    """Closed P&L since a cutoff: whole hourly buckets plus the trades in the cutoff's own hour"""
+    return f"""COALESCE((SELECT SUM(pnl) FROM trade_pnl_hourly WHERE bucket > ?), 0)
+             + COALESCE((SELECT SUM(pnl) FROM trades
+                         WHERE status = 'closed' AND timestamp >= ? AND timestamp < ?), 0) AS {name}"""
+
+_risk_cache = {"key": None, "value": None}
+
+def _equity_risk(c: sqlite3.Cursor, total_trades: int, now: int) -> dict:
+    """Drawdown and risk-adjusted ratios of the daily equity curve, recomputed when a trade closes or a day passes"""
+    key = (DB_PATH, total_trades, now // (24 * HOUR_MS))
+    if _risk_cache["key"] != key:
+        days = np.array(c.execute("""SELECT bucket / 24, SUM(pnl) FROM trade_pnl_hourly
+                                     GROUP BY bucket / 24 ORDER BY 1""").fetchall(), dtype=np.float64).reshape(-1, 2)
+        if len(days):
+            times = np.r_[days[0, 0], days[:, 0] + 1] * 24 * HOUR_MS
+            equity = STARTING_BALANCE + np.cumsum(np.r_[0.0, days[:, 1]])
+            risk = performance.equity_stats(times, equity, end_ms=max(now, int(times[-1])))
+        else:
+            risk = performance.equity_stats([], [])
+        _risk_cache.update(key=key, value=risk)
+    return _risk_cache["value"]
+
 def get_profit_metrics() -> dict:
     """Calculate profit metrics (hourly, daily, weekly, monthly) and trading stats"""
     try:
-        conn = sqlite3.connect('trades.db')
-        conn.row_factory = sqlite3.Row  # Allow column access by name
-        c = conn.cursor()
+        c = get_connection().cursor()
+        c.row_factory = sqlite3.Row  # Allow column access by name
         
-        # Get current time
-        now = datetime.now()
+        # Get current time (epoch milliseconds, like trades.timestamp)
+        now = now_ms()
         
         # Calculate time deltas using relative time periods instead of fixed start points
-        hour_ago = now - timedelta(hours=1)
-        day_ago = now - timedelta(days=1)
-        week_ago = now - timedelta(days=7)
-        month_ago = now - timedelta(days=30)
-        
-        # Query for hourly profit
-        c.execute("""
-            SELECT SUM(pnl) as profit FROM trades 
-            WHERE timestamp >= ? AND status = 'closed'
-        """, (hour_ago,))
-        hourly_profit = c.fetchone()['profit'] or 0
-        
-        # Query for daily profit
-        c.execute("""
-            SELECT SUM(pnl) as profit FROM trades 
-            WHERE timestamp >= ? AND status = 'closed'
-        """, (day_ago,))
-        daily_profit = c.fetchone()['profit'] or 0
-        
-        # Query for weekly profit
-        c.execute("""
-            SELECT SUM(pnl) as profit FROM trades 
-            WHERE timestamp >= ? AND status = 'closed'
-        """, (week_ago,))
-        weekly_profit = c.fetchone()['profit'] or 0
-        
-        # Query for monthly profit
-        c.execute("""
-            SELECT SUM(pnl) as profit FROM trades 
-            WHERE timestamp >= ? AND status = 'closed'
-        """, (month_ago,))
-        monthly_profit = c.fetchone()['profit'] or 0
+        windows = {
+            "hourly_profit": now - HOUR_MS,
+            "daily_profit": now - 24 * HOUR_MS,
+            "weekly_profit": now - 7 * 24 * HOUR_MS,
+            "monthly_profit": now - 30 * 24 * HOUR_MS
+        }
+        
+        # One statement: at most 720 hourly buckets plus one hour of trades per window,
+        # and the running totals/drawdown kept up to date by close_trade
+        params = []
+        for cutoff in windows.values():
+            bucket = cutoff // HOUR_MS
+            params += [bucket, cutoff, (bucket + 1) * HOUR_MS]
+        c.execute(f"""
+            SELECT {', '.join(_window_profit_sql(name) for name in windows)},
+                   s.total, s.wins, s.losses, s.gross_profit, s.gross_loss, s.max_drawdown
+            FROM trade_stats s WHERE s.id = 1
+        """, params)
+        row = c.fetchone()
+        
+        hourly_profit = row['hourly_profit']
+        daily_profit = row['daily_profit']
+        weekly_profit = row['weekly_profit']
+        monthly_profit = row['monthly_profit']
         
         # Calculate win rate
-        c.execute("""
-            SELECT 
-                COUNT(CASE WHEN pnl > 0 THEN 1 END) as wins,
-                COUNT(CASE WHEN pnl < 0 THEN 1 END) as losses,
-                COUNT(*) as total
-            FROM trades
-            WHERE status = 'closed'
-        """)
-        stats = c.fetchone()
-        wins = stats['wins'] or 0
-        losses = stats['losses'] or 0
-        total_trades = stats['total'] or 0
+        wins = row['wins']
+        losses = row['losses']
+        total_trades = row['total']
         
         win_rate = (wins / total_trades * 100) if total_trades > 0 else 0
         
         # Calculate profit factor
-        c.execute("""
-            SELECT 
-                SUM(CASE WHEN pnl > 0 THEN pnl ELSE 0 END) as gross_profit,
-                SUM(CASE WHEN pnl < 0 THEN ABS(pnl) ELSE 0 END) as gross_loss
-            FROM trades
-            WHERE status = 'closed'
-        """)
-        pnl_stats = c.fetchone()
-        gross_profit = pnl_stats['gross_profit'] or 0
-        gross_loss = pnl_stats['gross_loss'] or 0
+        gross_profit = row['gross_profit']
+        gross_loss = row['gross_loss']
         
         profit_factor = gross_profit / gross_loss if gross_loss > 0 else (1 if gross_profit > 0 else 0)
         
-        # Calculate max drawdown
-        c.execute("""
-            SELECT pnl FROM trades
-            WHERE status = 'closed'
-            ORDER BY timestamp
-        """)
-        
-        trades = c.fetchall()
-        
-        # Calculate running balance and max drawdown
-        balance = 10000  # Starting balance
-        peak_balance = balance
-        max_drawdown = 0
-        
-        for trade in trades:
-            pnl = trade['pnl'] or 0
-            balance += pnl
-            
-            if balance > peak_balance:
-                peak_balance = balance
-            
-            drawdown = (peak_balance - balance) / peak_balance * 100 if peak_balance > 0 else 0
-            max_drawdown = max(max_drawdown, drawdown)
+        max_drawdown = row['max_drawdown']
         
-        conn.close()
+        risk = _equity_risk(c, total_trades, now)
         
         return {
             "hourly_profit": round(hourly_profit, 2),
@@ -238,6 +494,9 @@ def get_profit_metrics() -> dict:
             "win_rate": round(win_rate, 2),
             "profit_factor": round(profit_factor, 2),
             "max_drawdown": round(max_drawdown, 2),
+            "current_drawdown": round(risk['current_drawdown'], 2),
+            "sharpe_ratio": round(risk['sharpe_ratio'], 2),
+            "sortino_ratio": round(risk['sortino_ratio'], 2),
             "total_trades": total_trades,
             "wins": wins,
             "losses": losses
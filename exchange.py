@@ -0,0 +1,51 @@
+"""
+Async Exchange Access
+Runs blocking pybit calls (and any other blocking exchange work) on a dedicated
+thread pool so FastAPI handlers and background tasks never stall the event loop.
+"""
+
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger('exchange')
+
+
+class AsyncExchange:
+    """
+    Awaitable facade over the synchronous Bybit HTTP client.
+
+    Exchange methods are forwarded by name, e.g.
+    ``await exchange.get_tickers(category="linear", symbol="BTCUSDT")``.
+    """
+
+    def __init__(self, get_client, max_workers=16):
+        self._get_client = get_client  # Callable so credential updates are picked up
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='exchange')
+
+    @property
+    def client(self):
+        return self._get_client()
+
+    async def run(self, func, *args, **kwargs):
+        """Run any blocking callable on the exchange thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    async def call(self, method, **params):
+        """Call a client method by name on the exchange thread pool"""
+        return await self.run(getattr(self.client, method), **params)
+
+    def __getattr__(self, method):
+        if method.startswith('_'):
+            raise AttributeError(method)
+
+        async def forward(**params):
+            return await self.call(method, **params)
+
+        forward.__name__ = method
+        return forward
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,114 @@
+"""
+Exposure Ledger
+In-memory totals of the risk carried by open trades: per-trade risk to stop,
+notional and margin (notional / leverage), kept current by database trade
+events and rebuilt from trades.db at startup. Pre-trade checks against
+max_total_risk and max_positions read the running totals, so they cost O(1)
+however many trades are open.
+"""
+
+import logging
+import threading
+
+logger = logging.getLogger('exposure_ledger')
+
+DEFAULT_STOP_DISTANCE = 0.02  # Risk assumed for trades without a stop loss (fraction of entry)
+
+
+class ExposureLedger:
+    """Running risk, notional and margin of the open trades"""
+
+    def __init__(self, default_leverage=1):
+        self.default_leverage = default_leverage
+        self.trades = {}  # trade id -> {symbol, side, size, entry_price, stop_loss, leverage, risk, notional}
+        self.total_risk = 0.0
+        self.total_notional = 0.0
+        self.total_margin = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def risk_to_stop(size, entry_price, stop_loss):
+        """Loss if the trade is stopped out (a 2% adverse move when it has no stop)"""
+        if stop_loss is None:
+            return abs(size) * entry_price * DEFAULT_STOP_DISTANCE
+        return abs(size) * abs(entry_price - stop_loss)
+
+    def _apply(self, trade, sign):
+        self.total_risk += sign * trade['risk']
+        self.total_notional += sign * trade['notional']
+        self.total_margin += sign * trade['notional'] / trade['leverage']
+
+    def add(self, trade_id, symbol, side, size, entry_price, stop_loss=None, leverage=None):
+        """Record an opened trade (replaces an existing entry with the same id)"""
+        size, entry_price = float(size), float(entry_price)
+        stop_loss = float(stop_loss) if stop_loss is not None else None
+        trade = {
+            'symbol': symbol,
+            'side': side,
+            'size': size,
+            'entry_price': entry_price,
+            'stop_loss': stop_loss,
+            'leverage': float(leverage or self.default_leverage),
+            'risk': self.risk_to_stop(size, entry_price, stop_loss),
+            'notional': abs(size) * entry_price
+        }
+        with self._lock:
+            previous = self.trades.pop(trade_id, None)
+            if previous:
+                self._apply(previous, -1)
+            self.trades[trade_id] = trade
+            self._apply(trade, 1)
+
+    def update_stop(self, trade_id, stop_loss):
+        """Re-price a trade's risk after its stop loss moved"""
+        with self._lock:
+            trade = self.trades.get(trade_id)
+            if trade is None:
+                return
+            self.total_risk -= trade['risk']
+            trade['stop_loss'] = float(stop_loss)
+            trade['risk'] = self.risk_to_stop(trade['size'], trade['entry_price'], trade['stop_loss'])
+            self.total_risk += trade['risk']
+
+    def remove(self, trade_id):
+        """Drop a closed trade"""
+        with self._lock:
+            trade = self.trades.pop(trade_id, None)
+            if trade:
+                self._apply(trade, -1)
+
+    def rebuild(self, open_trades):
+        """Reload from trades-table rows (e.g. get_active_trades()), recomputing the totals exactly"""
+        with self._lock:
+            self.trades.clear()
+            self.total_risk = self.total_notional = self.total_margin = 0.0
+        for row in open_trades:
+            self.add(row[0], row[1], row[2], row[3], row[4], row[9])
+        logger.info(f"Exposure ledger rebuilt: {len(self.trades)} open trades, risk {self.total_risk:.2f}")
+
+    def on_trade_event(self, event, trade_id, fields):
+        """database trade listener: keep the ledger in step with trade writes"""
+        if event == 'open':
+            self.add(trade_id, fields['symbol'], fields['side'], fields['size'], fields['entry_price'],
+                     fields.get('stop_loss'), fields.get('leverage'))
+        elif event == 'update' and fields.get('stop_loss') is not None:
+            self.update_stop(trade_id, fields['stop_loss'])
+        elif event == 'close':
+            self.remove(trade_id)
+
+    def open_count(self):
+        """Number of open trades"""
+        return len(self.trades)
+
+    def remaining_risk(self, balance, max_total_risk):
+        """Risk budget still available for new trades"""
+        return max(balance * max_total_risk - self.total_risk, 0.0)
+
+    def snapshot(self):
+        """Totals for diagnostics"""
+        return {
+            'open_trades': len(self.trades),
+            'total_risk': self.total_risk,
+            'total_notional': self.total_notional,
+            'total_margin': self.total_margin
+        }
@@ -0,0 +1,329 @@
+"""
+Streaming Indicator State
+Stateful indicators that are seeded once from history and then updated in
+constant time per candle. Candles are Bybit kline rows:
+[start, open, high, low, close, volume, turnover].
+"""
+
+import math
+import threading
+from collections import deque
+
+import numpy as np
+
+import indicators
+
+
+class EmaState:
+    """Exponential Moving Average updated one value at a time"""
+
+    def __init__(self, period):
+        self.period = period
+        self.alpha = 2 / (period + 1)
+        self.value = None
+
+    def seed(self, values):
+        self.value = float(indicators.ema(values, self.period)[-1])
+        return self.value
+
+    def update(self, value):
+        if self.value is None:
+            self.value = float(value)
+        else:
+            self.value = value * self.alpha + self.value * (1 - self.alpha)
+        return self.value
+
+    def snapshot(self):
+        return self.value
+
+    def restore(self, saved):
+        self.value = saved
+
+
+class RsiState:
+    """Wilder RSI updated from consecutive closes"""
+
+    def __init__(self, period=21):
+        self.period = period
+        self.up = None
+        self.down = None
+        self.prev_close = None
+        self.value = None
+
+    def seed(self, closes):
+        ups, downs = indicators.wilder_averages(closes, self.period)
+        self.up, self.down = float(ups[-1]), float(downs[-1])
+        self.prev_close = float(closes[-1])
+        self.value = float(indicators.rsi_from_averages(self.up, self.down))
+        return self.value
+
+    def update(self, close):
+        delta = close - self.prev_close
+        self.up = (self.up * (self.period - 1) + max(delta, 0.0)) / self.period
+        self.down = (self.down * (self.period - 1) + max(-delta, 0.0)) / self.period
+        self.prev_close = close
+        self.value = 100. - 100. / (1. + self.up / self.down) if self.down != 0 else 100.
+        return self.value
+
+    def snapshot(self):
+        return self.up, self.down, self.prev_close, self.value
+
+    def restore(self, saved):
+        self.up, self.down, self.prev_close, self.value = saved
+
+
+class AtrState:
+    """Wilder Average True Range"""
+
+    def __init__(self, period=14):
+        self.period = period
+        self.prev_close = None
+        self.value = None
+
+    def seed(self, high, low, close):
+        self.value = float(indicators.atr(high, low, close, self.period)[-1])
+        self.prev_close = float(close[-1])
+        return self.value
+
+    def update(self, high, low, close):
+        tr = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        self.value = (self.value * (self.period - 1) + tr) / self.period
+        self.prev_close = close
+        return self.value
+
+    def snapshot(self):
+        return self.prev_close, self.value
+
+    def restore(self, saved):
+        self.prev_close, self.value = saved
+
+
+class MacdState:
+    """MACD line, signal line and histogram (keeps the previous histogram value)"""
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = EmaState(fast)
+        self.slow = EmaState(slow)
+        self.signal = EmaState(signal)
+        self.hist = None
+        self.hist_prev = None
+
+    def seed(self, closes):
+        macd_line, signal_line, histogram = indicators.macd(closes, self.fast.period, self.slow.period, self.signal.period)
+        self.fast.seed(closes)
+        self.slow.seed(closes)
+        self.signal.value = float(signal_line[-1])
+        self.hist = float(histogram[-1])
+        self.hist_prev = float(histogram[-2]) if len(histogram) > 1 else self.hist
+        return self.hist
+
+    def update(self, close):
+        macd_line = self.fast.update(close) - self.slow.update(close)
+        self.hist_prev = self.hist
+        self.hist = macd_line - self.signal.update(macd_line)
+        return self.hist
+
+    def snapshot(self):
+        return self.fast.value, self.slow.value, self.signal.value, self.hist, self.hist_prev
+
+    def restore(self, saved):
+        self.fast.value, self.slow.value, self.signal.value, self.hist, self.hist_prev = saved
+
+    @property
+    def line(self):
+        return self.fast.value - self.slow.value
+
+
+class RollingMeanState:
+    """Simple moving average over a fixed window (e.g. volume SMA)"""
+
+    def __init__(self, period=20):
+        self.period = period
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+
+    def seed(self, values):
+        self.window = deque((float(v) for v in values[-self.period:]), maxlen=self.period)
+        self.total = math.fsum(self.window)
+        return self.value
+
+    def update(self, value):
+        if len(self.window) == self.period:
+            self.total -= self.window[0]
+        self.window.append(value)
+        self.total += value
+        return self.value
+
+    def snapshot(self):
+        # Only the evicted value and the running total are needed to undo one update
+        return (self.window[0] if self.window else None), len(self.window), self.total
+
+    def restore(self, saved):
+        evicted, length, self.total = saved
+        self.window.pop()
+        if length == self.period:
+            self.window.appendleft(evicted)
+
+    @property
+    def value(self):
+        return self.total / len(self.window) if self.window else 0.0
+
+
+class BollingerState:
+    """Bollinger Bands (SMA +/- dev * population std) over a fixed window"""
+
+    def __init__(self, period=20, dev=2):
+        self.period = period
+        self.dev = dev
+        self.window = deque(maxlen=period)
+
+    def seed(self, values):
+        self.window = deque((float(v) for v in values[-self.period:]), maxlen=self.period)
+        return self.value
+
+    def update(self, value):
+        self.window.append(value)
+
+    def snapshot(self):
+        return (self.window[0] if self.window else None), len(self.window)
+
+    def restore(self, saved):
+        evicted, length = saved
+        self.window.pop()
+        if length == self.period:
+            self.window.appendleft(evicted)
+
+    @property
+    def value(self):
+        """Return (upper, middle, lower)"""
+        if not self.window:
+            return None, None, None
+        window = np.fromiter(self.window, dtype=np.float64, count=len(self.window))
+        middle = window.mean()
+        stdev = window.std()
+        return middle + self.dev * stdev, middle, middle - self.dev * stdev
+
+
+class IndicatorSet:
+    """All indicators tracked for one (symbol, interval) stream"""
+
+    def __init__(self, symbol, interval):
+        self.symbol = symbol
+        self.interval = interval
+        self.ema9 = EmaState(9)
+        self.ema21 = EmaState(21)
+        self.ema50 = EmaState(50)
+        self.ema200 = EmaState(200)
+        self.rsi = RsiState(21)
+        self.atr = AtrState(14)
+        self.macd = MacdState(12, 26, 9)
+        self.volume_sma = RollingMeanState(20)
+        self.bollinger = BollingerState(20, 2)
+        self.last_start = None
+        self.last_candle = None
+        self._before_last = None  # Indicator state before the newest (possibly unfinished) candle
+        self.lock = threading.Lock()
+
+    @property
+    def seeded(self):
+        return self.last_start is not None
+
+    def _indicators(self):
+        return (self.ema9, self.ema21, self.ema50, self.ema200, self.rsi,
+                self.atr, self.macd, self.volume_sma, self.bollinger)
+
+    def seed(self, rows):
+        """Seed from a chronological 2-D kline array (oldest first)"""
+        rows = indicators.kline_array(rows)
+        history, last = rows[:-1], rows[-1]
+        closes = history[:, 4]
+        for ema in (self.ema9, self.ema21, self.ema50, self.ema200):
+            ema.seed(closes)
+        self.rsi.seed(closes)
+        self.atr.seed(history[:, 2], history[:, 3], closes)
+        self.macd.seed(closes)
+        self.volume_sma.seed(history[:, 5])
+        self.bollinger.seed(closes)
+        self.last_start = None
+        # The newest row may still be forming, so apply it through update()
+        self.update(last)
+
+    def update(self, candle):
+        """
+        Apply one kline row in O(1). A row with the same start time as the
+        previous one replaces it (the in-progress candle was revised).
+        """
+        start = int(candle[0])
+        if self.last_start is not None and start < self.last_start:
+            return
+        if start == self.last_start:
+            for indicator, saved in zip(self._indicators(), self._before_last):
+                indicator.restore(saved)
+        self._before_last = [indicator.snapshot() for indicator in self._indicators()]
+
+        high, low, close, volume = float(candle[2]), float(candle[3]), float(candle[4]), float(candle[5])
+        for ema in (self.ema9, self.ema21, self.ema50, self.ema200):
+            ema.update(close)
+        self.rsi.update(close)
+        self.atr.update(high, low, close)
+        self.macd.update(close)
+        self.volume_sma.update(volume)
+        self.bollinger.update(close)
+        self.last_start = start
+        self.last_candle = (start, float(candle[1]), high, low, close, volume)
+
+    def sync(self, rows):
+        """
+        Bring the state up to date with a chronological kline array. Only rows at
+        or after the last applied start time are processed; if the rows do not
+        overlap the state (gap or first use) the state is reseeded.
+        """
+        rows = indicators.kline_array(rows)
+        with self.lock:
+            if not self.seeded or rows[0, 0] > self.last_start:
+                self.seed(rows)
+                return self
+            for row in rows[rows[:, 0] >= self.last_start]:
+                self.update(row)
+        return self
+
+    def latest(self):
+        """Latest indicator values as a flat dict"""
+        upper, middle, lower = self.bollinger.value
+        return {
+            'close': self.last_candle[4],
+            'volume': self.last_candle[5],
+            'ema9': self.ema9.value,
+            'ema21': self.ema21.value,
+            'ema50': self.ema50.value,
+            'ema200': self.ema200.value,
+            'rsi': self.rsi.value,
+            'atr': self.atr.value,
+            'macd': self.macd.line,
+            'macd_signal': self.macd.signal.value,
+            'macd_hist': self.macd.hist,
+            'macd_hist_prev': self.macd.hist_prev,
+            'volume_sma': self.volume_sma.value,
+            'bb_upper': upper,
+            'bb_middle': middle,
+            'bb_lower': lower
+        }
+
+
+class IndicatorRegistry:
+    """IndicatorSet instances keyed by (symbol, interval)"""
+
+    def __init__(self):
+        self._sets = {}
+        self._lock = threading.Lock()
+
+    def get(self, symbol, interval):
+        key = (symbol, str(interval))
+        with self._lock:
+            if key not in self._sets:
+                self._sets[key] = IndicatorSet(symbol, str(interval))
+            return self._sets[key]
+
+    def sync(self, symbol, interval, rows):
+        """Update the (symbol, interval) indicators with chronological kline rows and return them"""
+        return self.get(symbol, interval).sync(rows)
@@ -0,0 +1,117 @@
+"""
+Technical Indicator Kernels
+Array-in/array-out indicator functions shared by the trading strategies.
+All kernels take float64 NumPy arrays and avoid per-element Python loops.
+"""
+
+import numpy as np
+from scipy.signal import lfilter
+
+
+def as_float_array(values):
+    """Convert prices (list, tuple or array of numbers/strings) to a float64 array"""
+    return np.asarray(values, dtype=np.float64)
+
+
+def kline_array(rows):
+    """Convert Bybit kline rows [start, open, high, low, close, volume, turnover] to a 2-D float64 array"""
+    return np.asarray(rows, dtype=np.float64).reshape(len(rows), -1)
+
+
+def candle_field(candles, field):
+    """Extract one field from a list of candle dicts as a float64 array"""
+    return np.fromiter((float(c[field]) for c in candles), dtype=np.float64, count=len(candles))
+
+
+def ema(prices, period):
+    """Exponential Moving Average seeded with the first price"""
+    prices = as_float_array(prices)
+    out = np.empty_like(prices)
+    if len(prices) == 0:
+        return out
+    alpha = 2 / (period + 1)
+    out[0] = prices[0]
+    if len(prices) > 1:
+        # Same recursion as price * alpha + ema[-1] * (1 - alpha)
+        out[1:] = lfilter([alpha], [1.0, -(1 - alpha)], prices[1:], zi=[(1 - alpha) * prices[0]])[0]
+    return out
+
+
+def sma(values, period):
+    """Simple Moving Average over complete windows only (numpy 'valid' mode)"""
+    values = as_float_array(values)
+    if len(values) < period:
+        return np.empty(0)
+    return np.convolve(values, np.ones(period) / period, mode='valid')
+
+
+def _wilder_smooth(values, period, seed):
+    """Wilder smoothing: avg[n] = (avg[n-1] * (period - 1) + x[n]) / period, starting from seed"""
+    return lfilter([1.0 / period], [1.0, -(period - 1) / period], values, zi=[seed * (period - 1) / period])[0]
+
+
+def wilder_averages(prices, period):
+    """Wilder-smoothed average gain/loss series aligned to indices period..n-1 of prices"""
+    prices = as_float_array(prices)
+    deltas = np.diff(prices)
+    seed = deltas[:period + 1]
+    up = seed[seed >= 0].sum() / period
+    down = -seed[seed < 0].sum() / period
+
+    ups = np.empty(len(prices) - period)
+    downs = np.empty(len(prices) - period)
+    ups[0], downs[0] = up, down
+    if len(ups) > 1:
+        tail = deltas[period:len(prices) - 1]
+        ups[1:] = _wilder_smooth(np.maximum(tail, 0.0), period, up)
+        downs[1:] = _wilder_smooth(np.maximum(-tail, 0.0), period, down)
+    return ups, downs
+
+
+def rsi_from_averages(ups, downs):
+    """RSI value(s) from average gain/loss (no losses means RSI 100)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = np.where(downs != 0, np.divide(ups, downs), np.inf)
+    return 100. - 100. / (1. + rs)
+
+
+def rsi(prices, period=21):
+    """Relative Strength Index with Wilder smoothing (values before index `period` are 0)"""
+    prices = as_float_array(prices)
+    ups, downs = wilder_averages(prices, period)
+    out = np.zeros_like(prices)
+    out[period:] = rsi_from_averages(ups, downs)
+    return out
+
+
+def true_range(high, low, close):
+    """True range using the previous close (the first bar wraps to the last close, as np.roll does)"""
+    high, low, close = as_float_array(high), as_float_array(low), as_float_array(close)
+    prev_close = np.roll(close, 1)
+    return np.maximum(np.maximum(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+
+
+def atr(high, low, close, period=21):
+    """Average True Range with Wilder smoothing (values before index `period - 1` are 0)"""
+    tr = true_range(high, low, close)
+    out = np.zeros_like(tr)
+    out[period - 1] = np.mean(tr[:period])
+    if len(tr) > period:
+        out[period:] = _wilder_smooth(tr[period:], period, out[period - 1])
+    return out
+
+
+def mean_true_range(high, low, close):
+    """Plain mean of the true range over a window (first bar only provides the previous close)"""
+    high, low, close = as_float_array(high), as_float_array(low), as_float_array(close)
+    prev_close = close[:-1]
+    tr = np.maximum(np.maximum(high[1:] - low[1:], np.abs(high[1:] - prev_close)), np.abs(low[1:] - prev_close))
+    return float(np.mean(tr))
+
+
+def macd(prices, fast=12, slow=26, signal=9):
+    """MACD line, signal line and histogram"""
+    prices = as_float_array(prices)
+    macd_line = ema(prices, fast) - ema(prices, slow)
+    signal_line = ema(macd_line, signal)
+    return macd_line, signal_line, macd_line - signal_line
@@ -0,0 +1,238 @@
+"""
+Kline Cache
+Shared per-(symbol, interval) candle cache backed by contiguous NumPy ring
+buffers. After the first download only bars at or after the last cached open
+time are requested, so the in-progress candle is refreshed and new candles are
+appended without re-downloading known history.
+"""
+
+import logging
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger('kline_cache')
+
+# Column layout of every cached row (same order as Bybit kline rows)
+START, OPEN, HIGH, LOW, CLOSE, VOLUME, TURNOVER = range(7)
+KLINE_COLUMNS = 7
+
+# Bybit accepts at most 1000 klines per request
+MAX_KLINE_LIMIT = 1000
+
+# Dashboard-style interval names mapped to Bybit interval codes
+INTERVAL_ALIASES = {
+    '1m': '1', '3m': '3', '5m': '5', '15m': '15', '30m': '30',
+    '1h': '60', '2h': '120', '4h': '240', '6h': '360', '12h': '720',
+    '1d': 'D', '1w': 'W', '1M': 'M'
+}
+
+INTERVAL_MS = {
+    'D': 86400000,
+    'W': 7 * 86400000,
+    'M': 31 * 86400000
+}
+
+
+def normalize_interval(interval):
+    """Return the Bybit interval code for an interval name like '1h' or '60'"""
+    interval = str(interval)
+    return INTERVAL_ALIASES.get(interval, interval)
+
+
+def interval_to_ms(interval):
+    """Length of one candle in milliseconds"""
+    interval = normalize_interval(interval)
+    if interval in INTERVAL_MS:
+        return INTERVAL_MS[interval]
+    return int(interval) * 60000
+
+
+class KlineBuffer:
+    """
+    Fixed-capacity ring buffer of kline rows. Every row is written twice
+    (at i and i + capacity) so the newest N rows are always one contiguous slice.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.data = np.zeros((2 * capacity, KLINE_COLUMNS), dtype=np.float64)
+        self.count = 0
+        self.head = 0  # Index of the next write position (mod capacity)
+        self.fetched_at = 0.0
+        self.history_exhausted = False  # Exchange had fewer bars than requested
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def last_start(self):
+        if not self.count:
+            return None
+        return int(self.data[(self.head - 1) % self.capacity, START])
+
+    def clear(self):
+        self.count = 0
+        self.head = 0
+        self.history_exhausted = False
+
+    def _write(self, pos, row):
+        self.data[pos] = row
+        self.data[pos + self.capacity] = row
+
+    def append(self, row):
+        self._write(self.head, row)
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def replace_last(self, row):
+        self._write((self.head - 1) % self.capacity, row)
+
+    def merge(self, rows):
+        """Merge chronological rows: revise the last cached bar, append newer ones"""
+        last_start = self.last_start
+        for row in rows:
+            start = row[START]
+            if last_start is not None and start < last_start:
+                continue
+            if start == last_start:
+                self.replace_last(row)
+            else:
+                self.append(row)
+                last_start = start
+
+    def latest(self, limit):
+        """Copy of the newest `limit` rows, oldest first"""
+        limit = min(limit, self.count)
+        end = self.head + self.capacity if self.head < limit else self.head
+        return self.data[end - limit:end].copy()
+
+
+class KlineCache:
+    """Kline cache shared by the dashboard and the strategy loop"""
+
+    def __init__(self, client=None, capacity=500, max_capacity=20000, min_refresh=1.0, category="linear",
+                 clock=time.time):
+        self.client = client
+        self.capacity = capacity          # Initial rows kept per (symbol, interval)
+        self.max_capacity = max_capacity  # Buffers grow up to this when deeper history is requested
+        self.min_refresh = min_refresh  # Seconds during which repeated reads skip the exchange
+        self.category = category
+        self.clock = clock  # Replaced by a virtual clock in replays
+        self._buffers = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def _entry(self, symbol, interval):
+        key = (symbol, interval)
+        with self._lock:
+            if key not in self._buffers:
+                self._buffers[key] = KlineBuffer(self.capacity)
+                self._locks[key] = threading.Lock()
+            return key, self._locks[key]
+
+    def _fetch(self, symbol, interval, limit, start=None):
+        """Download klines and return them as a chronological float64 array"""
+        params = {
+            "category": self.category,
+            "symbol": symbol,
+            "interval": interval,
+            "limit": min(limit, MAX_KLINE_LIMIT)
+        }
+        if start is not None:
+            params["start"] = int(start)
+        response = self.client.get_kline(**params)
+        if response.get('retCode') != 0:
+            raise RuntimeError(f"Kline request failed: {response.get('retMsg')}")
+        rows = response.get('result', {}).get('list') or []
+        if not rows:
+            return np.empty((0, KLINE_COLUMNS))
+        # Bybit returns newest first
+        return np.asarray(rows, dtype=np.float64)[::-1, :KLINE_COLUMNS]
+
+    def _fetch_history(self, symbol, interval, limit):
+        """Download the newest `limit` klines, paging backwards past the per-request maximum"""
+        pages = []
+        remaining = limit
+        end = None
+        while remaining > 0:
+            params = {
+                "category": self.category,
+                "symbol": symbol,
+                "interval": interval,
+                "limit": min(remaining, MAX_KLINE_LIMIT)
+            }
+            if end is not None:
+                params["end"] = end
+            response = self.client.get_kline(**params)
+            if response.get('retCode') != 0:
+                raise RuntimeError(f"Kline request failed: {response.get('retMsg')}")
+            rows = response.get('result', {}).get('list') or []
+            if not rows:
+                break
+            page = np.asarray(rows, dtype=np.float64)[::-1, :KLINE_COLUMNS]
+            if pages:
+                page = page[page[:, START] < pages[-1][0, START]]
+                if not len(page):
+                    break
+            pages.append(page)
+            remaining -= len(page)
+            if len(rows) < params["limit"]:
+                break
+            end = int(page[0, START]) - 1
+        if not pages:
+            return np.empty((0, KLINE_COLUMNS))
+        return np.concatenate(pages[::-1])
+
+    def get(self, symbol, interval, limit=200):
+        """
+        Return the newest `limit` klines for symbol/interval as a chronological
+        float64 array with columns [start, open, high, low, close, volume, turnover].
+        """
+        interval = normalize_interval(interval)
+        limit = min(limit, self.max_capacity)
+        key, lock = self._entry(symbol, interval)
+
+        with lock:
+            buffer = self._buffers[key]
+            if limit > buffer.capacity:
+                buffer = self._buffers[key] = KlineBuffer(limit)
+            now = self.clock()
+            enough = len(buffer) >= limit or buffer.history_exhausted
+            if enough and now - buffer.fetched_at < self.min_refresh:
+                return buffer.latest(limit)
+
+            last_start = buffer.last_start
+            missing = None
+            if last_start is not None:
+                # Bars since the last cached open time (at least the revised one plus a new one)
+                missing = max(int((now * 1000 - last_start) // interval_to_ms(interval)), 1) + 1
+
+            if last_start is None or not enough or missing >= MAX_KLINE_LIMIT:
+                # Cold start, deeper history requested or too far behind: full download
+                rows = self._fetch_history(symbol, interval, limit)
+                buffer.clear()
+                buffer.history_exhausted = len(rows) < limit
+            else:
+                rows = self._fetch(symbol, interval, missing, start=last_start)
+                if len(rows) and rows[0, START] > last_start:
+                    # The delta did not reach back to the cached bar (clock skew): reload
+                    rows = self._fetch_history(symbol, interval, limit)
+                    buffer.clear()
+                    buffer.history_exhausted = len(rows) < limit
+            buffer.merge(rows)
+            buffer.fetched_at = now
+            return buffer.latest(limit)
+
+    def invalidate(self, symbol=None, interval=None):
+        """Drop cached candles (all, one symbol, or one symbol/interval)"""
+        with self._lock:
+            entries = [(key, self._locks[key]) for key in self._buffers]
+        for key, lock in entries:
+            if symbol is not None and key[0] != symbol:
+                continue
+            if interval is not None and key[1] != normalize_interval(interval):
+                continue
+            with lock:
+                self._buffers[key].clear()
@@ -0,0 +1,129 @@
+"""
+Live Feed
+One producer task samples the dashboard state (balance, prices, open positions,
+profit metrics) and fans changes out to every connected WebSocket client. Each
+sample is diffed against the last one and encoded once, so N dashboards cost a
+single state read per tick instead of N sets of polled HTTP requests. Trade
+writes wake the producer immediately, so opens and closes are pushed without
+waiting for the next tick.
+"""
+
+import asyncio
+import json
+import logging
+
+logger = logging.getLogger('live_feed')
+
+
+def _changes(old, new):
+    """(changed entries, removed keys) between two dicts"""
+    changed = {k: v for k, v in new.items() if old.get(k) != v}
+    removed = [k for k in old if k not in new]
+    return changed, removed
+
+
+class LiveFeed:
+    """
+    Fan-out of state diffs to subscriber queues. Messages are JSON strings:
+    {"type": "snapshot" | "diff", "set": {channel: value}, "removed": {channel: [keys]}}.
+    Keyed channels (e.g. prices, positions) are diffed entry by entry; other
+    channels are sent whole whenever they change.
+    """
+
+    def __init__(self, keyed=(), interval=2.0, queue_size=32):
+        self.keyed = set(keyed)
+        self.interval = interval      # Seconds between samples while clients are connected
+        self.queue_size = queue_size  # Pending messages before a slow client is resynced
+        self.state = {}
+        self.trade_events = 0         # Bumped by trade writes; lets collectors refresh derived data
+        self.published = 0
+        self._clients = set()
+        self._pending = set()         # Clients owed a full snapshot
+        self._loop = None
+        self._wake = None
+
+    def subscribe(self) -> asyncio.Queue:
+        """Register a client; its first message is a full snapshot"""
+        queue = asyncio.Queue(self.queue_size)
+        self._clients.add(queue)
+        self._pending.add(queue)
+        self.poke()
+        return queue
+
+    def unsubscribe(self, queue):
+        self._clients.discard(queue)
+        self._pending.discard(queue)
+
+    def poke(self):
+        """Wake the producer now (safe to call from any thread)"""
+        if self._loop is not None and self._wake is not None:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    def on_trade_event(self, event, trade_id, fields):
+        """database trade listener: push opens, closes and edits without waiting for the tick"""
+        self.trade_events += 1
+        self.poke()
+
+    def diff(self, new):
+        """Message body with what changed since the last published state, or None"""
+        changes, removals = {}, {}
+        for channel, value in new.items():
+            old = self.state.get(channel)
+            if channel in self.keyed:
+                changed, removed = _changes(old or {}, value)
+                if changed:
+                    changes[channel] = changed
+                if removed:
+                    removals[channel] = removed
+            elif value != old:
+                changes[channel] = value
+        if not changes and not removals:
+            return None
+        return {'type': 'diff', 'set': changes, 'removed': removals}
+
+    def _send(self, queue, message):
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Too far behind for diffs to be useful: drop the backlog and resync
+            while not queue.empty():
+                queue.get_nowait()
+            self._pending.add(queue)
+
+    def publish(self, new):
+        """Send diffs of new against the last state to clients, snapshots to pending ones"""
+        body = self.diff(new)
+        self.state = new
+        snapshot = None
+        if self._pending:
+            snapshot = json.dumps({'type': 'snapshot', 'set': new, 'removed': {}})
+        diff = json.dumps(body) if body else None
+        pending, self._pending = self._pending, set()
+        for queue in list(self._clients):
+            if queue in pending:
+                self._send(queue, snapshot)
+            elif diff:
+                self._send(queue, diff)
+        self.published += 1
+
+    async def run(self, collect):
+        """Producer loop: sample with collect() and publish while anyone is listening"""
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        while True:
+            if self._clients:
+                try:
+                    self.publish(await collect())
+                except Exception as e:
+                    logger.warning(f"Live feed sample failed: {e}")
+            else:
+                self.state = {}  # Nobody to diff for; the next client gets a fresh snapshot
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.interval if self._clients else None)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def stats(self):
+        """Counters for diagnostics"""
+        return {'clients': len(self._clients), 'published': self.published, 'trade_events': self.trade_events}
@@ -1,23 +1,31 @@
 # main.py
-from fastapi import FastAPI, BackgroundTasks, Request
-from fastapi.responses import FileResponse
+from fastapi import FastAPI, BackgroundTasks, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import FileResponse, Response, JSONResponse
 from fastapi.staticfiles import StaticFiles
+from fastapi.middleware.gzip import GZipMiddleware
 from dotenv import load_dotenv  # Environment variables loader
 import uvicorn
 import asyncio  # Add asyncio for sleep
 import time    # Add time for timestamps
 import json
 import os
-import sqlite3
+import hashlib
+import orjson
+import numpy as np
 from pydantic import BaseModel
 
 # 🚨 MUST BE FIRST! Load environment variables before other imports
 load_dotenv()
 
 from strategies_v2 import TradingStrategy
-from database import save_trade, get_active_trades, get_closed_trades, update_trade_settings
+from database import save_trade, get_active_trades, get_closed_trades, query_trades, update_trade_settings, get_connection, close_connections, add_trade_listener
 from security import validate_keys
 from risk_manager import RiskManager
+from exchange import AsyncExchange
+from positions_book import PositionsBook
+from price_store import to_epoch_ms
+from live_feed import LiveFeed
+from response_cache import ResponseCache
 
 # Initialize FastAPI app
 app = FastAPI()
@@ -33,6 +41,15 @@ DEBUG_MODE = True     # Set to True for detailed debug logs
 DEMO_MODE = False     # Set to False to use real trading strategy
 DEMO_INTERVAL = 120   # Seconds between demo trades (not used when DEMO_MODE is False)
 SIMULATION_MODE = False # Set to False to execute actual trades on testnet
+SCAN_CONCURRENCY = 8  # Maximum symbols evaluated at the same time
+SCAN_TIMEOUT = 20     # Seconds before a single symbol's evaluation is abandoned
+CORRELATION_INTERVAL = "30"  # Kline interval the position correlation check is measured on
+EXCHANGE_WORKERS = 16 # Threads for blocking exchange calls (keeps the event loop free)
+BALANCE_TTL = 5       # Seconds a fetched wallet balance is reused by dashboard requests
+LIVE_INTERVAL = 2     # Seconds between live feed samples (matches the ticker snapshot TTL)
+PROFITS_INTERVAL = 60 # Seconds profit metrics are reused by the live feed between trade writes
+TRADES_PAGE_SIZE = 100  # Default /trades page length
+MAX_TRADES_PAGE = 1000  # Longest /trades page a client may request
 # ===================================
 
 # Initialize API credentials with error handling
@@ -57,6 +74,26 @@ except Exception as e:
 # Initialize services
 strategy = TradingStrategy(API_KEY, API_SECRET)  # Initialize with API credentials
 risk_mgmt = RiskManager()
+exchange = AsyncExchange(lambda: strategy.client, max_workers=EXCHANGE_WORKERS)
+live_feed = LiveFeed(keyed=("prices", "positions"), interval=LIVE_INTERVAL)
+scan_slots = asyncio.Semaphore(SCAN_CONCURRENCY)  # Shared across cycles so abandoned evaluations still count
+
+# Read routes served from memory: path -> (TTL seconds, invalidated by trade writes / config writes)
+response_cache = ResponseCache({
+    "/profits": (30, {"trades"}),
+    "/trades": (30, {"trades"}),
+    "/settings": (300, {"config"}),
+    "/chart_data": (10, set())
+})
+app.middleware("http")(response_cache.middleware)
+
+# Compress everything sizeable (added last, so cached responses are compressed on the way out)
+app.add_middleware(GZipMiddleware, minimum_size=1024, compresslevel=6)
+
+class ORJSONResponse(JSONResponse):
+    """JSON response serialized with orjson (several times faster than json for large payloads)"""
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
 
 # Pydantic models for settings
 class Settings(BaseModel):
@@ -115,13 +152,130 @@ def get_balance() -> float:
         print(f"Debug: Error in get_balance(): {str(e)}")
         return 1000.0  # Default testnet balance
 
+_balance_cache = {"value": None, "fetched_at": 0.0}
+
+def get_cached_balance() -> float:
+    """Wallet balance, refetched at most once every BALANCE_TTL seconds"""
+    if _balance_cache["value"] is None or time.time() - _balance_cache["fetched_at"] >= BALANCE_TTL:
+        _balance_cache["value"] = get_balance()
+        _balance_cache["fetched_at"] = time.time()
+    return _balance_cache["value"]
+
+def sync_correlations(symbols) -> None:
+    """Feed newly closed bars of symbols into the risk manager's correlation tracker"""
+    klines = {}
+    for symbol in symbols:
+        try:
+            klines[symbol] = strategy.kline_cache.get(symbol, CORRELATION_INTERVAL,
+                                                      limit=risk_mgmt.correlation.window + 2)
+        except Exception as e:
+            print(f"⚠️ Correlation data for {symbol} unavailable: {e}")
+    risk_mgmt.correlation.sync(klines)
+
+def _number(value):
+    """JSON-safe float (NaN, e.g. PnL of a position without a price, becomes None)"""
+    return None if value is None or value != value else float(value)
+
+def mark_positions(trades, marks) -> dict:
+    """Trade id -> open trade with its current price, unrealized PnL and PnL % (from PositionsBook.evaluate)"""
+    positions = {}
+    for i, trade in enumerate(trades):
+        positions[trade[0]] = {
+            "symbol": trade[1],
+            "side": trade[2],
+            "size": float(trade[3]),
+            "entry_price": float(trade[4]),
+            "stop_loss": trade[9],
+            "take_profit": trade[10],
+            "price": _number(marks['price'][i]),
+            "pnl": _number(marks['pnl'][i]),
+            "pnl_pct": _number(marks['pnl_pct'][i])
+        }
+    return positions
+
+def parse_time(value):
+    """Epoch milliseconds for a query parameter given as epoch seconds/ms or a date string"""
+    if value is None or value == "":
+        return None
+    return to_epoch_ms(int(value)) if value.lstrip("-").isdigit() else to_epoch_ms(value)
+
+def pack_candles(candles) -> bytes:
+    """
+    Binary chart payload, little-endian: uint32 count n, then int32 time[n]
+    (epoch seconds) and float32 open[n], high[n], low[n], close[n]. Every block
+    is 4-byte aligned, so the browser reads each one as a typed-array view.
+    """
+    return (np.uint32(len(candles)).astype('<u4').tobytes()
+            + candles[:, 0].astype('<i4').tobytes()
+            + candles[:, 1:5].T.astype('<f4').tobytes())
+
+def candle_response(candles, since=None, format="json"):
+    """/chart_data payload for an (n, 5) array of time (s), open, high, low, close"""
+    if since is not None:
+        candles = candles[candles[:, 0] >= since]
+    if format == "binary":
+        return Response(pack_candles(candles), media_type="application/octet-stream",
+                        headers={"X-Candle-Count": str(len(candles))})
+    if format == "columns":
+        return ORJSONResponse({
+            "time": candles[:, 0].astype(np.int64).tolist(),
+            "open": candles[:, 1].tolist(),
+            "high": candles[:, 2].tolist(),
+            "low": candles[:, 3].tolist(),
+            "close": candles[:, 4].tolist()
+        })
+    return {"candles": [
+        {'time': int(c[0]), 'open': float(c[1]), 'high': float(c[2]), 'low': float(c[3]), 'close': float(c[4])}
+        for c in candles
+    ]}
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if the request's If-None-Match already names etag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [t.strip().removeprefix("W/") for t in header.split(",")]
+    return "*" in tags or etag in tags
+
+_live_profits = {"value": None, "trade_events": -1, "fetched_at": 0.0}
+
+async def collect_live_state() -> dict:
+    """One sample of everything the dashboard shows live, for the live feed"""
+    from database import get_profit_metrics
+    trades = get_active_trades()
+    book = PositionsBook.from_trades(trades)
+    prices = await exchange.run(strategy.tickers.prices, sorted(set(book.unique_symbols) | {SYMBOL}))
+    marks = book.evaluate(prices)
+    base_balance = await exchange.run(get_cached_balance)
+    unrealized_pnl = book.unrealized_pnl(marks['price'])
+    
+    if (_live_profits["trade_events"] != live_feed.trade_events
+            or time.time() - _live_profits["fetched_at"] >= PROFITS_INTERVAL):
+        metrics = get_profit_metrics()
+        if "error" not in metrics:
+            _live_profits["value"] = metrics
+            _live_profits["trade_events"] = live_feed.trade_events
+            _live_profits["fetched_at"] = time.time()
+        elif _live_profits["value"] is None:
+            _live_profits["value"] = metrics  # Nothing better to show; retried on the next sample
+    
+    return {
+        "balance": {
+            "balance": base_balance + unrealized_pnl,
+            "base_balance": base_balance,
+            "unrealized_pnl": unrealized_pnl
+        },
+        "prices": prices,
+        "positions": mark_positions(trades, marks),
+        "profits": _live_profits["value"]
+    }
+
 def get_current_price(symbol: str) -> float:
     """Get latest price for trading pair"""
-    ticker = strategy.client.get_tickers(
-        category="linear",
-        symbol=symbol
-    )
-    return float(ticker['result']['list'][0]['lastPrice'])
+    price = strategy.tickers.price(symbol)
+    if price is None:
+        raise ValueError(f"No ticker for {symbol}")
+    return price
 
 # Add this somewhere appropriate, before the routes
 CONFIG_FILE = "config.json"
@@ -142,6 +296,7 @@ def save_config(config_data):
     try:
         with open(CONFIG_FILE, 'w') as file:
             json.dump(config_data, file, indent=4)
+        response_cache.invalidate("config")
         return True
     except Exception as e:
         print(f"Error saving config: {e}")
@@ -153,14 +308,24 @@ async def initialize():
     """Initialize leverage settings for all symbols we might trade."""
     print("🔧 Initializing trading bot...")
     
+    # Open-trade risk totals: load once, then follow every trade write
+    risk_mgmt.exposure.default_leverage = LEVERAGE
+    risk_mgmt.exposure.rebuild(get_active_trades())
+    add_trade_listener(risk_mgmt.exposure.on_trade_event)
+    
     # Start background task for monitoring profitable trades
     asyncio.create_task(profitable_trades_monitor())
     
+    # Single producer for every /ws client; trade writes push immediately
+    add_trade_listener(live_feed.on_trade_event)
+    add_trade_listener(response_cache.on_trade_event)
+    asyncio.create_task(live_feed.run(collect_live_state))
+    
     try:
         symbols = ['BTCUSDT', 'ETHUSDT', 'AAVEUSDT', 'APEXUSDT']  # Common symbols we might trade
         for symbol in symbols:
             try:
-                strategy.client.set_leverage(
+                await exchange.set_leverage(
                     category="linear",
                     symbol=symbol,
                     buyLeverage=str(LEVERAGE),
@@ -192,7 +357,7 @@ async def initialize():
                 for symbol in symbols:
                     # Current price will be our base
                     try:
-                        current_price = get_current_price(symbol)
+                        current_price = await exchange.run(get_current_price, symbol)
                     except:
                         if symbol == "BTCUSDT":
                             current_price = 60000
@@ -267,6 +432,12 @@ async def initialize():
     except Exception as e:
         print(f"⚠️ Initialization warning: {e}\nContinuing with default leverage settings.")
 
+@app.on_event("shutdown")
+async def shutdown():
+    """Release the exchange worker threads and database connections"""
+    exchange.shutdown()
+    close_connections()
+
 # ========== ROUTES ==========
 @app.get("/")
 async def dashboard():
@@ -274,46 +445,29 @@ async def dashboard():
     return FileResponse("static/index.html")
 
 @app.get("/chart_data")
-async def get_chart_data(symbol: str = "BTCUSDT", interval: str = "1h", limit: int = 168):
-    """Get historical price data for chart"""
+async def get_chart_data(symbol: str = "BTCUSDT", interval: str = "1h", limit: int = 168,
+                         since: int = None, format: str = "json"):
+    """
+    Get historical price data for chart. format=json (candle objects), columns
+    (parallel arrays) or binary (see pack_candles); since= (epoch seconds) returns
+    only candles opened at or after it, for incremental refreshes.
+    """
     try:
-        # First try to fetch kline/candlestick data from Bybit API
+        # First try the shared kline cache (only new candles are downloaded)
+        rows = None
         try:
-            kline_data = strategy.client.get_kline(
-                category="linear",
-                symbol=symbol,
-                interval=interval, # 1h = 1 hour, 1d = 1 day, etc.
-                limit=limit # get up to 200 candles
-            )
+            rows = await exchange.run(strategy.kline_cache.get, symbol, interval, limit)
         except Exception as api_error:
             print(f"API error: {api_error}, skipping to demo data generation")
-            kline_data = {"retCode": -1, "retMsg": str(api_error)}
         
         # Format data for lightweight-charts (time in seconds, OHLC prices)
-        if kline_data['retCode'] == 0 and kline_data.get('result', {}).get('list'):
-            # Bybit returns data in reverse chronological order (newest first)
-            # We need to reverse it for the chart
-            candles = []
-            
-            # Iterate through kline data and format for chart
-            for candle in reversed(kline_data['result']['list']):
-                # Bybit kline order: timestamp, open, high, low, close, volume, turnover
-                timestamp_ms = int(candle[0])
-                timestamp_s = timestamp_ms // 1000
-                
-                candle_obj = {
-                    'time': timestamp_s,
-                    'open': float(candle[1]),
-                    'high': float(candle[2]),
-                    'low': float(candle[3]),
-                    'close': float(candle[4])
-                }
-                candles.append(candle_obj)
-            
-            return {"candles": candles}
+        if rows is not None and len(rows):
+            # Cached rows are already oldest first: timestamp, open, high, low, close, volume, turnover
+            candles = np.column_stack((rows[:, 0] // 1000, rows[:, 1:5]))
+            return candle_response(candles, since, format)
         else:
             # If API call failed, generate demo data
-            print(f"API error: {kline_data.get('retMsg')}, generating demo chart data")
+            print("No kline data available, generating demo chart data")
             
             # Generate 48 hours of demo data
             base_price = 60000.0  # Base price for BTC or other assets
@@ -354,11 +508,12 @@ async def get_chart_data(symbol: str = "BTCUSDT", interval: str = "1h", limit: i
                 # Update base price for next candle
                 base_price = close_price
                 
-            return {"candles": candles}
+            candles = np.array([[c['time'], c['open'], c['high'], c['low'], c['close']] for c in candles]).reshape(-1, 5)
+            return candle_response(candles, since, format)
             
     except Exception as e:
         print(f"Error getting chart data: {e}")
-        return {"error": str(e)}
+        return ORJSONResponse({"error": str(e)}, status_code=500)
 
 @app.post("/start")
 async def start_bot(background_tasks: BackgroundTasks):
@@ -378,45 +533,24 @@ async def stop_bot():
     return {"status": "Trading bot stopped"}
 
 @app.get("/balance")
-def get_balance_api():
+async def get_balance_api():
     """API endpoint to get current USDT wallet balance + unrealized PnL from trades"""
     try:
         # Get base balance from exchange
-        base_balance = get_balance()
+        base_balance = await exchange.run(get_cached_balance)
         print(f"Debug: Fetched base balance = {base_balance}")
         
         # Calculate unrealized PnL from active trades
-        active_trades = get_active_trades()
+        book = PositionsBook.from_trades(get_active_trades())
         unrealized_pnl = 0
         
-        for trade in active_trades:
-            symbol = trade[1]
-            side = trade[2]
-            size = float(trade[3])
-            entry_price = float(trade[4])
-            
-            # Get current price for the symbol
+        # One ticker snapshot prices every open trade
+        if len(book):
             try:
-                price_data = strategy.client.get_tickers(
-                    category="linear",
-                    symbol=symbol
-                )
-                
-                if price_data['retCode'] == 0 and price_data.get('result', {}).get('list'):
-                    current_price = float(price_data['result']['list'][0]['lastPrice']);
-                    
-                    # Calculate trade PnL
-                    if side == "Buy":
-                        trade_pnl = size * (current_price - entry_price)
-                    else:  # Sell
-                        trade_pnl = size * (entry_price - current_price)
-                    
-                    print(f"Debug: Unrealized PnL for {symbol}: {trade_pnl:.2f}")
-                    unrealized_pnl += trade_pnl
+                prices = await exchange.run(strategy.tickers.prices, book.unique_symbols)
+                unrealized_pnl = book.unrealized_pnl(prices)
             except Exception as e:
-                print(f"Debug: Error calculating unrealized PnL for {symbol}: {e}")
-                # Continue with other trades
-                pass
+                print(f"Debug: Error calculating unrealized PnL: {e}")
         
         # Calculate total balance including unrealized PnL
         total_balance = base_balance + unrealized_pnl
@@ -431,13 +565,75 @@ def get_balance_api():
         print(f"Debug: Balance fetch error = {str(e)}")
         return {"balance": None, "error": str(e)}
 
-@app.get("/trades")
-async def trade_history():
-    """Get trade history"""
-    return {
-        "active_trades": get_active_trades(),
-        "closed_trades": get_closed_trades()
-    }
+@app.websocket("/ws")
+async def live_updates(websocket: WebSocket):
+    """Push balance, price, position PnL and profit changes to the dashboard"""
+    await websocket.accept()
+    queue = live_feed.subscribe()
+    try:
+        while True:
+            # Messages are encoded once by the producer and shared by every client
+            await websocket.send_text(await queue.get())
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        live_feed.unsubscribe(queue)
+
+@app.get("/positions")
+async def open_positions(request: Request):
+    """Open trades priced from one ticker snapshot, with ETag revalidation"""
+    trades = get_active_trades()
+    book = PositionsBook.from_trades(trades)
+    prices = {}
+    if len(book):
+        try:
+            prices = await exchange.run(strategy.tickers.prices, book.unique_symbols)
+        except Exception as e:
+            print(f"Debug: Error pricing positions: {e}")
+    marks = book.evaluate(prices)
+    positions = mark_positions(trades, marks)
+    body = json.dumps({
+        "positions": [{"id": trade_id, **position} for trade_id, position in positions.items()],
+        "unrealized_pnl": book.unrealized_pnl(marks['price'])
+    }).encode()
+    
+    # Unchanged payloads are answered with an empty 304
+    etag = f'"{hashlib.sha1(body).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+@app.get("/trades", response_class=ORJSONResponse)
+async def trade_history(status: str = None, symbol: str = None, start: str = None, end: str = None,
+                        fields: str = None, limit: int = TRADES_PAGE_SIZE, cursor: str = None):
+    """
+    Trade history, newest first, one page at a time. Filters: status (open/closed),
+    symbol, start/end (epoch ms or date). `fields` is a comma-separated projection;
+    pass the returned next_cursor back as `cursor` for the following page.
+    """
+    try:
+        if status not in (None, "open", "closed"):
+            raise ValueError(f"Unknown status {status}")
+        after = None
+        if cursor:
+            timestamp, _, trade_id = cursor.partition(":")
+            after = (int(timestamp), trade_id)
+        trades, last = query_trades(
+            status=status,
+            symbol=symbol,
+            start=parse_time(start),
+            end=parse_time(end),
+            fields=[f.strip() for f in fields.split(",") if f.strip()] if fields else None,
+            limit=max(1, min(limit, MAX_TRADES_PAGE)),
+            after=after
+        )
+    except ValueError as e:
+        return ORJSONResponse({"error": str(e)}, status_code=400)
+    return ORJSONResponse({
+        "trades": trades,
+        "next_cursor": f"{last[0]}:{last[1]}" if last else None
+    })
 
 @app.post("/close_trade")
 async def close_trade_endpoint(trade_id: str):
@@ -446,35 +642,22 @@ async def close_trade_endpoint(trade_id: str):
         print(f"Attempting to close trade: {trade_id}")
         
         # Find the trade in active trades
-        active_trades = get_active_trades()
-        target_trade = None
-        
-        for trade in active_trades:
-            if trade[0] == trade_id:
-                target_trade = trade
-                break
+        book = PositionsBook.from_trades(get_active_trades())
+        row = book.index_of(trade_id)
         
-        if not target_trade:
+        if row is None:
             print(f"Trade not found: {trade_id}")
             return {"success": False, "message": "Trade not found"}
         
         # Get current price
-        symbol = target_trade[1]
+        symbol = book.symbols[row]
         price_data = await current_price(symbol)
         current_price_value = price_data.get("price", 0)
         
         print(f"Current price for {symbol}: {current_price_value}")
         
         # Calculate P&L
-        entry_price = float(target_trade[4])
-        size = float(target_trade[3])
-        side = target_trade[2]
-        
-        pnl = 0
-        if side == "Buy":
-            pnl = size * (current_price_value - entry_price)
-        else:  # Sell
-            pnl = size * (entry_price - current_price_value)
+        pnl = float(book.evaluate({symbol: current_price_value})['pnl'][row])
         
         print(f"Calculated PnL: {pnl}")
             
@@ -498,13 +681,9 @@ async def current_price(symbol: str = "BTCUSDT"):
     try:
         # Try to fetch from Bybit API
         try:
-            price_data = strategy.client.get_tickers(
-                category="linear",
-                symbol=symbol
-            )
+            ticker = await exchange.run(strategy.tickers.get, symbol)
             
-            if price_data['retCode'] == 0 and price_data.get('result', {}).get('list'):
-                ticker = price_data['result']['list'][0]
+            if ticker:
                 return {
                     "symbol": symbol,
                     "price": float(ticker['lastPrice']),
@@ -557,7 +736,7 @@ async def get_settings():
         }
         return settings
     except Exception as e:
-        return {"error": str(e)}
+        return JSONResponse({"error": str(e)}, status_code=500)
 
 @app.post("/settings")
 async def update_settings(settings: Settings):
@@ -571,6 +750,7 @@ async def update_settings(settings: Settings):
         DEMO_MODE = settings.demo_mode
         DEMO_INTERVAL = settings.demo_interval
         SIMULATION_MODE = settings.simulation_mode
+        response_cache.invalidate("config")  # /settings reports these globals
         
         # Update risk management with new leverage
         risk_mgmt.set_leverage(LEVERAGE)
@@ -620,9 +800,12 @@ async def get_profit_metrics():
     try:
         from database import get_profit_metrics
         metrics = get_profit_metrics()
+        if "error" in metrics:
+            # database.get_profit_metrics reports failures as zeroed metrics; don't serve (or cache) those as 200
+            return JSONResponse(metrics, status_code=500)
         return metrics
     except Exception as e:
-        return {"error": str(e)}
+        return JSONResponse({"error": str(e)}, status_code=500)
 
 @app.post("/set_trade_settings")
 async def set_trade_settings(settings: TradeSetting):
@@ -673,105 +856,156 @@ async def update_trade_settings_endpoint(request: Request):
         return {"success": False, "message": f"Error: {str(e)}"}
 
 # ========== TRADING LOGIC ==========
+def hold_result(symbol: str) -> dict:
+    """Strategy result used when a symbol could not be evaluated"""
+    return {
+        "decision": "hold",
+        "stop_loss": None,
+        "take_profit": None,
+        "price": 0,
+        "volume": 0,
+        "volatility": 0
+    }
+
+async def scan_symbols(symbols: list) -> list:
+    """Evaluate all symbols concurrently (bounded by SCAN_CONCURRENCY), results in input order"""
+    async def evaluate(symbol):
+        await scan_slots.acquire()
+        # The slot is released when the worker thread finishes, not when we stop waiting:
+        # a timed-out evaluation keeps running in the pool and still counts against the cap
+        work = asyncio.ensure_future(exchange.run(strategy.rsi_strategy, symbol))
+        work.add_done_callback(release_scan_slot)
+        try:
+            return await asyncio.wait_for(asyncio.shield(work), timeout=SCAN_TIMEOUT)
+        except asyncio.TimeoutError:
+            print(f"⚠️ {symbol} evaluation timed out after {SCAN_TIMEOUT}s, holding")
+        except Exception as e:
+            print(f"⚠️ {symbol} evaluation failed: {e}")
+        return hold_result(symbol)
+    
+    return await asyncio.gather(*(evaluate(symbol) for symbol in symbols))
+
+def release_scan_slot(work: asyncio.Future):
+    """Done callback of a symbol evaluation: free its slot and consume a late error"""
+    scan_slots.release()
+    if not work.cancelled():
+        work.exception()  # Marks an error raised after the timeout as retrieved
+
+async def run_strategy_cycle(demo_counter: int = 0) -> int:
+    """One scan of the top symbols: evaluate, size and place orders; returns the updated demo counter"""
+    # Get top 3 coins by 24h volume (excluding BTCUSDT)
+    top_symbols = await exchange.run(strategy.get_top_symbols, top_n=3)
+    print(f"📊 Scanning top symbols: {top_symbols}")
+    balance = await exchange.run(get_balance)
+    print(f"💰 Current balance: {balance} USDT")
+    
+    # Force a trade every DEMO_INTERVAL seconds when in demo mode
+    force_trade = False
+    if DEMO_MODE:
+        demo_counter += 1
+        if demo_counter >= (DEMO_INTERVAL // 60):  # Convert seconds to cycles
+            print(f"🔄 Demo mode: Forcing a trade for testing")
+            force_trade = True
+            demo_counter = 0  # Reset counter
+    
+    # Fetch and evaluate every symbol concurrently, then act on them in order
+    scan_results = await scan_symbols(top_symbols)
+    
+    # Correlations against the open positions gate every new entry
+    open_symbols = [trade[1] for trade in get_active_trades()]
+    await exchange.run(sync_correlations, set(top_symbols) | set(open_symbols))
+    
+    for symbol, strategy_result in zip(top_symbols, scan_results):
+        decision = strategy_result["decision"]
+        price = strategy_result["price"]
+        stop_loss = strategy_result["stop_loss"]
+        take_profit = strategy_result["take_profit"]
+        
+        print(f"🤖 {symbol} decision: {decision}, Stop Loss: {stop_loss}, Take Profit: {take_profit}")
+        
+        # In demo mode, override hold decisions to force alternating buy/sell
+        if force_trade and decision == "hold":
+            # Use demo_counter to alternate between buy and sell
+            if symbol == top_symbols[0]:  # Only force on first symbol
+                decision = "buy" if demo_counter % 2 == 0 else "sell"
+                print(f"🔄 Demo mode: Forcing {decision} decision for {symbol}")
+                
+                # Calculate stop loss and take profit for forced trades
+                price = await exchange.run(get_current_price, symbol)
+                # Simple 2% stop loss and 3% take profit for demo forced trades
+                if decision == "buy":
+                    stop_loss = price * 0.98
+                    take_profit = price * 1.03
+                else:  # sell
+                    stop_loss = price * 1.02
+                    take_profit = price * 0.97
+        
+        if decision != "hold":
+            if not price:
+                price = await exchange.run(get_current_price, symbol)
+            size = risk_mgmt.calculate_size(balance, price, stop_loss, symbol, open_symbols)
+            if not size:
+                print(f"⏭️ Skipping {decision} on {symbol}: zero size (correlation or portfolio risk limit)")
+                continue
+            print(f"📈 Placing {decision} order: {symbol}, size: {size}, price: {price}, SL: {stop_loss}, TP: {take_profit}")
+            
+            try:
+                # Always use simulation in testnet environment
+                # Simulate a successful trade
+                simulated_trade_id = f"sim-{int(time.time())}-{symbol}"
+                simulated_result = {
+                    "orderId": simulated_trade_id,
+                    "symbol": symbol,
+                    "side": "Buy" if decision == "buy" else "Sell",
+                    "orderType": "Market",
+                    "price": price,
+                    "qty": str(size),
+                    "avgPrice": price,  # Add avgPrice field that was missing
+                    "leverage": LEVERAGE,
+                    "simulated": True,
+                    "status": "Filled",
+                    "createTime": int(time.time() * 1000),
+                    "stopLoss": stop_loss,
+                    "takeProfit": take_profit
+                }
+                
+                try:
+                    # Only execute real trade if simulation mode is off
+                    if not SIMULATION_MODE:
+                        # Try real API call
+                        trade = await exchange.place_order(
+                            category="linear",
+                            symbol=symbol,
+                            side="Buy" if decision == "buy" else "Sell",
+                            orderType="Market",
+                            qty=str(size),
+                            leverage=str(LEVERAGE)
+                        )
+                        save_trade(trade['result'])
+                        print(f"✅ Real order placed successfully: {trade['result']}")
+                    else:
+                        # In simulation mode, use simulated trade
+                        save_trade(simulated_result)
+                        print(f"🔄 Simulated trade created: {simulated_trade_id}")
+                except Exception as e:
+                    # If real API call fails, fallback to simulated trade
+                    save_trade(simulated_result)
+                    print(f"🔄 Fallback to simulated trade: {simulated_trade_id}")
+                    print(f"ℹ️ Real API call failed: {e}")
+                open_symbols.append(symbol)
+            except Exception as e:
+                print(f"⚠️ Order placement error for {symbol}: {e}")
+    
+    return demo_counter
+
 async def run_strategy():
     """Core trading algorithm: trade top coins by 24h volume"""
     demo_counter = 0  # Counter for demo mode forcing trades
     
     while trading_active:
         try:
-            # Get top 3 coins by 24h volume (excluding BTCUSDT)
-            top_symbols = strategy.get_top_symbols(top_n=3)
-            print(f"📊 Scanning top symbols: {top_symbols}")
-            balance = get_balance()
-            print(f"💰 Current balance: {balance} USDT")
+            demo_counter = await run_strategy_cycle(demo_counter)
             
-            # Force a trade every DEMO_INTERVAL seconds when in demo mode
-            force_trade = False
-            if DEMO_MODE:
-                demo_counter += 1
-                if demo_counter >= (DEMO_INTERVAL // 60):  # Convert seconds to cycles
-                    print(f"🔄 Demo mode: Forcing a trade for testing")
-                    force_trade = True
-                    demo_counter = 0  # Reset counter
-            
-            for symbol in top_symbols:
-                strategy_result = strategy.rsi_strategy(symbol)
-                decision = strategy_result["decision"]
-                price = strategy_result["price"]
-                stop_loss = strategy_result["stop_loss"]
-                take_profit = strategy_result["take_profit"]
-                
-                print(f"🤖 {symbol} decision: {decision}, Stop Loss: {stop_loss}, Take Profit: {take_profit}")
-                
-                # In demo mode, override hold decisions to force alternating buy/sell
-                if force_trade and decision == "hold":
-                    # Use demo_counter to alternate between buy and sell
-                    if symbol == top_symbols[0]:  # Only force on first symbol
-                        decision = "buy" if demo_counter % 2 == 0 else "sell"
-                        print(f"🔄 Demo mode: Forcing {decision} decision for {symbol}")
-                        
-                        # Calculate stop loss and take profit for forced trades
-                        price = get_current_price(symbol)
-                        # Simple 2% stop loss and 3% take profit for demo forced trades
-                        if decision == "buy":
-                            stop_loss = price * 0.98
-                            take_profit = price * 1.03
-                        else:  # sell
-                            stop_loss = price * 1.02
-                            take_profit = price * 0.97
-                
-                if decision != "hold":
-                    if not price:
-                        price = get_current_price(symbol)
-                    size = risk_mgmt.calculate_size(balance, price, stop_loss)
-                    print(f"📈 Placing {decision} order: {symbol}, size: {size}, price: {price}, SL: {stop_loss}, TP: {take_profit}")
-                    
-                    try:
-                        # Always use simulation in testnet environment
-                        # Simulate a successful trade
-                        simulated_trade_id = f"sim-{int(time.time())}-{symbol}"
-                        simulated_result = {
-                            "orderId": simulated_trade_id,
-                            "symbol": symbol,
-                            "side": "Buy" if decision == "buy" else "Sell",
-                            "orderType": "Market",
-                            "price": price,
-                            "qty": str(size),
-                            "avgPrice": price,  # Add avgPrice field that was missing
-                            "leverage": LEVERAGE,
-                            "simulated": True,
-                            "status": "Filled",
-                            "createTime": int(time.time() * 1000),
-                            "stopLoss": stop_loss,
-                            "takeProfit": take_profit
-                        }
-                        
-                        try:
-                            # Only execute real trade if simulation mode is off
-                            if not SIMULATION_MODE:
-                                # Try real API call
-                                trade = strategy.client.place_order(
-                                    category="linear",
-                                    symbol=symbol,
-                                    side="Buy" if decision == "buy" else "Sell",
-                                    orderType="Market",
-                                    qty=str(size),
-                                    leverage=str(LEVERAGE)
-                                )
-                                save_trade(trade['result'])
-                                print(f"✅ Real order placed successfully: {trade['result']}")
-                            else:
-                                # In simulation mode, use simulated trade
-                                save_trade(simulated_result)
-                                print(f"🔄 Simulated trade created: {simulated_trade_id}")
-                        except Exception as e:
-                            # If real API call fails, fallback to simulated trade
-                            save_trade(simulated_result)
-                            print(f"🔄 Fallback to simulated trade: {simulated_trade_id}")
-                            print(f"ℹ️ Real API call failed: {e}")
-                    except Exception as e:
-                        print(f"⚠️ Order placement error for {symbol}: {e}")
-                
             # Sleep for 1 minute before next scan
             await asyncio.sleep(60)
                 
@@ -790,7 +1024,7 @@ async def check_and_close_profitable_trades():
             return
         
         # Get account balance for profit percentage calculation
-        balance = get_balance()
+        balance = await exchange.run(get_balance)
         print(f"Current balance: {balance} USDT")
         
         # Get profit metrics to determine our daily profit target progress
@@ -813,51 +1047,35 @@ async def check_and_close_profitable_trades():
             target_profit_percentage = 2.0  # Higher threshold - wait for better profits
             print(f"Still working towards daily profit target ({daily_profit_percentage:.2f}%), using standard profit threshold: {target_profit_percentage}%")
         
-        # Check each trade
-        for trade in active_trades:
-            trade_id = trade[0]
-            symbol = trade[1]
-            side = trade[2]
-            size = float(trade[3])
-            entry_price = float(trade[4])
-            
-            # Consider take profit setting - if set explicitly, prefer to wait for it
-            take_profit = trade[10]
-            if take_profit is not None and float(take_profit) > 0:
-                # If take profit is set, we should respect it and wait
-                print(f"Trade {trade_id} has explicit take profit set to {take_profit}, skipping auto-close check")
-                continue
-                
-            # Get current price for the symbol
+        # Price each traded symbol once (served from the shared ticker snapshot)
+        book = PositionsBook.from_trades(active_trades)
+        prices = {}
+        for symbol in book.unique_symbols:
             try:
                 price_data = await current_price(symbol)
-                current_price_value = float(price_data.get("price", 0))
-                
-                # Calculate P&L in USDT
-                pnl = 0
-                if side == "Buy":
-                    pnl = size * (current_price_value - entry_price)
-                else:  # Sell
-                    pnl = size * (entry_price - current_price_value)
-                
-                # Calculate P&L as percentage of position size
-                position_value = size * entry_price
-                pnl_percentage = (pnl / position_value) * 100
+                prices[symbol] = float(price_data.get("price", 0))
+            except Exception as e:
+                print(f"Error getting price for {symbol}: {str(e)}")
+        
+        # Trades with an explicit take profit wait for it; the rest close at the target
+        rows, marks = book.auto_close_candidates(prices, target_profit_percentage)
+        print(f"{len(rows)} of {len(book)} trades reached the {target_profit_percentage}% profit target")
+        
+        for row in rows:
+            trade_id = book.ids[row]
+            pnl = float(marks['pnl'][row])
+            pnl_percentage = float(marks['pnl_pct'][row])
+            try:
+                print(f"Trade {trade_id} has reached profit target: {pnl_percentage:.2f}% ({pnl:.2f} USDT)")
                 
-                print(f"Trade {trade_id} current P&L: {pnl_percentage:.2f}% ({pnl:.2f} USDT)")
+                # Close the trade
+                from database import close_trade
+                success = close_trade(trade_id, float(marks['price'][row]), pnl)
                 
-                # Check if profit target is reached
-                if pnl_percentage >= target_profit_percentage:
-                    print(f"Trade {trade_id} has reached profit target: {pnl_percentage:.2f}% ({pnl:.2f} USDT)")
-                    
-                    # Close the trade
-                    from database import close_trade
-                    success = close_trade(trade_id, current_price_value, pnl)
-                    
-                    if success:
-                        print(f"Automatically closed profitable trade {trade_id} with {pnl:.2f} USDT profit ({pnl_percentage:.2f}%)")
-                    else:
-                        print(f"Failed to auto-close trade {trade_id}")
+                if success:
+                    print(f"Automatically closed profitable trade {trade_id} with {pnl:.2f} USDT profit ({pnl_percentage:.2f}%)")
+                else:
+                    print(f"Failed to auto-close trade {trade_id}")
             except Exception as e:
                 print(f"Error checking trade {trade_id} for auto-close: {str(e)}")
                 continue
@@ -877,19 +1095,17 @@ async def profitable_trades_monitor():
 
 # ========== DIAGNOSTICS ==========
 @app.get("/diagnostics")
-def get_diagnostics():
+async def get_diagnostics():
     """API endpoint to check system diagnostics"""
     try:
         # Check database connection
         db_status = "OK"
         db_error = None
         try:
-            conn = sqlite3.connect('trades.db')
-            cursor = conn.cursor()
+            cursor = get_connection().cursor()
             cursor.execute("SELECT COUNT(*) FROM trades")
             trade_count = cursor.fetchone()[0]
             cursor.close()
-            conn.close()
         except Exception as e:
             db_status = "ERROR"
             db_error = str(e)
@@ -900,7 +1116,7 @@ def get_diagnostics():
         try:
             if strategy is not None:
                 # Try a basic API call
-                result = strategy.client.get_wallet_balance(
+                result = await exchange.get_wallet_balance(
                     accountType="UNIFIED",
                 )
                 if result.get('retCode') != 0:
@@ -930,6 +1146,13 @@ def get_diagnostics():
                 "status": api_status,
                 "error": api_error
             },
+            "exposure": {
+                **risk_mgmt.exposure.snapshot(),
+                "max_total_risk": risk_mgmt.config['max_total_risk'],
+                "max_positions": risk_mgmt.config['max_positions']
+            },
+            "live_feed": live_feed.stats(),
+            "response_cache": response_cache.stats(),
             "configuration": {
                 "symbol": SYMBOL,
                 "leverage": LEVERAGE,
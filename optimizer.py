@@ -0,0 +1,223 @@
+"""
+Parameter Sweep / Walk-Forward Optimizer
+Runs Backtester over a grid or random sample of strategy parameters on a
+process pool. The OHLCV bars are loaded once and placed in shared memory;
+workers attach to it at startup, so each task only ships its parameters and
+the bar range to test.
+"""
+
+import argparse
+import itertools
+import logging
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from backtest import Backtester
+
+logger = logging.getLogger('optimizer')
+
+# Column layout of the shared OHLCV block (timestamps as epoch milliseconds)
+COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+# Default search space: lists are sampled/enumerated, (low, high) tuples are sampled uniformly
+DEFAULT_SPACE = {
+    'rsi_oversold': [25, 30, 35],
+    'rsi_overbought': [65, 70, 75],
+    'bb_squeeze': [0.02, 0.03, 0.04],
+    'sma_fast': [10, 20, 30],
+    'sma_slow': [50, 100]
+}
+
+_shared = {}  # Per-process view of the shared bars
+
+
+def parameter_grid(space):
+    """Every combination of the listed values"""
+    keys = list(space)
+    return [dict(zip(keys, values)) for values in itertools.product(*(space[k] for k in keys))]
+
+
+def random_search(space, samples, seed=0):
+    """`samples` random parameter sets; (low, high) tuples are drawn uniformly (ints stay ints)"""
+    rng = random.Random(seed)
+    runs = []
+    for _ in range(samples):
+        params = {}
+        for key, values in space.items():
+            if isinstance(values, tuple):
+                low, high = values
+                params[key] = rng.randint(low, high) if isinstance(low, int) and isinstance(high, int) else rng.uniform(low, high)
+            else:
+                params[key] = rng.choice(values)
+        runs.append(params)
+    return runs
+
+
+def walk_forward_splits(n_bars, folds):
+    """
+    Rolling (train, test) bar ranges: the data is cut into folds + 1 equal
+    segments and each fold trains on one segment and tests on the next.
+    With folds == 0 the whole range is a single in-sample run.
+    """
+    if folds <= 0:
+        return [((0, n_bars), None)]
+    edges = np.linspace(0, n_bars, folds + 2).astype(int)
+    return [((edges[k], edges[k + 1]), (edges[k + 1], edges[k + 2])) for k in range(folds)]
+
+
+def share_prices(prices):
+    """Copy OHLCV bars into a new shared memory block; returns (block, shape)"""
+    table = np.empty((len(prices), len(COLUMNS)), dtype=np.float64)
+    table[:, 0] = pd.to_datetime(prices['timestamp']).astype('int64') // 10**6
+    for j, column in enumerate(COLUMNS[1:], start=1):
+        table[:, j] = prices[column].to_numpy(dtype=np.float64)
+    block = shared_memory.SharedMemory(create=True, size=max(table.nbytes, 1))
+    np.ndarray(table.shape, dtype=np.float64, buffer=block.buf)[:] = table
+    return block, table.shape
+
+
+def _attach(name, shape, start_date, end_date, initial_balance):
+    """Pool initializer: map the shared bars once per worker process"""
+    logging.disable(logging.INFO)  # Per-trade logs would dominate the run time
+    block = shared_memory.SharedMemory(name=name)
+    _shared['block'] = block  # Keep the mapping alive for the life of the worker
+    _shared['table'] = np.ndarray(shape, dtype=np.float64, buffer=block.buf)
+    _shared['run'] = (start_date, end_date, initial_balance)
+
+
+def _bars(start, end):
+    """DataFrame view of shared bars [start, end)"""
+    table = _shared['table'][start:end]
+    frame = pd.DataFrame(table[:, 1:], columns=COLUMNS[1:])
+    frame.insert(0, 'timestamp', pd.to_datetime(table[:, 0].astype('int64'), unit='ms'))
+    return frame
+
+
+def _evaluate(task):
+    """Run one parameter set on one bar range inside a worker"""
+    run_id, fold, stage, params, (start, end) = task
+    start_date, end_date, initial_balance = _shared['run']
+    backtester = Backtester(start_date, end_date, initial_balance, params=params)
+    backtester.run_backtest(prices=_bars(start, end))
+    return {'run_id': run_id, 'fold': fold, 'stage': stage, **backtester.summary()}
+
+
+@contextmanager
+def _worker_pool(prices, workers=None, start_date='', end_date='', initial_balance=10000):
+    """Process pool attached to a shared copy of `prices`; yields evaluate(tasks) -> result dicts"""
+    block, shape = share_prices(prices)
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_attach,
+                                 initargs=(block.name, shape, start_date, end_date, initial_balance)) as pool:
+            def evaluate(tasks):
+                chunksize = max(1, len(tasks) // (4 * (workers or 8)))
+                return list(pool.map(_evaluate, tasks, chunksize=chunksize))
+            yield evaluate
+    finally:
+        block.close()
+        block.unlink()
+
+
+def _rank(scores, runs, rank_by):
+    """One row per parameter set with its mean `rank_by` score, best first"""
+    table = scores.groupby('run_id').agg(score=(rank_by, 'mean'), total_trades=('total_trades', 'sum'),
+                                         max_drawdown=('max_drawdown', 'max'))
+    table = pd.DataFrame(runs).join(table.rename(columns={'score': rank_by}))
+    return table.sort_values(rank_by, ascending=False).reset_index(drop=True)
+
+
+def run_sweep(prices, runs, workers=None, start_date='', end_date='',
+              initial_balance=10000, rank_by='total_return'):
+    """
+    Evaluate every parameter set on the whole bar range and return a ranked
+    DataFrame (one row per parameter set, best first). These are in-sample
+    scores; use walk_forward() for an out-of-sample estimate.
+    """
+    tasks = [(run_id, 0, 'train', params, (0, len(prices))) for run_id, params in enumerate(runs)]
+    with _worker_pool(prices, workers, start_date, end_date, initial_balance) as evaluate:
+        results = evaluate(tasks)
+    return _rank(pd.DataFrame(results), runs, rank_by)
+
+
+def walk_forward(prices, runs, folds, workers=None, start_date='', end_date='',
+                 initial_balance=10000, rank_by='total_return'):
+    """
+    Walk-forward validation: for each fold, pick the best parameter set on its
+    train segment only, then record just that set's result on the following
+    test segment. Returns (per-fold DataFrame, combined out-of-sample dict);
+    the combined return compounds the test segments in order.
+    """
+    if folds <= 0:
+        raise ValueError("walk_forward needs at least one fold")
+    splits = walk_forward_splits(len(prices), folds)
+    with _worker_pool(prices, workers, start_date, end_date, initial_balance) as evaluate:
+        train = pd.DataFrame(evaluate([(run_id, fold, 'train', params, bars)
+                                       for fold, (bars, _) in enumerate(splits)
+                                       for run_id, params in enumerate(runs)]))
+        best = train.loc[train.groupby('fold')[rank_by].idxmax()].set_index('fold')
+        test = pd.DataFrame(evaluate([(int(best.at[fold, 'run_id']), fold, 'test',
+                                       runs[int(best.at[fold, 'run_id'])], bars)
+                                      for fold, (_, bars) in enumerate(splits)])).set_index('fold')
+
+    report = pd.DataFrame([runs[int(run_id)] for run_id in best['run_id']], index=best.index)
+    report.insert(0, 'run_id', best['run_id'].astype(int))
+    report[f'train_{rank_by}'] = best[rank_by]
+    for column in dict.fromkeys([rank_by, 'total_return', 'total_trades', 'max_drawdown']):
+        report[f'test_{column}'] = test[column]
+    growth = (test['final_balance'] / initial_balance).prod()
+    combined = {
+        'total_return': float((growth - 1) * 100),
+        'total_trades': int(test['total_trades'].sum()),
+        'worst_fold_drawdown': float(test['max_drawdown'].max()),
+        f'mean_{rank_by}': float(test[rank_by].mean())
+    }
+    return report.reset_index(), combined
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel parameter sweep over Backtester")
+    parser.add_argument('--start', default='2025-01-01')
+    parser.add_argument('--end', default='2025-05-22')
+    parser.add_argument('--balance', type=float, default=10000)
+    parser.add_argument('--folds', type=int, default=0, help="Walk-forward folds (0 = single in-sample run)")
+    parser.add_argument('--random', type=int, default=0, help="Random samples instead of the full grid")
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--rank-by', default='total_return')
+    parser.add_argument('--out', default='sweep_results.csv')
+    args = parser.parse_args()
+
+    prices = Backtester(args.start, args.end, args.balance).load_prices()
+    if prices.empty:
+        logger.error("No historical data available")
+        return
+
+    runs = random_search(DEFAULT_SPACE, args.random) if args.random else parameter_grid(DEFAULT_SPACE)
+    print(f"Running {len(runs)} parameter sets over {len(prices):,} bars "
+          f"({args.folds or 'no'} walk-forward folds)...")
+    started = time.perf_counter()
+    options = dict(workers=args.workers, start_date=args.start, end_date=args.end,
+                   initial_balance=args.balance, rank_by=args.rank_by)
+    if args.folds > 0:
+        table, combined = walk_forward(prices, runs, args.folds, **options)
+    else:
+        table = run_sweep(prices, runs, **options)
+    print(f"Finished in {time.perf_counter() - started:.1f}s")
+
+    table.to_csv(args.out, index=False)
+    if args.folds > 0:
+        print(table.to_string())
+        print("Combined out-of-sample: " + ", ".join(f"{k}={v:.2f}" for k, v in combined.items()))
+        print(f"Walk-forward results saved to {args.out}")
+    else:
+        print(table.head(10).to_string())
+        print(f"Ranked results saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
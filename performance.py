@@ -0,0 +1,203 @@
+"""
+Performance Analytics
+Vectorized statistics for equity curves and trade lists, shared by the
+backtesters and the /profits endpoint. Every function is a handful of NumPy
+passes, so curves with millions of points are summarized in well under a second.
+Times are epoch milliseconds; equity is account value (not returns).
+"""
+
+import numpy as np
+import pandas as pd
+
+DAY_MS = 24 * 60 * 60 * 1000
+DAYS_PER_YEAR = 365  # Crypto trades every day
+
+
+def to_ms(times):
+    """Epoch milliseconds for an array of datetimes, timestamps or numbers"""
+    times = np.asarray(times)
+    if np.issubdtype(times.dtype, np.number):
+        return times.astype(np.int64)
+    return pd.to_datetime(times).to_numpy().astype('datetime64[ms]').astype(np.int64)
+
+
+def underwater(equity):
+    """Fraction below the running peak at every point (0 at new highs, negative below)"""
+    equity = np.asarray(equity, dtype=np.float64)
+    if not len(equity):
+        return equity
+    peak = np.maximum.accumulate(equity)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(peak > 0, equity / peak - 1, 0.0)
+
+
+def max_drawdown(equity) -> float:
+    """Largest peak-to-trough decline, in percent"""
+    curve = underwater(equity)
+    return float(max(0.0, -curve.min()) * 100) if len(curve) else 0.0
+
+
+def rolling_drawdown(equity, window):
+    """Fraction below the highest value of the trailing `window` points"""
+    equity = pd.Series(np.asarray(equity, dtype=np.float64))
+    peak = equity.rolling(window, min_periods=1).max()
+    return (equity / peak - 1).to_numpy()
+
+
+def resample_equity(times_ms, equity, start_ms=None, end_ms=None, period_ms=DAY_MS):
+    """
+    Equity at the end of each period from start_ms to end_ms, carrying the last
+    value forward through periods without points (and the first back before it).
+    """
+    times_ms = to_ms(times_ms)
+    equity = np.asarray(equity, dtype=np.float64)
+    if not len(equity):
+        return equity
+    start_ms = times_ms[0] if start_ms is None else start_ms
+    end_ms = times_ms[-1] if end_ms is None else end_ms
+    edges = np.arange(start_ms + period_ms, end_ms + period_ms, period_ms)
+    last = np.searchsorted(times_ms, edges, 'left') - 1
+    return np.concatenate(([equity[0]], equity[np.maximum(last, 0)]))
+
+
+def returns(equity):
+    """Simple returns between consecutive equity points"""
+    equity = np.asarray(equity, dtype=np.float64)
+    if len(equity) < 2:
+        return np.empty(0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = equity[1:] / equity[:-1] - 1
+    return np.nan_to_num(out, nan=0.0, posinf=0.0, neginf=0.0)
+
+
+def sharpe_ratio(period_returns, periods_per_year=DAYS_PER_YEAR) -> float:
+    """Annualized mean over standard deviation of returns (0 when undefined)"""
+    period_returns = np.asarray(period_returns, dtype=np.float64)
+    if len(period_returns) < 2:
+        return 0.0
+    std = period_returns.std(ddof=1)
+    return float(period_returns.mean() / std * np.sqrt(periods_per_year)) if std > 0 else 0.0
+
+
+def sortino_ratio(period_returns, periods_per_year=DAYS_PER_YEAR) -> float:
+    """Annualized mean over downside deviation of returns (0 when undefined)"""
+    period_returns = np.asarray(period_returns, dtype=np.float64)
+    if len(period_returns) < 2:
+        return 0.0
+    downside = np.sqrt(np.mean(np.minimum(period_returns, 0) ** 2))
+    return float(period_returns.mean() / downside * np.sqrt(periods_per_year)) if downside > 0 else 0.0
+
+
+def cagr(start_value, end_value, days) -> float:
+    """Compound annual growth rate, in percent"""
+    if start_value <= 0 or end_value <= 0 or days <= 0:
+        return 0.0
+    return float(((end_value / start_value) ** (DAYS_PER_YEAR / days) - 1) * 100)
+
+
+def exposure(entry_ms, exit_ms, start_ms, end_ms) -> float:
+    """Percent of [start_ms, end_ms] with at least one position open"""
+    entry_ms, exit_ms = to_ms(entry_ms), to_ms(exit_ms)
+    if not len(entry_ms) or end_ms <= start_ms:
+        return 0.0
+    order = np.argsort(entry_ms, kind='stable')
+    entry_ms = np.clip(entry_ms[order], start_ms, end_ms)
+    exit_ms = np.clip(exit_ms[order], start_ms, end_ms)
+    # Union of the holding intervals: a new block starts where an entry is past every earlier exit
+    reach = np.maximum.accumulate(exit_ms)
+    starts = np.r_[True, entry_ms[1:] > reach[:-1]]
+    block_start = entry_ms[starts]
+    block_end = np.maximum.reduceat(exit_ms, np.flatnonzero(starts))
+    covered = np.maximum(block_end - block_start, 0).sum()
+    return float(covered / (end_ms - start_ms) * 100)
+
+
+def average_hold_ms(entry_ms, exit_ms) -> float:
+    """Mean time a trade stays open, in milliseconds"""
+    entry_ms, exit_ms = to_ms(entry_ms), to_ms(exit_ms)
+    return float(np.mean(exit_ms - entry_ms)) if len(entry_ms) else 0.0
+
+
+def trade_stats(pnl) -> dict:
+    """Counts, sums and ratios of a list of trade PnLs"""
+    pnl = np.nan_to_num(np.asarray(pnl, dtype=np.float64))
+    wins = pnl > 0
+    gross_profit = float(pnl[wins].sum())
+    gross_loss = float(-pnl[~wins].sum())
+    total = len(pnl)
+    return {
+        'total_trades': total,
+        'winning_trades': int(wins.sum()),
+        'losing_trades': int(total - wins.sum()),
+        'total_profit': gross_profit,
+        'total_loss': gross_loss,
+        'net_profit': gross_profit - gross_loss,
+        'win_rate': float(wins.mean() * 100) if total else 0.0,
+        'profit_factor': gross_profit / gross_loss if gross_loss > 0 else float('inf'),
+        'best_trade': float(max(pnl.max(), 0)) if total else 0.0,
+        'worst_trade': float(min(pnl.min(), 0)) if total else 0.0,
+        'expectancy': float(pnl.mean()) if total else 0.0
+    }
+
+
+def symbol_breakdown(symbols, pnl):
+    """Per-symbol trades, wins, losses, win rate and PnL as a DataFrame (best first)"""
+    columns = ['symbol', 'trades', 'wins', 'losses', 'win_rate', 'pnl']
+    if not len(pnl):
+        return pd.DataFrame(columns=columns)
+    names, index = np.unique(np.asarray(symbols, dtype=str), return_inverse=True)
+    pnl = np.nan_to_num(np.asarray(pnl, dtype=np.float64))
+    trades = np.bincount(index, minlength=len(names))
+    wins = np.bincount(index, weights=pnl > 0, minlength=len(names)).astype(int)
+    report = pd.DataFrame({
+        'symbol': names,
+        'trades': trades,
+        'wins': wins,
+        'losses': trades - wins,
+        'win_rate': wins / trades * 100,
+        'pnl': np.bincount(index, weights=pnl, minlength=len(names))
+    })
+    return report.sort_values('pnl', ascending=False).reset_index(drop=True)[columns]
+
+
+def equity_stats(times_ms, equity, start_ms=None, end_ms=None) -> dict:
+    """Return, drawdown and risk-adjusted ratios of an equity curve (ratios on daily returns)"""
+    times_ms = to_ms(times_ms)
+    equity = np.asarray(equity, dtype=np.float64)
+    if not len(equity):
+        return {'total_return': 0.0, 'max_drawdown': 0.0, 'current_drawdown': 0.0,
+                'cagr': 0.0, 'sharpe_ratio': 0.0, 'sortino_ratio': 0.0}
+    start_ms = int(times_ms[0]) if start_ms is None else start_ms
+    end_ms = int(times_ms[-1]) if end_ms is None else end_ms
+    daily = returns(resample_equity(times_ms, equity, start_ms, end_ms))
+    curve = underwater(equity)
+    return {
+        'total_return': float((equity[-1] / equity[0] - 1) * 100) if equity[0] else 0.0,
+        'max_drawdown': float(max(0.0, -curve.min()) * 100),  # max() keeps a flat curve at 0.0, not -0.0
+        'current_drawdown': float(max(0.0, -curve[-1]) * 100),
+        'cagr': cagr(equity[0], equity[-1], (end_ms - start_ms) / DAY_MS),
+        'sharpe_ratio': sharpe_ratio(daily),
+        'sortino_ratio': sortino_ratio(daily)
+    }
+
+
+def summarize(times_ms, equity, trades=None, start_ms=None, end_ms=None) -> dict:
+    """
+    Full performance summary: equity_stats plus trade_stats, exposure and
+    average hold time when `trades` (DataFrame or list of dicts with entry_time,
+    exit_time and pnl) is given.
+    """
+    stats = equity_stats(times_ms, equity, start_ms, end_ms)
+    trades = pd.DataFrame(trades if trades is not None else [])
+    pnl = trades['pnl'].to_numpy() if 'pnl' in trades else np.empty(0)
+    stats.update(trade_stats(pnl))
+    if len(trades) and len(times_ms):
+        start_ms = int(to_ms(times_ms)[0]) if start_ms is None else start_ms
+        end_ms = int(to_ms(times_ms)[-1]) if end_ms is None else end_ms
+        entries, exits = to_ms(trades['entry_time']), to_ms(trades['exit_time'])
+        stats['exposure'] = exposure(entries, exits, start_ms, end_ms)
+        stats['avg_hold_hours'] = average_hold_ms(entries, exits) / 3600000
+    else:
+        stats['exposure'] = 0.0
+        stats['avg_hold_hours'] = 0.0
+    return stats
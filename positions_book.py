@@ -0,0 +1,97 @@
+"""
+Positions Book
+Open trades held as columnar NumPy arrays so PnL, PnL %, stop-loss/take-profit
+hits and auto-close candidates are evaluated for every position in one pass.
+Rows are trades-table tuples:
+(id, symbol, side, size, entry_price, exit_price, pnl, status, timestamp, stop_loss, take_profit).
+"""
+
+import numpy as np
+
+
+class PositionsBook:
+    """Columnar snapshot of open positions"""
+
+    def __init__(self, ids, symbols, sides, sizes, entries, stop_losses, take_profits):
+        self.ids = list(ids)
+        self.symbols = list(symbols)
+        self.side = np.asarray(sides, dtype=np.float64)          # +1 Buy, -1 Sell
+        self.size = np.asarray(sizes, dtype=np.float64)
+        self.entry = np.asarray(entries, dtype=np.float64)
+        self.stop_loss = np.asarray(stop_losses, dtype=np.float64)    # NaN when not set
+        self.take_profit = np.asarray(take_profits, dtype=np.float64)  # NaN when not set
+        self.unique_symbols, self._symbol_index = np.unique(np.asarray(self.symbols, dtype=object).astype(str),
+                                                            return_inverse=True)
+        self.unique_symbols = self.unique_symbols.tolist()
+        self._row_of = {trade_id: i for i, trade_id in enumerate(self.ids)}
+
+    @classmethod
+    def from_trades(cls, trades):
+        """Build a book from trades-table rows (e.g. get_active_trades())"""
+        def optional(value):
+            return float(value) if value is not None else np.nan
+
+        return cls(
+            [t[0] for t in trades],
+            [t[1] for t in trades],
+            [1.0 if t[2] == "Buy" else -1.0 for t in trades],
+            [float(t[3]) for t in trades],
+            [float(t[4]) for t in trades],
+            [optional(t[9]) for t in trades],
+            [optional(t[10]) for t in trades]
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+    def index_of(self, trade_id):
+        """Row of a trade id, or None"""
+        return self._row_of.get(trade_id)
+
+    def price_vector(self, prices):
+        """
+        Per-position price vector from a {symbol: price} map (missing symbols
+        become NaN). Arrays are returned unchanged.
+        """
+        if not isinstance(prices, dict):
+            return np.asarray(prices, dtype=np.float64)
+        by_symbol = np.array([prices.get(s, np.nan) for s in self.unique_symbols], dtype=np.float64)
+        return by_symbol[self._symbol_index] if len(self) else np.empty(0)
+
+    def evaluate(self, prices):
+        """
+        Mark every position to `prices` (dict or per-position array). Returns a
+        dict of arrays: price, pnl, pnl_pct, sl_hit, tp_hit. Positions without a
+        price have NaN PnL and no hits.
+        """
+        price = self.price_vector(prices)
+        move = self.side * (price - self.entry)
+        pnl = self.size * move
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pnl_pct = move / self.entry * 100
+        with np.errstate(invalid='ignore'):
+            # Long stops sit below price and targets above; shorts are mirrored
+            sl_hit = self.side * (price - self.stop_loss) <= 0
+            tp_hit = self.side * (price - self.take_profit) >= 0
+        return {
+            'price': price,
+            'pnl': pnl,
+            'pnl_pct': pnl_pct,
+            'sl_hit': sl_hit,
+            'tp_hit': tp_hit
+        }
+
+    def unrealized_pnl(self, prices) -> float:
+        """Total PnL of every position that has a price"""
+        return float(np.nansum(self.evaluate(prices)['pnl']))
+
+    def auto_close_candidates(self, prices, target_pct):
+        """
+        Rows whose PnL % reached target_pct, skipping positions with an explicit
+        take profit (those wait for their target). Returns (rows, marks).
+        """
+        marks = self.evaluate(prices)
+        with np.errstate(invalid='ignore'):
+            has_take_profit = self.take_profit > 0
+            rows = np.flatnonzero(~has_take_profit & (marks['pnl_pct'] >= target_pct))
+        return rows, marks
@@ -0,0 +1,284 @@
+"""
+Historical Price Store
+OHLCV klines kept as memory-mapped NumPy files partitioned by
+symbol/interval/month (<root>/<SYMBOL>/<interval>/<YYYY-MM>.npy). Rows use the
+kline cache layout [start, open, high, low, close, volume, turnover] sorted by
+start time, so range reads are binary searches returning views of the mapped
+files. Data gets in through a Bybit kline CSV importer or a paginated
+downloader that can replay a recorded fixture instead of calling the API.
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from kline_cache import START, KLINE_COLUMNS, MAX_KLINE_LIMIT, normalize_interval, interval_to_ms
+
+logger = logging.getLogger('price_store')
+
+PRICE_STORE_PATH = os.getenv('PRICE_STORE_PATH', 'price_store')
+
+# CSV header names accepted for each column (Bybit dumps and common exports)
+CSV_COLUMNS = {
+    'start': ('start', 'starttime', 'start_time', 'open_time', 'opentime', 'timestamp', 'time', 'date'),
+    'open': ('open', 'open_price'),
+    'high': ('high', 'high_price'),
+    'low': ('low', 'low_price'),
+    'close': ('close', 'close_price'),
+    'volume': ('volume', 'vol'),
+    'turnover': ('turnover', 'quote_volume')
+}
+
+
+def to_epoch_ms(value):
+    """Epoch milliseconds for a date string, datetime or number (seconds or milliseconds)"""
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return int(value * 1000) if value < 1e11 else int(value)
+    timestamp = pd.Timestamp(value)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.tz_localize('UTC')
+    return int(timestamp.timestamp() * 1000)
+
+
+def month_key(start_ms):
+    """Partition name (YYYY-MM, UTC) of a bar start time"""
+    return datetime.fromtimestamp(start_ms / 1000, tz=timezone.utc).strftime('%Y-%m')
+
+
+class PriceStore:
+    """Partitioned, memory-mapped kline history"""
+
+    def __init__(self, root=None):
+        self.root = root or PRICE_STORE_PATH
+        self._maps = {}  # Open memmaps by partition path
+        self._lock = threading.Lock()
+
+    def _dir(self, symbol, interval):
+        return os.path.join(self.root, symbol, normalize_interval(interval))
+
+    def symbols(self, interval):
+        """Symbols that have data stored for an interval"""
+        if not os.path.isdir(self.root):
+            return []
+        interval = normalize_interval(interval)
+        return sorted(name for name in os.listdir(self.root)
+                      if os.path.isdir(os.path.join(self.root, name, interval)))
+
+    def partitions(self, symbol, interval):
+        """Sorted month keys stored for symbol/interval"""
+        directory = self._dir(symbol, interval)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-4] for name in os.listdir(directory) if name.endswith('.npy'))
+
+    def _load(self, path):
+        with self._lock:
+            if path not in self._maps:
+                self._maps[path] = np.load(path, mmap_mode='r')
+            return self._maps[path]
+
+    def release(self, symbol=None):
+        """Unmap cached partitions (all, or one symbol's) so their pages can be reclaimed"""
+        prefix = os.path.join(self.root, symbol, '') if symbol else self.root
+        with self._lock:
+            for path in [p for p in self._maps if p.startswith(prefix)]:
+                del self._maps[path]
+
+    def write(self, symbol, interval, rows):
+        """Merge kline rows into their monthly partitions (newer values replace stored bars)"""
+        rows = np.asarray(rows, dtype=np.float64).reshape(-1, KLINE_COLUMNS)
+        if not len(rows):
+            return 0
+        directory = self._dir(symbol, interval)
+        os.makedirs(directory, exist_ok=True)
+
+        months = np.datetime_as_string(rows[:, START].astype('int64').astype('datetime64[ms]').astype('datetime64[M]'))
+        for month in np.unique(months):
+            path = os.path.join(directory, f"{month}.npy")
+            merged = rows[months == month]
+            if os.path.exists(path):
+                merged = np.concatenate((np.load(path), merged))
+            # Keep the last occurrence of every start time, sorted
+            _, last = np.unique(merged[::-1, START], return_index=True)
+            merged = merged[::-1][last]
+
+            tmp = f"{path}.tmp.npy"
+            np.save(tmp, merged)
+            with self._lock:
+                self._maps.pop(path, None)
+            os.replace(tmp, path)
+        return len(rows)
+
+    def iter_ranges(self, symbol, interval, start_ms=None, end_ms=None):
+        """Zero-copy views of each partition's rows with start_ms <= start <= end_ms"""
+        lower = month_key(start_ms) if start_ms is not None else None
+        upper = month_key(end_ms) if end_ms is not None else None
+        for month in self.partitions(symbol, interval):
+            if (lower and month < lower) or (upper and month > upper):
+                continue
+            data = self._load(os.path.join(self._dir(symbol, interval), f"{month}.npy"))
+            starts = data[:, START]
+            first = np.searchsorted(starts, start_ms, 'left') if start_ms is not None else 0
+            last = np.searchsorted(starts, end_ms, 'right') if end_ms is not None else len(data)
+            if last > first:
+                yield data[first:last]
+
+    def read(self, symbol, interval, start_ms=None, end_ms=None):
+        """
+        Rows in [start_ms, end_ms] as one (n, 7) array. A range inside a single
+        month is a view of the mapped file; longer ranges are joined into one copy.
+        """
+        parts = list(self.iter_ranges(symbol, interval, start_ms, end_ms))
+        if not parts:
+            return np.empty((0, KLINE_COLUMNS))
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def read_frame(self, symbol, interval, start_ms=None, end_ms=None):
+        """Rows as a DataFrame with a datetime `timestamp` column plus OHLCV"""
+        rows = self.read(symbol, interval, start_ms, end_ms)
+        return pd.DataFrame({
+            'timestamp': pd.to_datetime(rows[:, START].astype('int64'), unit='ms'),
+            'open': rows[:, 1],
+            'high': rows[:, 2],
+            'low': rows[:, 3],
+            'close': rows[:, 4],
+            'volume': rows[:, 5]
+        })
+
+    def import_csv(self, path, symbol, interval, chunk_rows=500000):
+        """Bulk import a Bybit kline CSV dump (header row required); returns the row count"""
+        total = 0
+        for chunk in pd.read_csv(path, chunksize=chunk_rows, float_precision="round_trip"):
+            columns = {c.lower().strip(): c for c in chunk.columns}
+            rows = np.zeros((len(chunk), KLINE_COLUMNS))
+            for j, (field, names) in enumerate(CSV_COLUMNS.items()):
+                source = next((columns[n] for n in names if n in columns), None)
+                if source is None:
+                    if field == 'turnover':
+                        continue  # Optional
+                    raise ValueError(f"{path}: no column for '{field}'")
+                values = chunk[source]
+                if field == 'start':
+                    if pd.api.types.is_numeric_dtype(values):
+                        values = values.astype('int64')
+                        values = np.where(values < 1e11, values * 1000, values)
+                    else:
+                        values = pd.to_datetime(values, utc=True).astype('int64') // 10**6
+                rows[:, j] = np.asarray(values, dtype=np.float64)
+            total += self.write(symbol, interval, rows)
+        logger.info(f"Imported {total} {symbol} {interval} klines from {path}")
+        return total
+
+    def download(self, client, symbol, interval, start_ms, end_ms, category="linear", flush_rows=200000):
+        """
+        Page backwards through get_kline from end_ms to start_ms, writing the
+        bars as it goes; returns the number of rows stored.
+        """
+        interval = normalize_interval(interval)
+        step = interval_to_ms(interval)
+        end = end_ms
+        pending = []
+        pending_rows = 0
+        total = 0
+        while end >= start_ms:
+            response = client.get_kline(category=category, symbol=symbol, interval=interval,
+                                        start=int(start_ms), end=int(end), limit=MAX_KLINE_LIMIT)
+            if response.get('retCode') != 0:
+                raise RuntimeError(f"Kline request failed: {response.get('retMsg')}")
+            rows = response.get('result', {}).get('list') or []
+            if not rows:
+                break
+            page = np.asarray(rows, dtype=np.float64)[::-1, :KLINE_COLUMNS]
+            page = page[(page[:, START] >= start_ms) & (page[:, START] <= end)]
+            if not len(page):
+                break
+            pending.append(page)
+            pending_rows += len(page)
+            if pending_rows >= flush_rows:
+                total += self.write(symbol, interval, np.concatenate(pending))
+                pending, pending_rows = [], 0
+            end = int(page[0, START]) - step
+        if pending:
+            total += self.write(symbol, interval, np.concatenate(pending))
+        logger.info(f"Downloaded {total} {symbol} {interval} klines")
+        return total
+
+
+class KlineFixture:
+    """
+    Replays recorded get_kline responses (a JSON list of {"params", "response"})
+    in place of the exchange client. Wrap a live client to record one.
+    """
+
+    def __init__(self, path, client=None):
+        self.path = path
+        self.client = client  # Set to record: calls go to the client and are saved
+        self.calls = []
+        self._responses = {}
+        if client is None:
+            with open(path, 'r') as f:
+                self.calls = json.load(f)
+            self._responses = {self._key(c['params']): c['response'] for c in self.calls}
+
+    @staticmethod
+    def _key(params):
+        return json.dumps(params, sort_keys=True)
+
+    def get_kline(self, **params):
+        if self.client is None:
+            return self._responses.get(self._key(params), {'retCode': 0, 'result': {'list': []}})
+        response = self.client.get_kline(**params)
+        self.calls.append({'params': params, 'response': response})
+        return response
+
+    def save(self):
+        with open(self.path, 'w') as f:
+            json.dump(self.calls, f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Historical kline store")
+    parser.add_argument('--root', default=None)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    import_cmd = commands.add_parser('import', help="Import Bybit kline CSV dumps")
+    import_cmd.add_argument('files', nargs='+')
+    import_cmd.add_argument('--symbol', required=True)
+    import_cmd.add_argument('--interval', default='1')
+
+    download_cmd = commands.add_parser('download', help="Download klines from Bybit (or a fixture)")
+    download_cmd.add_argument('--symbol', required=True)
+    download_cmd.add_argument('--interval', default='1')
+    download_cmd.add_argument('--start', required=True)
+    download_cmd.add_argument('--end', required=True)
+    download_cmd.add_argument('--fixture', help="Replay this recorded fixture instead of calling the API")
+    download_cmd.add_argument('--record', help="Record the API responses to this fixture file")
+    args = parser.parse_args()
+
+    store = PriceStore(args.root)
+    if args.command == 'import':
+        for path in args.files:
+            print(f"{path}: {store.import_csv(path, args.symbol, args.interval)} rows")
+        return
+
+    if args.fixture:
+        client = KlineFixture(args.fixture)
+    else:
+        from pybit.unified_trading import HTTP
+        client = HTTP(testnet=False)
+        if args.record:
+            client = KlineFixture(args.record, client)
+    rows = store.download(client, args.symbol, args.interval, to_epoch_ms(args.start), to_epoch_ms(args.end))
+    if args.record and not args.fixture:
+        client.save()
+    print(f"Stored {rows} rows")
+
+
+if __name__ == "__main__":
+    main()
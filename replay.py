@@ -0,0 +1,114 @@
+"""
+Strategy Replay
+Runs the live trading loop (main.run_strategy_cycle and the auto-close check)
+against SimulatedExchange on a virtual clock. Each cycle advances the clock by
+the live loop's sleep instead of waiting for it, so weeks of history replay in
+minutes through exactly the code path the bot trades with.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import os
+import sys
+import time
+
+import database
+from price_store import PriceStore, to_epoch_ms
+from simulated_exchange import SimulatedExchange, VirtualClock, DAY_MS
+
+CYCLE_SECONDS = 60         # run_strategy sleeps this long between scans
+CHECK_SECONDS = 300        # profitable_trades_monitor interval
+DEFAULT_DB_PATH = 'replay_trades.db'
+
+
+def fresh_database(path):
+    """Point the database module at an empty trades DB for this replay"""
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    database.set_db_path(path)
+
+
+def attach(bot, simulator, clock):
+    """Route the bot's exchange access and time sources through the simulator"""
+    bot.strategy.client = simulator
+    bot.strategy.kline_cache.client = simulator
+    bot.strategy.kline_cache.clock = clock.time
+    bot.strategy.kline_cache.invalidate()
+    bot.strategy.tickers.client = simulator
+    bot.strategy.tickers.clock = clock.time
+    bot.strategy.tickers.fetched_at = 0.0
+    database.clock = clock.time
+    bot.risk_mgmt.exposure.rebuild(database.get_active_trades())
+    database.add_trade_listener(bot.risk_mgmt.exposure.on_trade_event)
+    bot.SIMULATION_MODE = False  # Orders go to the simulator, not the paper-trade fallback
+    bot.DEMO_MODE = False
+
+
+async def replay(bot, simulator, clock, end_ms):
+    """Step the strategy loop from the clock's start to end_ms; returns the cycle count"""
+    demo_counter = 0
+    next_check = clock.time() + CHECK_SECONDS
+    cycles = 0
+    while clock.time() * 1000 < end_ms:
+        try:
+            demo_counter = await bot.run_strategy_cycle(demo_counter)
+        except Exception as e:
+            print(f"⚠️ Trading error: {str(e)}")
+        if clock.time() >= next_check:
+            await bot.check_and_close_profitable_trades()
+            next_check += CHECK_SECONDS
+            # Realized PnL flows back into the wallet the strategy sizes from
+            row = database.get_connection().execute("SELECT balance FROM trade_stats WHERE id = 1").fetchone()
+            simulator.balance = simulator.initial_balance + (row[0] - database.STARTING_BALANCE)
+        clock.advance(CYCLE_SECONDS)
+        cycles += 1
+    return cycles
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay the live strategy loop over stored klines")
+    parser.add_argument('--start', required=True)
+    parser.add_argument('--end', required=True)
+    parser.add_argument('--symbols', nargs='*', help="Symbols to list (default: every stored symbol)")
+    parser.add_argument('--root', default=None, help="Price store directory")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="Trades DB written by the replay (recreated)")
+    parser.add_argument('--balance', type=float, default=10000)
+    parser.add_argument('--warmup-days', type=float, default=7)
+    parser.add_argument('--verbose', action='store_true', help="Show the bot's own output")
+    args = parser.parse_args()
+
+    start_ms, end_ms = to_epoch_ms(args.start), to_epoch_ms(args.end)
+    store = PriceStore(args.root)
+    symbols = args.symbols or store.symbols('1')
+    clock = VirtualClock(start_ms / 1000)
+    simulator = SimulatedExchange(store, symbols, clock.time, start_ms, end_ms,
+                                  warmup_ms=int(args.warmup_days * DAY_MS), initial_balance=args.balance)
+    if not simulator.symbols:
+        print("No 1-minute bars stored for the requested symbols")
+        return
+
+    fresh_database(args.db)
+    import main as bot  # Imported after the DB path is set so startup uses the replay DB
+    attach(bot, simulator, clock)
+
+    print(f"Replaying {len(simulator.symbols)} symbols from {args.start} to {args.end}...")
+    started = time.perf_counter()
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, 'w'))
+    with output:
+        cycles = asyncio.run(replay(bot, simulator, clock, end_ms))
+    elapsed = time.perf_counter() - started
+    bot.exchange.shutdown()
+
+    stats = database.get_profit_metrics()
+    print(f"{cycles} cycles ({cycles * CYCLE_SECONDS / 86400:.1f} days) in {elapsed:.1f}s "
+          f"({cycles * CYCLE_SECONDS / max(elapsed, 1e-9):,.0f}x real time)")
+    print(f"Orders: {len(simulator.orders)}, open trades: {len(database.get_active_trades())}")
+    print(f"Closed trades: {stats.get('total_trades', 0)}, win rate: {stats.get('win_rate', 0)}%, "
+          f"profit factor: {stats.get('profit_factor', 0)}, max drawdown: {stats.get('max_drawdown', 0)}%")
+    print(f"Trades saved to {args.db}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
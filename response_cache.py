@@ -0,0 +1,108 @@
+"""
+Response Cache
+In-process cache of GET responses for read-heavy dashboard routes. Each route
+has a TTL and a set of tags (e.g. "trades", "config"); invalidating a tag drops
+every cached response of the routes carrying it, so writes show up on the next
+request instead of after the TTL. Responses computed across an invalidation are
+not stored, so a slow request can never re-cache data from before a write.
+"""
+
+import threading
+import time
+
+from starlette.responses import Response
+
+
+class ResponseCache:
+    """Per-route TTL cache of response bodies, keyed by path and query string"""
+
+    def __init__(self, routes, max_entries=1024, clock=time.monotonic):
+        self.routes = dict(routes)  # path -> (ttl seconds, tags)
+        self.max_entries = max_entries
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries = {}          # (path, query) -> (expires, status, headers, body)
+        self._generation = {}       # path -> bumped on every invalidation of that path
+        self._lock = threading.Lock()
+
+    def _key(self, request):
+        return request.url.path, str(request.query_params)
+
+    def lookup(self, request):
+        """Cached Response for a GET request, or None (counts the hit or miss)"""
+        path = request.url.path
+        if request.method != "GET" or path not in self.routes:
+            return None
+        with self._lock:
+            entry = self._entries.get(self._key(request))
+            if entry and entry[0] > self.clock():
+                self.hits += 1
+                _, status, headers, body = entry
+                return Response(body, status_code=status, headers={**headers, "X-Cache": "HIT"})
+            self.misses += 1
+        return None
+
+    def generation(self, path):
+        return self._generation.get(path, 0)
+
+    def store(self, request, status, headers, body, generation):
+        """Keep a 200 response unless its route was invalidated while it was computed"""
+        path = request.url.path
+        if status != 200 or path not in self.routes:
+            return
+        ttl = self.routes[path][0]
+        with self._lock:
+            if self._generation.get(path, 0) != generation:
+                return
+            if len(self._entries) >= self.max_entries:
+                self._evict()
+            self._entries[self._key(request)] = (self.clock() + ttl, status, headers, body)
+
+    def _evict(self):
+        """Drop expired entries, then the oldest ones if the cache is still full (lock held)"""
+        now = self.clock()
+        for key in [k for k, entry in self._entries.items() if entry[0] <= now]:
+            del self._entries[key]
+        while len(self._entries) >= self.max_entries:
+            del self._entries[next(iter(self._entries))]
+
+    def invalidate(self, tag=None):
+        """Drop the cached responses of every route tagged `tag` (all routes if None)"""
+        paths = {p for p, (_, tags) in self.routes.items() if tag is None or tag in tags}
+        with self._lock:
+            for path in paths:
+                self._generation[path] = self._generation.get(path, 0) + 1
+            for key in [k for k in self._entries if k[0] in paths]:
+                del self._entries[key]
+            self.invalidations += 1
+
+    def on_trade_event(self, event, trade_id, fields):
+        """database trade listener: trade writes invalidate the "trades" tag"""
+        self.invalidate("trades")
+
+    async def middleware(self, request, call_next):
+        """Starlette HTTP middleware serving and filling the cache"""
+        cached = self.lookup(request)
+        if cached is not None:
+            return cached
+        if request.method != "GET" or request.url.path not in self.routes:
+            return await call_next(request)
+        generation = self.generation(request.url.path)
+        response = await call_next(request)
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        headers = {k: v for k, v in response.headers.items() if k.lower() != "content-length"}
+        self.store(request, response.status_code, headers, body, generation)
+        return Response(body, status_code=response.status_code, headers={**headers, "X-Cache": "MISS"})
+
+    def stats(self):
+        """Hit/miss counters for diagnostics"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups * 100, 2) if lookups else 0.0,
+            'invalidations': self.invalidations,
+            'entries': len(self._entries)
+        }
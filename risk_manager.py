@@ -5,10 +5,17 @@ This module handles automatic risk adjustment based on market conditions.
 
 import json
 import logging
+import math
+import threading
+import time
 import requests
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
 import numpy as np
 from datetime import datetime, timedelta
 
+from correlation import ReturnCorrelation
+from exposure_ledger import ExposureLedger
+
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger('risk_manager')
@@ -90,55 +97,65 @@ def calculate_optimal_take_profit(entry_price, stop_loss, min_risk_reward=2):
         logger.error(f"Error calculating take profit: {e}")
         return None
 
-class RiskManager:
-    def __init__(self, config_path='config.json'):
-        """Initialize risk manager with enhanced risk control"""
-        self.config = {
-            'max_risk_per_trade': 0.015,      # Maximum 1.5% risk per trade
-            'max_total_risk': 0.06,           # Maximum 6% total portfolio risk
-            'min_reward_ratio': 3.0,          # Minimum 3:1 reward-to-risk ratio
-            'max_positions': 4,               # Maximum concurrent positions
-            'max_correlation': 0.7,           # Maximum correlation between positions
-            'volatility_scaling': True,       # Enable volatility-based position sizing
-            'trailing_stop': True,            # Enable trailing stops
-            'profit_lock': {
-                'enabled': True,
-                'threshold': 0.02,            # Lock in profits at 2% gain
-                'lock_amount': 0.5            # Lock in 50% of gains
-            }
-        }
-        
-        # Dynamic stop loss settings
-        self.stop_loss_settings = {
-            'base_atr_multiple': 1.5,         # Base ATR multiplier
-            'vol_adjustment': 0.2,            # Volatility adjustment factor
-            'max_stop_distance': 0.04,        # Maximum 4% stop distance
-            'min_stop_distance': 0.01         # Minimum 1% stop distance
-        }
+class LiveMarketContext:
+    """
+    24h market data from the Bybit public API, falling back to CoinGecko.
+    Lookups are cached per symbol for `ttl` seconds over one keep-alive session;
+    concurrent misses for a symbol share a single request, and once a symbol has
+    been fetched, expired data (up to `stale_ttl` old) is served immediately
+    while the refresh runs in the background.
+    """
+    
+    def __init__(self, ttl=60, stale_ttl=900, timeout=3.0, max_workers=4):
+        self.ttl = ttl                # Seconds data is served without refreshing
+        self.stale_ttl = stale_ttl    # Seconds expired data may still stand in for a slow upstream
+        self.timeout = timeout        # Request timeout, and the longest a caller waits on a cold miss
+        self.session = requests.Session()
+        self._cache = {}              # symbol -> (fetched_at, data)
+        self._inflight = {}           # symbol -> Future of the running refresh
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='market-data')
+    
+    def get(self, symbol):
+        """Get market data for the given symbol"""
+        now = time.time()
+        with self._lock:
+            entry = self._cache.get(symbol)
+            if entry and now - entry[0] < self.ttl:
+                return entry[1]
+            future = self._inflight.get(symbol)
+            if future is None:
+                future = self._inflight[symbol] = self._executor.submit(self._refresh, symbol)
         
-        # Position sizing settings
-        self.position_settings = {
-            'vol_scale_factor': 0.5,          # Reduce size in high volatility
-            'min_position_size': 0.01,        # Minimum position size
-            'max_position_size': 0.15,        # Maximum 15% of portfolio per position
-            'size_reduction': 0.2             # Reduce size by 20% for each active position
-        }
-
-    def _load_config(self, config_path):
-        """Load configuration from the config file"""
+        if entry and now - entry[0] < self.stale_ttl:
+            return entry[1]  # Stale-while-revalidate: never wait on the network
         try:
-            with open(config_path, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            logger.error(f"Error loading config: {str(e)}")
-            return {}
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            logger.warning(f"Market data for {symbol} timed out, {'using stale data' if entry else 'no data'}")
+            return entry[1] if entry else {}
     
-    def get_market_data(self, symbol):
-        """Get market data for the given symbol"""
+    def _refresh(self, symbol):
+        """Fetch and cache one symbol (runs once per symbol at a time)"""
+        try:
+            data = self._fetch(symbol)
+            with self._lock:
+                if data:
+                    self._cache[symbol] = (time.time(), data)
+                    return data
+                # Keep serving the previous data when the upstream returned nothing
+                entry = self._cache.get(symbol)
+                return entry[1] if entry else {}
+        finally:
+            with self._lock:
+                self._inflight.pop(symbol, None)
+    
+    def _fetch(self, symbol):
+        """Download market data for the given symbol"""
         try:
             # Try to get data from Bybit API
             bybit_endpoint = f"https://api.bybit.com/v2/public/tickers?symbol={symbol}"
-            response = requests.get(bybit_endpoint, timeout=10)
+            response = self.session.get(bybit_endpoint, timeout=self.timeout)
             data = response.json()
             
             if data.get('result'):
@@ -155,7 +172,7 @@ class RiskManager:
             coin_id = self._get_coingecko_id(symbol)
             if coin_id:
                 gecko_endpoint = f"https://api.coingecko.com/api/v3/coins/{coin_id}"
-                response = requests.get(gecko_endpoint, timeout=10)
+                response = self.session.get(gecko_endpoint, timeout=self.timeout)
                 data = response.json()
                 
                 market_data = data.get('market_data', {})
@@ -202,6 +219,141 @@ class RiskManager:
         
         return symbol_map.get(base_symbol, base_symbol)
     
+_shared_live_context = None
+_shared_live_lock = threading.Lock()
+
+def shared_live_context():
+    """Process-wide LiveMarketContext, so every RiskManager shares one cache and session"""
+    global _shared_live_context
+    with _shared_live_lock:
+        if _shared_live_context is None:
+            _shared_live_context = LiveMarketContext()
+        return _shared_live_context
+
+class HistoricalMarketContext:
+    """
+    Deterministic market data for backtests: rolling 24h high/low/volume and
+    price change computed from historical bars, read at the current bar.
+    """
+    
+    def __init__(self):
+        self.symbols = {}
+        self.cursor = {}
+        self.kept_bars = {}
+    
+    def add_symbol(self, symbol, high, low, close, volume, window, keep=None):
+        """
+        Precompute rolling stats over `window` bars (one day of bars) for a symbol.
+        If `keep` (sorted bar indexes) is given only those bars are retained,
+        which keeps memory small when just a few bars will ever be queried.
+        """
+        high = np.asarray(high, dtype=np.float64)
+        low = np.asarray(low, dtype=np.float64)
+        close = np.asarray(close, dtype=np.float64)
+        volume = np.asarray(volume, dtype=np.float64)
+        window = max(1, int(window))
+        
+        # Trailing windows include the current bar; the first bars use what history exists
+        csum = np.concatenate(([0.0], np.cumsum(volume)))
+        idx = np.arange(len(close))
+        first = np.maximum(idx - window + 1, 0)
+        self.symbols[symbol] = {
+            'price': close,
+            'volume_24h': csum[idx + 1] - csum[first],
+            'price_change_percent_24h': (close / close[first] - 1) * 100 if len(close) else close,
+            'high_price_24h': _rolling_extreme(high, window, np.maximum),
+            'low_price_24h': _rolling_extreme(low, window, np.minimum)
+        }
+        if keep is not None:
+            keep = np.asarray(keep, dtype=np.int64)
+            self.symbols[symbol] = {key: values[keep] for key, values in self.symbols[symbol].items()}
+            self.kept_bars[symbol] = keep
+        self.cursor[symbol] = 0
+    
+    def seek(self, symbol, index):
+        """Make `index` the current bar for a symbol"""
+        keep = self.kept_bars.get(symbol)
+        self.cursor[symbol] = index if keep is None else int(np.searchsorted(keep, index))
+    
+    def get(self, symbol):
+        """Market data at the current bar, or {} for an unknown symbol"""
+        stats = self.symbols.get(symbol)
+        if stats is None:
+            return {}
+        i = self.cursor[symbol]
+        return {key: float(values[i]) for key, values in stats.items()}
+
+def _rolling_extreme(values, window, reducer):
+    """Trailing rolling max/min (reducer=np.maximum/np.minimum) via log-step doubling"""
+    out = values.copy()
+    span = 1
+    while span < window:
+        step = min(span, window - span)
+        # out[i] covers values[i-span+1 : i+1]; extend it back by `step` more bars
+        shifted = np.concatenate((out[:step], out[:-step])) if step < len(out) else out.copy()
+        out = reducer(out, shifted)
+        span += step
+    return out
+
+class RiskManager:
+    def __init__(self, config_path='config.json', market_context=None, correlation=None, exposure=None):
+        """Initialize risk manager with enhanced risk control"""
+        # Source of 24h market data (live API by default, historical bars in backtests)
+        self.market_context = market_context or shared_live_context()
+        
+        # Rolling return correlations used to enforce max_correlation
+        self.correlation = correlation or ReturnCorrelation()
+        
+        # Open-trade risk totals used to enforce max_total_risk and max_positions
+        self.exposure = exposure or ExposureLedger()
+        
+        # Automatic risk settings from the bot configuration
+        self.auto_risk_config = self._load_config(config_path).get('auto_risk', {})
+        
+        self.config = {
+            'max_risk_per_trade': 0.015,      # Maximum 1.5% risk per trade
+            'max_total_risk': 0.06,           # Maximum 6% total portfolio risk
+            'min_reward_ratio': 3.0,          # Minimum 3:1 reward-to-risk ratio
+            'max_positions': 4,               # Maximum concurrent positions
+            'max_correlation': 0.7,           # Maximum correlation between positions
+            'volatility_scaling': True,       # Enable volatility-based position sizing
+            'trailing_stop': True,            # Enable trailing stops
+            'profit_lock': {
+                'enabled': True,
+                'threshold': 0.02,            # Lock in profits at 2% gain
+                'lock_amount': 0.5            # Lock in 50% of gains
+            }
+        }
+        
+        # Dynamic stop loss settings
+        self.stop_loss_settings = {
+            'base_atr_multiple': 1.5,         # Base ATR multiplier
+            'vol_adjustment': 0.2,            # Volatility adjustment factor
+            'max_stop_distance': 0.04,        # Maximum 4% stop distance
+            'min_stop_distance': 0.01         # Minimum 1% stop distance
+        }
+        
+        # Position sizing settings
+        self.position_settings = {
+            'vol_scale_factor': 0.5,          # Reduce size in high volatility
+            'min_position_size': 0.01,        # Minimum position size
+            'max_position_size': 0.15,        # Maximum 15% of portfolio per position
+            'size_reduction': 0.2             # Reduce size by 20% for each active position
+        }
+
+    def _load_config(self, config_path):
+        """Load configuration from the config file"""
+        try:
+            with open(config_path, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Error loading config: {str(e)}")
+            return {}
+    
+    def get_market_data(self, symbol):
+        """Get market data for the given symbol from the configured market context"""
+        return self.market_context.get(symbol)
+    
     def calculate_volatility(self, high, low, current):
         """Calculate volatility based on 24h high/low range"""
         if high <= 0 or low <= 0 or current <= 0:
@@ -262,9 +414,20 @@ class RiskManager:
         
         return risk_percentage
     
+    def check_correlation(self, symbol, open_symbols):
+        """True if symbol is no more than max_correlation correlated with any open position"""
+        allowed, other, corr = self.correlation.check(symbol, open_symbols, self.config['max_correlation'])
+        if not allowed:
+            logger.info(f"{symbol} blocked: correlation {corr:.2f} with open {other} exceeds "
+                        f"{self.config['max_correlation']}")
+        return allowed
+    
     def calculate_position_size(self, symbol, account_balance, current_price, volatility, active_positions):
         """Calculate position size with enhanced risk management"""
         try:
+            if not self.check_correlation(symbol, [p['symbol'] for p in active_positions if p.get('symbol')]):
+                return 0.0
+            
             # Base risk percentage adjusted for volatility
             base_risk = self.config['max_risk_per_trade']
             
@@ -293,6 +456,33 @@ class RiskManager:
             logger.error(f"Error calculating position size: {e}")
             return 0.0
 
+    def calculate_size(self, balance, price, stop_loss=None, symbol=None, open_symbols=()):
+        """
+        Order quantity risking max_risk_per_trade of the balance down to the stop
+        loss, cut to what is left of the max_total_risk budget. 0 when symbol is
+        too correlated with the open positions or max_positions are open.
+        """
+        if symbol and not self.check_correlation(symbol, open_symbols):
+            return 0
+        if self.exposure.open_count() >= self.config['max_positions']:
+            logger.info(f"{symbol or 'Order'} blocked: {self.exposure.open_count()} positions open "
+                        f"(max {self.config['max_positions']})")
+            return 0
+        risk_percent = self.config['max_risk_per_trade'] * 100
+        if not stop_loss:
+            # No stop: treat a 2% adverse move as the risk
+            stop_loss = price * 0.98
+        size = calculate_position_size(balance, price, stop_loss, risk_percent)['position_size']
+        
+        # Portfolio budget: open risk to stop plus this trade's stays within max_total_risk
+        per_unit = abs(price - stop_loss)
+        remaining = self.exposure.remaining_risk(balance, self.config['max_total_risk'])
+        if per_unit > 0 and size * per_unit > remaining:
+            size = math.floor(remaining / per_unit * 10000) / 10000
+            logger.info(f"{symbol or 'Order'} size cut to {size} by max_total_risk "
+                        f"(open risk {self.exposure.total_risk:.2f})")
+        return size
+
     def calculate_dynamic_stop_loss(self, symbol, side, entry_price):
         """Calculate dynamic stop-loss based on market conditions"""
         try:
@@ -0,0 +1,182 @@
+"""
+Simulated Exchange
+Stands in for the Bybit HTTP client during replays: get_kline, get_tickers,
+place_order, get_wallet_balance and set_leverage are answered from 1-minute
+bars in the price store, as of a virtual clock. Only bars that closed before
+the clock are visible; higher intervals are aggregated on request, including
+the bar still in progress, so the live strategy sees what it would have seen.
+"""
+
+import logging
+import threading
+
+import numpy as np
+
+from kline_cache import START, MAX_KLINE_LIMIT, normalize_interval, interval_to_ms
+
+logger = logging.getLogger('simulated_exchange')
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+class VirtualClock:
+    """Replay time in epoch seconds, advanced explicitly instead of by the wall clock"""
+
+    def __init__(self, start):
+        self.now = float(start)
+        self._lock = threading.Lock()
+
+    def time(self):
+        return self.now
+
+    def advance(self, seconds):
+        with self._lock:
+            self.now += seconds
+        return self.now
+
+
+def _ok(result):
+    return {'retCode': 0, 'retMsg': 'OK', 'result': result}
+
+
+class SimulatedExchange:
+    """Bybit HTTP client lookalike backed by stored klines"""
+
+    def __init__(self, store, symbols, clock, start_ms, end_ms, interval='1', warmup_ms=7 * DAY_MS,
+                 initial_balance=10000):
+        self.clock = clock
+        self.interval = normalize_interval(interval)
+        self.step = interval_to_ms(self.interval)  # Length of one stored bar
+        self.initial_balance = initial_balance
+        self.balance = initial_balance  # Wallet reported to the bot
+        self.leverage = {}
+        self.orders = []
+        self._bars = {}
+        self._order_lock = threading.Lock()
+        for symbol in symbols:
+            rows = store.read(symbol, self.interval, start_ms - warmup_ms, end_ms)
+            if len(rows):
+                self._bars[symbol] = rows
+            else:
+                logger.warning(f"No {self.interval} bars stored for {symbol}, skipping it")
+        self.symbols = sorted(self._bars)
+
+    def now_ms(self):
+        return int(self.clock() * 1000)
+
+    def _visible(self, symbol):
+        """Number of bars of symbol that have closed by now"""
+        bars = self._bars[symbol]
+        return int(np.searchsorted(bars[:, START], self.now_ms() - self.step, 'right'))
+
+    def last_price(self, symbol):
+        """Close of the newest closed bar, or None before the symbol has data"""
+        visible = self._visible(symbol) if symbol in self._bars else 0
+        return float(self._bars[symbol][visible - 1, 4]) if visible else None
+
+    def get_kline(self, category="linear", symbol=None, interval='1', start=None, end=None,
+                  limit=200, **kwargs):
+        """Newest-first klines of symbol aggregated to interval, limited like the exchange"""
+        if symbol not in self._bars:
+            return {'retCode': 10001, 'retMsg': f"Unknown symbol {symbol}", 'result': {}}
+        step = interval_to_ms(interval)
+        if step % self.step:
+            return {'retCode': 10001, 'retMsg': f"Interval {interval} is not a multiple of {self.interval}",
+                    'result': {}}
+        limit = min(int(limit), MAX_KLINE_LIMIT)
+        bars = self._bars[symbol]
+        starts = bars[:, START]
+
+        upper = self._visible(symbol)
+        if end is not None:
+            upper = min(upper, int(np.searchsorted(starts, (int(end) // step + 1) * step, 'left')))
+        if upper == 0:
+            return _ok({'symbol': symbol, 'category': category, 'list': []})
+        first = (int(starts[upper - 1]) // step - (limit - 1)) * step
+        if start is not None:
+            first = max(first, -(-int(start) // step) * step)
+        lower = int(np.searchsorted(starts, first, 'left'))
+        if lower >= upper:
+            return _ok({'symbol': symbol, 'category': category, 'list': []})
+
+        window = bars[lower:upper]
+        buckets = (window[:, START].astype(np.int64) // step) * step
+        heads = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        tails = np.r_[heads[1:], len(window)] - 1
+        klines = np.column_stack((
+            buckets[heads],
+            window[heads, 1],
+            np.maximum.reduceat(window[:, 2], heads),
+            np.minimum.reduceat(window[:, 3], heads),
+            window[tails, 4],
+            np.add.reduceat(window[:, 5], heads),
+            np.add.reduceat(window[:, 6], heads)
+        ))[::-1]
+        rows = [[str(int(k[0]))] + [repr(float(v)) for v in k[1:]] for k in klines]
+        return _ok({'symbol': symbol, 'category': category, 'list': rows})
+
+    def _ticker(self, symbol):
+        visible = self._visible(symbol)
+        if not visible:
+            return None
+        bars = self._bars[symbol]
+        first = int(np.searchsorted(bars[:visible, START], self.now_ms() - DAY_MS, 'left'))
+        day = bars[first:visible]
+        last = float(day[-1, 4])
+        open_24h = float(day[0, 1])
+        return {
+            'symbol': symbol,
+            'lastPrice': repr(last),
+            'prevPrice24h': repr(open_24h),
+            'price24hPcnt': repr(last / open_24h - 1 if open_24h else 0.0),
+            'highPrice24h': repr(float(day[:, 2].max())),
+            'lowPrice24h': repr(float(day[:, 3].min())),
+            'volume24h': repr(float(day[:, 5].sum())),
+            'turnover24h': repr(float(day[:, 6].sum()))
+        }
+
+    def get_tickers(self, category="linear", symbol=None, **kwargs):
+        """24h tickers for one symbol or every symbol with data so far"""
+        symbols = [symbol] if symbol else self.symbols
+        tickers = [self._ticker(s) for s in symbols if s in self._bars]
+        return _ok({'category': category, 'list': [t for t in tickers if t]})
+
+    def place_order(self, category="linear", symbol=None, side=None, orderType="Market", qty=None,
+                    price=None, **kwargs):
+        """Fill a market order at the last price; the result carries the fields save_trade reads"""
+        fill = self.last_price(symbol)
+        if fill is None:
+            return {'retCode': 10001, 'retMsg': f"No price for {symbol}", 'result': {}}
+        with self._order_lock:
+            order = {
+                'orderId': f"replay-{len(self.orders) + 1}-{symbol}",
+                'symbol': symbol,
+                'side': side,
+                'orderType': orderType,
+                'qty': str(qty),
+                'price': fill,
+                'avgPrice': fill,
+                'leverage': kwargs.get('leverage', self.leverage.get(symbol)),
+                'status': 'Filled',
+                'createTime': self.now_ms()
+            }
+            self.orders.append(order)
+        return _ok(order)
+
+    def get_wallet_balance(self, accountType="UNIFIED", coin=None, **kwargs):
+        return _ok({'list': [{'accountType': accountType, 'totalWalletBalance': repr(float(self.balance))}]})
+
+    def set_leverage(self, category="linear", symbol=None, buyLeverage=None, sellLeverage=None, **kwargs):
+        self.leverage[symbol] = buyLeverage
+        return _ok({})
+
+    def __getattr__(self, method):
+        # Anything else the bot calls is a no-op that reports success
+        if method.startswith('_'):
+            raise AttributeError(method)
+
+        def unsupported(**params):
+            logger.debug(f"Simulated exchange ignoring {method}({params})")
+            return _ok({})
+
+        return unsupported
@@ -185,6 +185,48 @@ async function initializeChart() {
     }
 }
 
+// Candle history per symbol/interval/limit, so refreshes only download bars from the newest cached one on
+const candleHistory = {};
+
+// Decode a /chart_data?format=binary payload: uint32 count, int32 times, then float32 open/high/low/close blocks
+function decodeCandles(buffer) {
+    const count = new Uint32Array(buffer, 0, 1)[0];
+    const times = new Int32Array(buffer, 4, count);
+    const columns = [0, 1, 2, 3].map(i => new Float32Array(buffer, 4 + (i + 1) * 4 * count, count));
+    const candles = new Array(count);
+    for (let i = 0; i < count; i++) {
+        candles[i] = {
+            time: times[i],
+            open: columns[0][i],
+            high: columns[1][i],
+            low: columns[2][i],
+            close: columns[3][i]
+        };
+    }
+    return candles;
+}
+
+async function fetchCandles(symbol, interval = '1h', limit = 168) {
+    const key = `${symbol}:${interval}:${limit}`;
+    const cached = candleHistory[key] || [];
+    let url = `/chart_data?symbol=${symbol}&interval=${interval}&limit=${limit}&format=binary`;
+    if (cached.length) {
+        url += `&since=${cached[cached.length - 1].time}`;
+    }
+    
+    const response = await fetch(url);
+    if (!response.ok) {
+        throw new Error(`Server returned ${response.status}: ${response.statusText}`);
+    }
+    const fresh = decodeCandles(await response.arrayBuffer());
+    
+    // Fetched bars replace cached ones from the first fetched open time on (the last cached bar may have moved)
+    const first = fresh.length ? fresh[0].time : Infinity;
+    const candles = cached.filter(candle => candle.time < first).concat(fresh).slice(-limit);
+    candleHistory[key] = candles;
+    return candles;
+}
+
 // Function to load historical price data for the chart
 async function loadChartData() {
     try {
@@ -192,13 +234,10 @@ async function loadChartData() {
         currentSymbol = symbol;
         
         // Get 1-hour candles for the last 7 days (168 hours)
-        const response = await fetch(`/chart_data?symbol=${symbol}&interval=1h&limit=168`);
-        if (!response.ok) throw new Error('Failed to fetch chart data');
-        
-        const data = await response.json();
+        const data = { candles: await fetchCandles(symbol, '1h', 168) };
         console.log('Chart data received:', data);
         
-        if (data && data.candles) {
+        if (data && data.candles.length) {
             candleSeries.setData(data.candles);
             // After setting data, add trade markers
             addTradeMarkersToChart();
@@ -316,17 +355,7 @@ async function fetchCandlestickData() {
         }
         
         console.log(`Fetching chart data for ${currentSymbol}...`);
-        const response = await fetch(`/chart_data?symbol=${currentSymbol}`);
-        
-        if (!response.ok) {
-            throw new Error(`Server returned ${response.status}: ${response.statusText}`);
-        }
-        
-        const data = await response.json();
-        
-        if (!data || typeof data !== 'object') {
-            throw new Error('Invalid data format received from server');
-        }
+        const data = { candles: await fetchCandles(currentSymbol) };
         
         console.log(`Received ${data.candles ? data.candles.length : 0} candles`);
         
@@ -335,12 +364,7 @@ async function fetchCandlestickData() {
             
             try {
                 // Fetch trades to add markers
-                const tradesResponse = await fetch('/trades');
-                if (!tradesResponse.ok) {
-                    throw new Error(`Failed to fetch trades: ${tradesResponse.status}`);
-                }
-                
-                const trades = await tradesResponse.json();
+                const trades = await fetchTrades();
                 if (Array.isArray(trades.active_trades)) {
                     updateTradeMarkers(trades);
                     
@@ -386,10 +410,7 @@ async function addTradeMarkersToChart() {
         closedTradeMarkers = [];
         
         // Get trade data
-        const response = await fetch('/trades');
-        if (!response.ok) throw new Error('Failed to fetch trades');
-        
-        const trades = await response.json();
+        const trades = await fetchTrades();
         console.log('Trade data for markers:', trades);
 
         // Get chart visible time range
@@ -418,7 +439,7 @@ async function addTradeMarkersToChart() {
         (trades.active_trades || []).forEach(trade => {
             try {
                 // Only add markers for currently displayed symbol
-                if (trade[1] === currentSymbol) {
+                if (trade.symbol === currentSymbol) {
                     // Convert timestamp to seconds for chart
                     let timestamp = Math.floor(Date.now() / 1000);
                     
@@ -427,7 +448,7 @@ async function addTradeMarkersToChart() {
                     timestamp = now - Math.floor(Math.random() * 3600); // Random time within the last hour
                     
                     // Log the trade information for debugging
-                    console.log(`Active Trade: ${trade[0]}, ${trade[1]}, ${trade[2]}, ${trade[3]}, ${trade[4]}`);
+                    console.log(`Active Trade: ${trade.id}, ${trade.symbol}, ${trade.side}, ${trade.size}, ${trade.entry_price}`);
                     
                     // Ensure timestamp is valid and within chart range
                     if (isNaN(timestamp)) {
@@ -438,10 +459,10 @@ async function addTradeMarkersToChart() {
                     
                     const marker = {
                         time: timestamp,
-                        position: trade[2] === 'Buy' ? 'belowBar' : 'aboveBar',
-                        color: trade[2] === 'Buy' ? '#26a69a' : '#ef5350',
-                        shape: trade[2] === 'Buy' ? 'arrowUp' : 'arrowDown',
-                        text: `${trade[2]} ${Number(trade[3]).toFixed(3)} @ ${Number(trade[4]).toFixed(1)}`,
+                        position: trade.side === 'Buy' ? 'belowBar' : 'aboveBar',
+                        color: trade.side === 'Buy' ? '#26a69a' : '#ef5350',
+                        shape: trade.side === 'Buy' ? 'arrowUp' : 'arrowDown',
+                        text: `${trade.side} ${Number(trade.size).toFixed(3)} @ ${Number(trade.entry_price).toFixed(1)}`,
                         size: 2
                     };
                     activeTradeMarkers.push(marker);
@@ -456,7 +477,7 @@ async function addTradeMarkersToChart() {
         (trades.closed || []).forEach(trade => {
             try {
                 // Only add markers for currently displayed symbol
-                if (trade[1] === currentSymbol) {
+                if (trade.symbol === currentSymbol) {
                     // Convert timestamp to seconds for chart
                     let timestamp;
                     
@@ -465,7 +486,7 @@ async function addTradeMarkersToChart() {
                     timestamp = rangeStart + Math.floor(Math.random() * visibleRangeWidth * 0.8) + visibleRangeWidth * 0.1;
                     
                     // Log the closed trade information for debugging
-                    console.log(`Closed Trade: ${trade[0]}, ${trade[1]}, ${trade[2]}, ${trade[3]}, ${trade[4]}, PnL: ${trade[6]}`);
+                    console.log(`Closed Trade: ${trade.id}, ${trade.symbol}, ${trade.side}, ${trade.size}, ${trade.entry_price}, PnL: ${trade.pnl}`);
                     
                     // Ensure timestamp is valid
                     if (isNaN(timestamp)) {
@@ -474,13 +495,13 @@ async function addTradeMarkersToChart() {
                     
                     console.log(`Adding closed marker at time ${timestamp} (${new Date(timestamp*1000).toLocaleString()})`);
                     
-                    const pnl = parseFloat(trade[6]) || 0;
+                    const pnl = parseFloat(trade.pnl) || 0;
                     const marker = {
                         time: timestamp,
-                        position: trade[2] === 'Buy' ? 'aboveBar' : 'belowBar', // Opposite of entry for closed trades
+                        position: trade.side === 'Buy' ? 'aboveBar' : 'belowBar', // Opposite of entry for closed trades
                         color: pnl >= 0 ? '#26a69a' : '#ef5350', // Green for profit, red for loss
                         shape: 'circle',
-                        text: `Closed ${trade[2]} ${pnl >= 0 ? '+' : ''}${pnl.toFixed(2)}`,
+                        text: `Closed ${trade.side} ${pnl >= 0 ? '+' : ''}${pnl.toFixed(2)}`,
                         size: 1
                     };
                     closedTradeMarkers.push(marker);
@@ -609,43 +630,7 @@ async function updateBalance() {
         
         const data = await res.json();
         console.log('Balance data received:', data);
-        
-        // Get the balance element
-        const balanceElement = document.getElementById('balance');
-        
-        if (!balanceElement) {
-            console.error('Balance element not found in DOM');
-            return;
-        }
-        
-        if (data.balance !== undefined && data.balance !== null) {
-            // Format the main balance value
-            balanceElement.textContent = `${data.balance.toFixed(2)} USDT`;
-            balanceElement.classList.add('updated');
-            setTimeout(() => balanceElement.classList.remove('updated'), 1000);
-            
-            // Update detailed balance information if we have the elements
-            const baseBalanceElement = document.getElementById('base-balance');
-            const unrealizedPnlElement = document.getElementById('unrealized-pnl');
-            
-            if (baseBalanceElement && data.base_balance !== undefined) {
-                baseBalanceElement.textContent = `${data.base_balance.toFixed(2)} USDT`;
-            }
-            
-            if (unrealizedPnlElement && data.unrealized_pnl !== undefined) {
-                const pnl = data.unrealized_pnl;
-                unrealizedPnlElement.textContent = `${pnl.toFixed(2)} USDT`;
-                unrealizedPnlElement.className = ''; // Clear previous classes
-                if (pnl > 0) {
-                    unrealizedPnlElement.classList.add('profit');
-                } else if (pnl < 0) {
-                    unrealizedPnlElement.classList.add('loss');
-                }
-            }
-        } else if (data.error) {
-            console.error('Balance error:', data.error);
-            balanceElement.textContent = '10000.00 USDT (Testnet)';
-        }
+        renderBalance(data);
     } catch (e) {
         console.error('Error updating balance:', e);
         
@@ -656,6 +641,46 @@ async function updateBalance() {
     }
 }
 
+// Show a balance payload ({balance, base_balance, unrealized_pnl}) from /balance or the live feed
+function renderBalance(data) {
+    // Get the balance element
+    const balanceElement = document.getElementById('balance');
+    
+    if (!balanceElement) {
+        console.error('Balance element not found in DOM');
+        return;
+    }
+    
+    if (data.balance !== undefined && data.balance !== null) {
+        // Format the main balance value
+        balanceElement.textContent = `${data.balance.toFixed(2)} USDT`;
+        balanceElement.classList.add('updated');
+        setTimeout(() => balanceElement.classList.remove('updated'), 1000);
+        
+        // Update detailed balance information if we have the elements
+        const baseBalanceElement = document.getElementById('base-balance');
+        const unrealizedPnlElement = document.getElementById('unrealized-pnl');
+        
+        if (baseBalanceElement && data.base_balance !== undefined) {
+            baseBalanceElement.textContent = `${data.base_balance.toFixed(2)} USDT`;
+        }
+        
+        if (unrealizedPnlElement && data.unrealized_pnl !== undefined) {
+            const pnl = data.unrealized_pnl;
+            unrealizedPnlElement.textContent = `${pnl.toFixed(2)} USDT`;
+            unrealizedPnlElement.className = ''; // Clear previous classes
+            if (pnl > 0) {
+                unrealizedPnlElement.classList.add('profit');
+            } else if (pnl < 0) {
+                unrealizedPnlElement.classList.add('loss');
+            }
+        }
+    } else if (data.error) {
+        console.error('Balance error:', data.error);
+        balanceElement.textContent = '10000.00 USDT (Testnet)';
+    }
+}
+
 // Function to close a trade (defined at global scope to be accessible from HTML)
 window.closeTrade = async function(tradeId) {
     try {
@@ -695,16 +720,28 @@ window.closeTrade = async function(tradeId) {
     }
 }
 
-async function updateTrades() {
-    try {
-        showLoading();
-        
-        const response = await fetch('/trades');
+// Open trades plus the newest closedLimit closed trades, as {active_trades, closed_trades}.
+// /trades is paged, so the dashboard only ever downloads what it shows.
+async function fetchTrades(closedLimit = 20) {
+    const fetchPage = async query => {
+        const response = await fetch(`/trades?${query}`);
         if (!response.ok) {
             throw new Error(`Failed to fetch trades: ${response.status} ${response.statusText}`);
         }
+        return (await response.json()).trades;
+    };
+    const [activeTrades, closedTrades] = await Promise.all([
+        fetchPage('status=open&limit=1000'),
+        closedLimit > 0 ? fetchPage(`status=closed&limit=${closedLimit}`) : Promise.resolve([])
+    ]);
+    return { active_trades: activeTrades, closed_trades: closedTrades };
+}
+
+async function updateTrades() {
+    try {
+        showLoading();
         
-        const trades = await response.json();
+        const trades = await fetchTrades();
         console.log("Trades data received:", trades);
         
         // Validate trades data structure
@@ -727,8 +764,10 @@ async function updateTrades() {
             if (!Array.isArray(trades.active_trades)) {
                 throw new Error('Active trades data is not an array');
             }
-            updateActiveTradesTable('active-trades', trades.active_trades);
-            updateActiveTradesTable('trades-active', trades.active_trades);
+            // One /positions request prices both tables
+            const positions = trades.active_trades.length ? await fetchPositions() : {};
+            updateActiveTradesTable('active-trades', trades.active_trades, positions);
+            updateActiveTradesTable('trades-active', trades.active_trades, positions);
         } catch (activeError) {
             console.error('Error updating active trades tables:', activeError);
             showNotification('Error updating active trades display', 'error');
@@ -769,16 +808,39 @@ async function updateTrades() {
         showNotification(`Failed to update trades: ${error.message}`, 'error');
         
         // Create empty tables if data fetch failed
-        updateActiveTradesTable('active-trades', []);
-        updateActiveTradesTable('trades-active', []);
+        updateActiveTradesTable('active-trades', [], {});
+        updateActiveTradesTable('trades-active', [], {});
         updateClosedTradesTable('closed-trades', []);
         updateClosedTradesTable('trades-closed', []);
     }
 }
 
-async function updateActiveTradesTable(tableId, activeTrades) {
+// Open positions from /positions keyed by trade id ({} if unavailable).
+// The browser revalidates with the ETag, so an unchanged book costs an empty 304.
+async function fetchPositions() {
+    try {
+        const response = await fetch('/positions');
+        if (!response.ok) {
+            throw new Error(`Positions API returned ${response.status}`);
+        }
+        const data = await response.json();
+        const positions = {};
+        (data.positions || []).forEach(position => {
+            positions[position.id] = position;
+        });
+        return positions;
+    } catch (error) {
+        console.error('Error fetching positions:', error);
+        return {};
+    }
+}
+
+async function updateActiveTradesTable(tableId, activeTrades, positions = null) {
     const table = document.getElementById(tableId);
     if (!table) return;
+    if (!positions) {
+        positions = await fetchPositions();
+    }
     
     table.innerHTML = `<thead>
         <tr>
@@ -802,34 +864,12 @@ async function updateActiveTradesTable(tableId, activeTrades) {
     const activeTradePromises = activeTrades.map(async trade => {
         try {
             console.log('Processing active trade:', trade);
-            // Get current price for the trade's symbol
-            const priceResponse = await fetch(`/price?symbol=${trade[1]}`);
-            const priceData = await priceResponse.json();
-            
-            // Calculate PnL
-            let currentPrice = priceData.price || 0;
-            let entryPrice = parseFloat(trade[4]);
-            let size = parseFloat(trade[3]);
-            let pnl = 0;
-            
-            if (trade[2] === 'Buy') {
-                pnl = (currentPrice - entryPrice) * size;
-            } else {
-                pnl = (entryPrice - currentPrice) * size;
-            }
-            
-            // Trade values from database:
-            // 0: id
-            // 1: symbol
-            // 2: side
-            // 3: size
-            // 4: entry_price
-            // 5: exit_price
-            // 6: pnl
-            // 7: status
-            // 8: timestamp
-            // 9: stop_loss
-            // 10: take_profit
+            // Current price and PnL were computed server-side by /positions
+            const position = positions[trade.id] || {};
+            let currentPrice = position.price || 0;
+            let entryPrice = parseFloat(trade.entry_price);
+            let size = parseFloat(trade.size);
+            let pnl = position.pnl || 0;
             
             // Format PnL with color
             const pnlFormatted = pnl >= 0 ? 
@@ -844,7 +884,7 @@ async function updateActiveTradesTable(tableId, activeTrades) {
             
             // Create a new row with clickable elements
             const tradeRow = document.createElement('tr');
-            tradeRow.setAttribute('data-trade-id', trade[0]);
+            tradeRow.setAttribute('data-trade-id', trade.id);
             tradeRow.classList.add('trade-row');
             
             // Make entire row clickable to show the chart for this trade
@@ -855,29 +895,29 @@ async function updateActiveTradesTable(tableId, activeTrades) {
                     return;
                 }
                 
-                window.showTradeOnChart(trade[0], trade[1]);
+                window.showTradeOnChart(trade.id, trade.symbol);
             });
             
             tradeRow.innerHTML = `
-                <td><strong class="clickable" onclick="window.showTradeOnChart('${trade[0]}', '${trade[1]}')">${trade[1]}</strong></td>
-                <td><span class="${trade[2]}">${trade[2]}</span></td>
-                <td>${parseFloat(trade[3]).toFixed(4)}</td>
-                <td>${parseFloat(trade[4]).toFixed(2)}</td>
+                <td><strong class="clickable" onclick="window.showTradeOnChart('${trade.id}', '${trade.symbol}')">${trade.symbol}</strong></td>
+                <td><span class="${trade.side}">${trade.side}</span></td>
+                <td>${parseFloat(trade.size).toFixed(4)}</td>
+                <td>${parseFloat(trade.entry_price).toFixed(2)}</td>
                 <td>${parseFloat(currentPrice).toFixed(2)}</td>
-                <td><input id="sl-${trade[0]}" class="trade-input sl-input" type="number" step="0.01" data-trade-id="${trade[0]}" value="${trade[9] || ''}"></td>
-                <td><input id="tp-${trade[0]}" class="trade-input tp-input" type="number" step="0.01" data-trade-id="${trade[0]}" value="${trade[10] || ''}"></td>
+                <td><input id="sl-${trade.id}" class="trade-input sl-input" type="number" step="0.01" data-trade-id="${trade.id}" value="${trade.stop_loss || ''}"></td>
+                <td><input id="tp-${trade.id}" class="trade-input tp-input" type="number" step="0.01" data-trade-id="${trade.id}" value="${trade.take_profit || ''}"></td>
                 <td>${pnlFormatted} ${pnlPercentFormatted}</td>
                 <td>
-                    <button class="action-button update" onclick="updateTradeSettings('${trade[0]}', document.getElementById('sl-${trade[0]}').value, document.getElementById('tp-${trade[0]}').value)">Update</button>
-                    <button class="action-button close" onclick="closeTrade('${trade[0]}')">Close</button>
-                    <button class="action-button" onclick="window.showTradeOnChart('${trade[0]}', '${trade[1]}')">Chart</button>
+                    <button class="action-button update" onclick="updateTradeSettings('${trade.id}', document.getElementById('sl-${trade.id}').value, document.getElementById('tp-${trade.id}').value)">Update</button>
+                    <button class="action-button close" onclick="closeTrade('${trade.id}')">Close</button>
+                    <button class="action-button" onclick="window.showTradeOnChart('${trade.id}', '${trade.symbol}')">Chart</button>
                 </td>
             `;
             
             tableBody.appendChild(tradeRow);
             return tradeRow;
         } catch (err) {
-            console.error(`Error processing trade ${trade[0]}:`, err);
+            console.error(`Error processing trade ${trade.id}:`, err);
             return null;
         }
     });
@@ -911,8 +951,8 @@ function updateClosedTradesTable(tableId, closedTrades) {
     recentClosedTrades.forEach(trade => {
         try {
             // Parse trade values
-            const pnl = parseFloat(trade[6]);
-            const timestamp = new Date(trade[8]);
+            const pnl = parseFloat(trade.pnl);
+            const timestamp = new Date(trade.timestamp);
             const formattedDate = `${timestamp.toLocaleDateString()} ${timestamp.toLocaleTimeString()}`;
             
             // Create table row
@@ -920,11 +960,11 @@ function updateClosedTradesTable(tableId, closedTrades) {
             row.className = pnl >= 0 ? 'profit' : 'loss';
             
             row.innerHTML = `
-                <td>${trade[1]}</td>
-                <td class="${trade[2]}">${trade[2]}</td>
-                <td>${parseFloat(trade[3]).toFixed(4)}</td>
-                <td>${parseFloat(trade[4]).toFixed(2)}</td>
-                <td>${parseFloat(trade[5]).toFixed(2)}</td>
+                <td>${trade.symbol}</td>
+                <td class="${trade.side}">${trade.side}</td>
+                <td>${parseFloat(trade.size).toFixed(4)}</td>
+                <td>${parseFloat(trade.entry_price).toFixed(2)}</td>
+                <td>${parseFloat(trade.exit_price).toFixed(2)}</td>
                 <td class="${pnl >= 0 ? 'profit' : 'loss'}">${pnl.toFixed(2)}</td>
                 <td>${formattedDate}</td>
             `;
@@ -1066,19 +1106,19 @@ async function updateTradeMarkers(trades) {
                     continue;
                 }
                 
-                const symbol = trade[1];
+                const symbol = trade.symbol;
                 if (!symbol || symbol !== currentSymbol) continue;
                 
                 activeTradeCount++;
-                console.log(`Adding markers for active trade: ${trade[0]} (${symbol})`);
+                console.log(`Adding markers for active trade: ${trade.id} (${symbol})`);
                 
-                const side = trade[2];
-                const entryPrice = parseFloat(trade[4]);
-                const stopLoss = parseFloat(trade[9]);
-                const takeProfit = parseFloat(trade[10]);
+                const side = trade.side;
+                const entryPrice = parseFloat(trade.entry_price);
+                const stopLoss = parseFloat(trade.stop_loss);
+                const takeProfit = parseFloat(trade.take_profit);
                 
                 if (isNaN(entryPrice)) {
-                    console.warn(`Invalid entry price for trade ${trade[0]}: ${trade[4]}`);
+                    console.warn(`Invalid entry price for trade ${trade.id}: ${trade.entry_price}`);
                     continue;
                 }
                 
@@ -1123,7 +1163,7 @@ async function updateTradeMarkers(trades) {
                         activeTradeMarkers.push(tpLine);
                     }
                 } catch (markerErr) {
-                    console.error(`Error creating marker for trade ${trade[0]}:`, markerErr);
+                    console.error(`Error creating marker for trade ${trade.id}:`, markerErr);
                 }
             } catch (tradeErr) {
                 console.error('Error processing active trade:', tradeErr);
@@ -1139,16 +1179,16 @@ async function updateTradeMarkers(trades) {
                     continue;
                 }
                 
-                const symbol = trade[1];
+                const symbol = trade.symbol;
                 if (!symbol || symbol !== currentSymbol) continue;
                 
                 closedTradeCount++;
-                const entryPrice = parseFloat(trade[4]);
-                const exitPrice = parseFloat(trade[5]);
-                const pnl = parseFloat(trade[6]);
+                const entryPrice = parseFloat(trade.entry_price);
+                const exitPrice = parseFloat(trade.exit_price);
+                const pnl = parseFloat(trade.pnl);
                 
                 if (isNaN(exitPrice) || isNaN(pnl)) {
-                    console.warn(`Invalid price/PnL for closed trade ${trade[0]}`);
+                    console.warn(`Invalid price/PnL for closed trade ${trade.id}`);
                     continue;
                 }
                 
@@ -1163,7 +1203,7 @@ async function updateTradeMarkers(trades) {
                     });
                     closedTradeMarkers.push(closedLine);
                 } catch (markerErr) {
-                    console.error(`Error creating closed trade marker for ${trade[0]}:`, markerErr);
+                    console.error(`Error creating closed trade marker for ${trade.id}:`, markerErr);
                 }
             } catch (tradeErr) {
                 console.error('Error processing closed trade:', tradeErr);
@@ -1259,12 +1299,11 @@ window.showTradeOnChart = function(tradeId, symbol) {
 function highlightTradeOnChart(tradeId) {
     try {
         // Find the trade in our active trades
-        fetch('/trades')
-            .then(response => response.json())
+        fetchTrades(0)
             .then(trades => {
                 // Find the trade by ID
                 const activeTrades = trades.active_trades || [];
-                const trade = activeTrades.find(t => t[0] === tradeId);
+                const trade = activeTrades.find(t => t.id === tradeId);
                 
                 if (!trade) {
                     console.log(`Trade ${tradeId} not found or not active`);
@@ -1287,12 +1326,12 @@ function highlightTradeOnChart(tradeId) {
                 }
                 
                 // Extract trade details
-                const symbol = trade[1];
-                const side = trade[2];
-                const size = parseFloat(trade[3]);
-                const entryPrice = parseFloat(trade[4]);
-                const stopLoss = parseFloat(trade[9]) || null;
-                const takeProfit = parseFloat(trade[10]) || null;
+                const symbol = trade.symbol;
+                const side = trade.side;
+                const size = parseFloat(trade.size);
+                const entryPrice = parseFloat(trade.entry_price);
+                const stopLoss = parseFloat(trade.stop_loss) || null;
+                const takeProfit = parseFloat(trade.take_profit) || null;
                 
                 // Color based on side
                 const sideColor = side === 'Buy' ? '#4CAF50' : '#f44336';
@@ -1409,4 +1448,91 @@ function highlightTradeOnChart(tradeId) {
         console.error('Error in highlightTradeOnChart:', error);
         showNotification(`Error: ${error.message}`, 'error');
     }
-}
\ No newline at end of file
+}
+
+// ========== LIVE UPDATES ==========
+// One WebSocket (/ws) replaces dashboard polling: the server pushes a snapshot on
+// connect, then only what changed (balance, prices, position PnL, profit metrics).
+// Trade opens and closes trigger a single full trades refresh.
+let liveSocket = null;
+let liveRetryDelay = 1000;
+let livePositions = {};
+window.liveFeedConnected = false;
+
+function formatLivePnl(position) {
+    const pnl = position.pnl || 0;
+    const pct = position.pnl_pct || 0;
+    return pnl >= 0 ?
+        `<span class="profit">+${pnl.toFixed(2)}</span> <span class="profit">(+${pct.toFixed(2)}%)</span>` :
+        `<span class="loss">${pnl.toFixed(2)}</span> <span class="loss">(${pct.toFixed(2)}%)</span>`;
+}
+
+// Update the Current and P&L cells of rendered active trade rows in place
+function updateLivePositionRows(changed) {
+    Object.entries(changed).forEach(([tradeId, position]) => {
+        document.querySelectorAll(`tr[data-trade-id="${tradeId}"]`).forEach(row => {
+            if (row.cells.length < 8 || position.price === null) return;
+            row.cells[4].textContent = position.price.toFixed(2);
+            row.cells[7].innerHTML = formatLivePnl(position);
+        });
+    });
+}
+
+function applyLiveMessage(message) {
+    const changes = message.set || {};
+    const removed = message.removed || {};
+    let tradesChanged = message.type === 'snapshot';
+    
+    if (message.type === 'snapshot') {
+        livePositions = {};
+    }
+    if (changes.balance) {
+        renderBalance(changes.balance);
+    }
+    if (changes.profits && window.renderProfitMetrics) {
+        window.renderProfitMetrics(changes.profits);
+    }
+    if (changes.positions) {
+        Object.keys(changes.positions).forEach(id => {
+            if (!(id in livePositions)) tradesChanged = true;
+        });
+        Object.assign(livePositions, changes.positions);
+    }
+    if (removed.positions && removed.positions.length) {
+        removed.positions.forEach(id => delete livePositions[id]);
+        tradesChanged = true;
+    }
+    
+    if (tradesChanged) {
+        updateTrades();
+    } else if (changes.positions) {
+        updateLivePositionRows(changes.positions);
+    }
+}
+
+function connectLiveUpdates() {
+    if (!window.WebSocket) return;
+    const protocol = window.location.protocol === 'https:' ? 'wss' : 'ws';
+    liveSocket = new WebSocket(`${protocol}://${window.location.host}/ws`);
+    
+    liveSocket.onopen = () => {
+        console.log('Live updates connected');
+        window.liveFeedConnected = true;
+        liveRetryDelay = 1000;
+    };
+    liveSocket.onmessage = event => {
+        try {
+            applyLiveMessage(JSON.parse(event.data));
+        } catch (error) {
+            console.error('Error applying live update:', error);
+        }
+    };
+    liveSocket.onclose = () => {
+        window.liveFeedConnected = false;
+        console.log(`Live updates disconnected, retrying in ${liveRetryDelay / 1000}s`);
+        setTimeout(connectLiveUpdates, liveRetryDelay);
+        liveRetryDelay = Math.min(liveRetryDelay * 2, 30000);
+    };
+}
+
+connectLiveUpdates();
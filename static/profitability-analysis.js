@@ -50,8 +50,10 @@
         // First-time update
         updateProfitMetrics();
         
-        // Set up a periodic update every 60 seconds
-        setInterval(updateProfitMetrics, 60000);
+        // Periodic update every 60 seconds, only while the live feed (which pushes metrics) is down
+        setInterval(() => {
+            if (!window.liveFeedConnected) updateProfitMetrics();
+        }, 60000);
         
         console.log('Profitability Analysis: Initialization complete');
     }
@@ -61,16 +63,16 @@
         try {
             console.log('Profitability Analysis: Calculating enhanced profit metrics');
             
-            // Fetch closed trades data
-            const response = await fetch('/trades');
+            // Fetch the most recent closed trades, only the columns the analysis reads
+            const response = await fetch('/trades?status=closed&limit=1000&fields=symbol,entry_price,exit_price,pnl,timestamp');
             const data = await response.json();
             
-            if (!data || !data.closed_trades || data.closed_trades.length === 0) {
+            if (!data || !data.trades || data.trades.length === 0) {
                 console.log('Profitability Analysis: No closed trades available for analysis');
                 return;
             }
             
-            const closedTrades = data.closed_trades;
+            const closedTrades = data.trades;
             console.log(`Profitability Analysis: Found ${closedTrades.length} closed trades for analysis`);
             
             // Calculate metrics
@@ -109,10 +111,10 @@
         let runningBalance = 0;
         
         // Process trades in chronological order (trades are typically returned newest first)
-        const sortedTrades = [...trades].sort((a, b) => new Date(a[8]) - new Date(b[8]));
+        const sortedTrades = [...trades].sort((a, b) => new Date(a.timestamp) - new Date(b.timestamp));
         
         sortedTrades.forEach(trade => {
-            const pnl = parseFloat(trade[6]);
+            const pnl = parseFloat(trade.pnl);
             
             // Update running balance
             runningBalance += pnl;
@@ -181,10 +183,10 @@
         const cutoffTime = new Date(now.getTime() - (hoursBack * 60 * 60 * 1000));
         
         // Filter trades within the time period
-        const periodTrades = trades.filter(trade => new Date(trade[8]) >= cutoffTime);
+        const periodTrades = trades.filter(trade => new Date(trade.timestamp) >= cutoffTime);
         
         // Sum the profit/loss
-        return periodTrades.reduce((sum, trade) => sum + parseFloat(trade[6]), 0);
+        return periodTrades.reduce((sum, trade) => sum + parseFloat(trade.pnl), 0);
     }
     
     // Update UI with metrics
@@ -241,8 +243,8 @@
         const symbolGroups = {};
         
         trades.forEach(trade => {
-            const symbol = trade[1];
-            const pnl = parseFloat(trade[6]);
+            const symbol = trade.symbol;
+            const pnl = parseFloat(trade.pnl);
             
             if (!symbolGroups[symbol]) {
                 symbolGroups[symbol] = {
@@ -309,14 +311,14 @@
         
         // Process recent trades first (sort by timestamp)
         const recentTrades = [...trades]
-            .sort((a, b) => new Date(b[8]) - new Date(a[8]))
+            .sort((a, b) => new Date(b.timestamp) - new Date(a.timestamp))
             .slice(0, 50); // Take most recent 50 trades for analysis
         
         recentTrades.forEach(trade => {
-            const symbol = trade[1];
-            const entryPrice = parseFloat(trade[4]);
-            const exitPrice = parseFloat(trade[5]);
-            const timestamp = new Date(trade[8]);
+            const symbol = trade.symbol;
+            const entryPrice = parseFloat(trade.entry_price);
+            const exitPrice = parseFloat(trade.exit_price);
+            const timestamp = new Date(trade.timestamp);
             
             if (!symbolData[symbol]) {
                 symbolData[symbol] = {
@@ -128,53 +128,57 @@ window.updateProfitMetrics = async function() {
         }
         
         const data = await response.json();
-        
-        // Update daily profit
-        const dailyProfitElement = document.getElementById('daily-profit');
-        if (dailyProfitElement && data.daily_profit !== undefined) {
-            const dailyProfit = parseFloat(data.daily_profit);
-            dailyProfitElement.textContent = `${dailyProfit >= 0 ? '+' : ''}${dailyProfit.toFixed(2)} USDT`;
-            dailyProfitElement.className = dailyProfit >= 0 ? 'profit' : 'loss';
-        }
-        
-        // Update weekly profit
-        const weeklyProfitElement = document.getElementById('weekly-profit');
-        if (weeklyProfitElement && data.weekly_profit !== undefined) {
-            const weeklyProfit = parseFloat(data.weekly_profit);
-            weeklyProfitElement.textContent = `${weeklyProfit >= 0 ? '+' : ''}${weeklyProfit.toFixed(2)} USDT`;
-            weeklyProfitElement.className = weeklyProfit >= 0 ? 'profit' : 'loss';
-        }
-        
-        // Update monthly profit
-        const monthlyProfitElement = document.getElementById('monthly-profit');
-        if (monthlyProfitElement && data.monthly_profit !== undefined) {
-            const monthlyProfit = parseFloat(data.monthly_profit);
-            monthlyProfitElement.textContent = `${monthlyProfit >= 0 ? '+' : ''}${monthlyProfit.toFixed(2)} USDT`;
-            monthlyProfitElement.className = monthlyProfit >= 0 ? 'profit' : 'loss';
-        }
-        
-        // Update win rate
-        const winRateElement = document.getElementById('win-rate');
-        if (winRateElement && data.win_rate !== undefined) {
-            winRateElement.textContent = `${(data.win_rate * 100).toFixed(1)}%`;
-        }
-        
-        // Update total trades
-        const totalTradesElement = document.getElementById('total-trades');
-        if (totalTradesElement && data.total_trades !== undefined) {
-            totalTradesElement.textContent = data.total_trades;
-        }
-        
-        // Update average trade
-        const avgTradeElement = document.getElementById('avg-trade');
-        if (avgTradeElement && data.average_profit !== undefined) {
-            const avgProfit = parseFloat(data.average_profit);
-            avgTradeElement.textContent = `${avgProfit >= 0 ? '+' : ''}${avgProfit.toFixed(2)} USDT`;
-            avgTradeElement.className = avgProfit >= 0 ? 'profit' : 'loss';
-        }
+        window.renderProfitMetrics(data);
         
         console.log('Profit metrics updated successfully');
     } catch (error) {
         console.error('Error updating profit metrics:', error);
     }
 };
+
+// Show a /profits payload (also pushed by the live feed)
+window.renderProfitMetrics = function(data) {
+    // Update daily profit
+    const dailyProfitElement = document.getElementById('daily-profit');
+    if (dailyProfitElement && data.daily_profit !== undefined) {
+        const dailyProfit = parseFloat(data.daily_profit);
+        dailyProfitElement.textContent = `${dailyProfit >= 0 ? '+' : ''}${dailyProfit.toFixed(2)} USDT`;
+        dailyProfitElement.className = dailyProfit >= 0 ? 'profit' : 'loss';
+    }
+    
+    // Update weekly profit
+    const weeklyProfitElement = document.getElementById('weekly-profit');
+    if (weeklyProfitElement && data.weekly_profit !== undefined) {
+        const weeklyProfit = parseFloat(data.weekly_profit);
+        weeklyProfitElement.textContent = `${weeklyProfit >= 0 ? '+' : ''}${weeklyProfit.toFixed(2)} USDT`;
+        weeklyProfitElement.className = weeklyProfit >= 0 ? 'profit' : 'loss';
+    }
+    
+    // Update monthly profit
+    const monthlyProfitElement = document.getElementById('monthly-profit');
+    if (monthlyProfitElement && data.monthly_profit !== undefined) {
+        const monthlyProfit = parseFloat(data.monthly_profit);
+        monthlyProfitElement.textContent = `${monthlyProfit >= 0 ? '+' : ''}${monthlyProfit.toFixed(2)} USDT`;
+        monthlyProfitElement.className = monthlyProfit >= 0 ? 'profit' : 'loss';
+    }
+    
+    // Update win rate
+    const winRateElement = document.getElementById('win-rate');
+    if (winRateElement && data.win_rate !== undefined) {
+        winRateElement.textContent = `${(data.win_rate * 100).toFixed(1)}%`;
+    }
+    
+    // Update total trades
+    const totalTradesElement = document.getElementById('total-trades');
+    if (totalTradesElement && data.total_trades !== undefined) {
+        totalTradesElement.textContent = data.total_trades;
+    }
+    
+    // Update average trade
+    const avgTradeElement = document.getElementById('avg-trade');
+    if (avgTradeElement && data.average_profit !== undefined) {
+        const avgProfit = parseFloat(data.average_profit);
+        avgTradeElement.textContent = `${avgProfit >= 0 ? '+' : ''}${avgProfit.toFixed(2)} USDT`;
+        avgTradeElement.className = avgProfit >= 0 ? 'profit' : 'loss';
+    }
+};
@@ -7,6 +7,8 @@ import math
 import json
 import logging
 from risk_manager import RiskManager
+from kline_cache import KlineCache
+from ticker_snapshot import TickerSnapshot
 import talib as ta
 from datetime import datetime, timedelta
 
@@ -18,16 +20,7 @@ logger = logging.getLogger('strategies')
 def avgdev(arr, period):
     arr = np.asarray(arr, dtype=float)
     if len(arr) < period:
-        re    def should_open_position(self, symbol, candles, current_positions):
-        """Determine if we should open a new position"""
-        # Check if we already have maximum positions for this symbol
-        try:
-            symbol_positions = [p for p in current_positions if p['symbol'] == symbol]
-            if len(symbol_positions) >= self.max_positions_per_symbol:
-                return None, 0, None
-        except Exception as e:
-            print(f"Error checking positions: {e}")
-            return None, 0, None.nan
+        return np.full(len(arr), np.nan)
     out = np.full(len(arr), np.nan)
     for i in range(period - 1, len(arr)):
         window = arr[i - period + 1:i + 1]
@@ -49,6 +42,10 @@ class TradingStrategies:
             recv_window=60000  # Increasing recv_window to handle timestamp synchronization issues
         )
         
+        # Shared candle cache
+        self.kline_cache = KlineCache(self.client)
+        self.tickers = TickerSnapshot(self.client)
+        
         # Initialize risk manager
         self.risk_manager = RiskManager()
         
@@ -80,11 +77,13 @@ class TradingStrategies:
             api_secret=api_secret,
             recv_window=60000  # Increasing recv_window to handle timestamp synchronization issues
         )
+        self.kline_cache.client = self.client
+        self.tickers.client = self.client
         logger.info(f"Credentials updated, using {'testnet' if testnet_mode else 'live'} mode")
 
     def get_top_symbols(self, top_n: int = 1) -> List[str]:
         """Get top N symbols by 24h volume (excluding BTC/USDT)"""
-        tickers = self.client.get_tickers(category="linear")['result']['list']
+        tickers = self.tickers.all()
         # Filter out BTCUSDT and sort by 24h turnover (volume)
         filtered = [t for t in tickers if t['symbol'] not in ('BTCUSDT', 'BTCUSD')]
         sorted_tickers = sorted(filtered, key=lambda x: float(x.get('turnover24h', 0)), reverse=True)
@@ -361,20 +360,19 @@ class TradingStrategies:
     def analyze_market_conditions(self, symbol: str) -> dict:
         """Analyze market conditions for trading decisions"""
         try:
-            # Get recent candles
-            candles = self.client.get_kline(
-                category="linear",
-                symbol=symbol,
-                interval="5",  # 5 minute candles
-                limit=200      # Get enough data for analysis
-            )['result']['list']
-            
-            if not candles:
+            # Get recent candles from the shared cache (newest first, as Bybit returns them)
+            candles = self.kline_cache.get(
+                symbol,
+                "5",       # 5 minute candles
+                limit=200  # Get enough data for analysis
+            )[::-1]
+            
+            if not len(candles):
                 return {'tradeable': False, 'reason': 'No data available'}
             
             # Calculate technical indicators
-            closes = [float(c[4]) for c in candles]
-            volumes = [float(c[5]) for c in candles]
+            closes = candles[:, 4]
+            volumes = candles[:, 5]
             
             # Calculate EMAs
             ema_short = self.ema(closes, self.trend_periods['short'])
@@ -4,6 +4,10 @@ import logging
 
 from pybit.unified_trading import HTTP  # Import Bybit client
 from risk_manager import RiskManager
+import indicators
+from indicator_state import IndicatorRegistry
+from kline_cache import KlineCache
+from ticker_snapshot import TickerSnapshot
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -28,88 +32,49 @@ class TradingStrategy:
         # Initialize risk manager
         self.risk_manager = RiskManager()
         
+        # Shared candle cache and streaming indicator state per (symbol, interval)
+        self.kline_cache = KlineCache(getattr(self, 'client', None))
+        self.indicator_states = IndicatorRegistry()
+        
+        # Whole-category ticker snapshot shared by price lookups and symbol ranking
+        self.tickers = TickerSnapshot(getattr(self, 'client', None))
+        
+    def get_top_symbols(self, top_n: int = 1) -> list:
+        """Get top N symbols by 24h turnover (excluding BTC/USDT)"""
+        filtered = [t for t in self.tickers.all() if t['symbol'] not in ('BTCUSDT', 'BTCUSD')]
+        sorted_tickers = sorted(filtered, key=lambda x: float(x.get('turnover24h', 0)), reverse=True)
+        return [t['symbol'] for t in sorted_tickers[:top_n]]
+        
     def calculate_ema(self, prices, period):
         """Calculate Exponential Moving Average"""
-        prices = np.array([float(p) for p in prices])
-        alpha = 2 / (period + 1)
-        ema = [prices[0]]  # Start with first price
-        for price in prices[1:]:
-            ema.append(price * alpha + ema[-1] * (1 - alpha))
-        return np.array(ema)
+        return indicators.ema(prices, period)
 
     def calculate_rsi(self, prices, period=21):  # Increased period for less noise
         """Calculate Relative Strength Index"""
-        prices = np.array([float(p) for p in prices])
-        deltas = np.diff(prices)
-        seed = deltas[:period+1]
-        up = seed[seed >= 0].sum()/period
-        down = -seed[seed < 0].sum()/period
-        rs = up/down if down != 0 else float('inf')
-        rsi = np.zeros_like(prices)
-        rsi[period] = 100. - 100./(1. + rs)
-
-        for i in range(period+1, len(prices)):
-            delta = deltas[i-1]
-            if delta > 0:
-                upval = delta
-                downval = 0.
-            else:
-                upval = 0.
-                downval = -delta
-
-            up = (up*(period-1) + upval)/period
-            down = (down*(period-1) + downval)/period
-            rs = up/down if down != 0 else float('inf')
-            rsi[i] = 100. - 100./(1. + rs)
-
-        return rsi
-
-    def calculate_atr(self, high, low, close, period=21):
-        """Calculate Average True Range"""
-        high = np.array([float(p) for p in high])
-        low = np.array([float(p) for p in low])
-        close = np.array([float(p) for p in close])
-        
-        tr1 = high - low
-        tr2 = abs(high - np.roll(close, 1))
-        tr3 = abs(low - np.roll(close, 1))
-        
-        tr = np.maximum(np.maximum(tr1, tr2), tr3)
-        atr = np.zeros_like(tr)
-        atr[period-1] = np.mean(tr[:period])
-        
-        for i in range(period, len(tr)):
-            atr[i] = (atr[i-1] * (period-1) + tr[i]) / period
-            
-        return atr
+        return indicators.rsi(prices, period)
 
     def calculate_macd(self, prices, fast=12, slow=26, signal=9):
         """Calculate MACD"""
-        fast_ema = self.calculate_ema(prices, fast)
-        slow_ema = self.calculate_ema(prices, slow)
-        macd_line = fast_ema - slow_ema
-        signal_line = self.calculate_ema(macd_line, signal)
-        histogram = macd_line - signal_line
-        return macd_line, signal_line, histogram
+        return indicators.macd(prices, fast, slow, signal)
 
     def analyze_trend(self, candles):
         """Analyze market trend using multiple timeframes and advanced indicators"""
         try:
-            prices = np.array([float(candle['close']) for candle in candles])
-            highs = np.array([float(candle['high']) for candle in candles])
-            lows = np.array([float(candle['low']) for candle in candles])
-            volumes = np.array([float(candle['volume']) for candle in candles])
+            prices = indicators.candle_field(candles, 'close')
+            highs = indicators.candle_field(candles, 'high')
+            lows = indicators.candle_field(candles, 'low')
+            volumes = indicators.candle_field(candles, 'volume')
 
             # Calculate core indicators
             ema20 = self.calculate_ema(prices, 20)
             ema50 = self.calculate_ema(prices, 50)
             ema200 = self.calculate_ema(prices, 200)
             rsi = self.calculate_rsi(prices, period=21)
-            atr = self.calculate_atr(highs, lows, prices, period=21)
+            atr = indicators.atr(highs, lows, prices, period=21)
             macd_line, signal_line, histogram = self.calculate_macd(prices)
 
             # Volume analysis with longer period
-            volume_sma = np.convolve(volumes, np.ones(30)/30, mode='valid')
+            volume_sma = indicators.sma(volumes, 30)
             
             # Calculate price momentum and volatility
             momentum = (prices[-1] - prices[-5]) / prices[-5] * 100
@@ -321,8 +286,8 @@ class TradingStrategy:
     def analyze_market_conditions(self, candles, volume):
         """Enhanced market condition analysis"""
         try:
-            prices = np.array([float(c['close']) for c in candles])
-            volumes = np.array([float(c['volume']) for c in candles])
+            prices = indicators.candle_field(candles, 'close')
+            volumes = indicators.candle_field(candles, 'volume')
             
             # Volume analysis
             avg_volume = np.mean(volumes[-20:])
@@ -335,10 +300,9 @@ class TradingStrategy:
             ema200 = self.calculate_ema(prices, 200)
             
             # Calculate MACD
-            ema12 = self.calculate_ema(prices, 12)
-            ema26 = self.calculate_ema(prices, 26)
-            macd_line = ema12[-1] - ema26[-1]
-            macd_signal = self.calculate_ema(ema12 - ema26, 9)[-1]
+            macd, signal, _ = self.calculate_macd(prices)
+            macd_line = macd[-1]
+            macd_signal = signal[-1]
             
             # Volatility check
             atr = self.calculate_atr(candles[-self.atr_period:])
@@ -402,17 +366,14 @@ class TradingStrategy:
     def calculate_atr(self, candles):
         """Calculate Average True Range for volatility measurement"""
         try:
-            high = np.array([float(c['high']) for c in candles])
-            low = np.array([float(c['low']) for c in candles])
-            close = np.array([float(c['close']) for c in candles[:-1]])
-            
-            tr1 = high[1:] - low[1:]
-            tr2 = abs(high[1:] - close)
-            tr3 = abs(low[1:] - close)
-            
-            tr = np.maximum(np.maximum(tr1, tr2), tr3)
-            atr = np.mean(tr)
-            return atr
+            if candles and isinstance(candles[0], dict):
+                high = indicators.candle_field(candles, 'high')
+                low = indicators.candle_field(candles, 'low')
+                close = indicators.candle_field(candles, 'close')
+            else:
+                ohlcv = indicators.kline_array(candles)
+                high, low, close = ohlcv[:, 2], ohlcv[:, 3], ohlcv[:, 4]
+            return indicators.mean_true_range(high, low, close)
         except Exception as e:
             return 0.0
 
@@ -433,7 +394,7 @@ class TradingStrategy:
             if not is_valid:
                 return False, message
             
-            prices = np.array([float(c['close']) for c in candles])
+            prices = indicators.candle_field(candles, 'close')
             current_price = prices[-1]
             
             # Calculate indicators
@@ -442,10 +403,9 @@ class TradingStrategy:
             rsi = self.calculate_rsi(prices)[-1]
             
             # MACD
-            ema12 = self.calculate_ema(prices, 12)
-            ema26 = self.calculate_ema(prices, 26)
-            macd_line = ema12[-1] - ema26[-1]
-            macd_signal = self.calculate_ema(ema12 - ema26, 9)[-1]
+            macd, signal, _ = self.calculate_macd(prices)
+            macd_line = macd[-1]
+            macd_signal = signal[-1]
             
             # Determine trend
             trend = "bullish" if ema20[-1] > ema50[-1] else "bearish"
@@ -509,30 +469,23 @@ class TradingStrategy:
         """Enhanced profitable strategy with stop loss and take profit calculations"""
         try:
             # Get candle data with increased timeframe for better trend detection
-            data = self.client.get_kline(
-                category="linear",
-                symbol=symbol,
-                interval="30",  # 30-minute candles for stronger trends
-                limit=200       # More historical data for better analysis
-            )['result']['list']
-            
-            # Calculate base indicators
-            ind = self.get_indicators(data)
+            ohlcv = self.kline_cache.get(
+                symbol,
+                "30",      # 30-minute candles for stronger trends
+                limit=200  # More historical data for better analysis
+            )
             
-            # Enhanced trend detection
-            ema9 = self.calculate_ema([float(d[4]) for d in data], 9)
-            ema21 = self.calculate_ema([float(d[4]) for d in data], 21)
-            ema50 = self.calculate_ema([float(d[4]) for d in data], 50)
-            ema200 = self.calculate_ema([float(d[4]) for d in data], 200)
+            # Update streaming indicators with only the bars that changed
+            ind = self.indicator_states.sync(symbol, "30", ohlcv).latest()
+            current_price = ind['close']
             
             # Volume confirmation
-            volume_sma = sum([float(d[5]) for d in data[-20:]]) / 20
-            current_volume = float(data[0][5])
-            volume_surge = current_volume > volume_sma * 1.5
+            current_volume = ind['volume']
+            volume_surge = current_volume > ind['volume_sma'] * 1.5
             
             # Volatility calculation
-            atr = self.calculate_atr(data[-14:])
-            volatility = atr / float(data[0][4]) * 100
+            atr = ind['atr']
+            volatility = atr / current_price * 100
             
             # Initialize decision
             decision = "hold"
@@ -541,25 +494,25 @@ class TradingStrategy:
             
             # Enhanced buy conditions with multiple confirmations
             buy_conditions = [
-                ema9[-1] > ema21[-1],                    # Short-term uptrend
-                ema21[-1] > ema50[-1],                   # Medium-term uptrend
-                ema50[-1] > ema200[-1],                  # Long-term uptrend
+                ind['ema9'] > ind['ema21'],              # Short-term uptrend
+                ind['ema21'] > ind['ema50'],             # Medium-term uptrend
+                ind['ema50'] > ind['ema200'],            # Long-term uptrend
                 ind['rsi'] < 35,                         # Oversold
                 ind['macd_hist'] > ind['macd_hist_prev'] * 1.1,  # MACD momentum increasing
                 volume_surge,                            # Volume confirmation
-                float(data[0][4]) > ema9[-1],           # Price above short MA
+                current_price > ind['ema9'],             # Price above short MA
                 volatility < 3.0                         # Low volatility environment
             ]
             
             # Enhanced sell conditions
             sell_conditions = [
-                ema9[-1] < ema21[-1],                    # Short-term downtrend
-                ema21[-1] < ema50[-1],                   # Medium-term downtrend
-                ema50[-1] < ema200[-1],                  # Long-term downtrend
+                ind['ema9'] < ind['ema21'],              # Short-term downtrend
+                ind['ema21'] < ind['ema50'],             # Medium-term downtrend
+                ind['ema50'] < ind['ema200'],            # Long-term downtrend
                 ind['rsi'] > 70,                         # Overbought
                 ind['macd_hist'] < ind['macd_hist_prev'] * 0.9,  # MACD momentum decreasing
                 volume_surge,                            # Volume confirmation
-                float(data[0][4]) < ema9[-1],           # Price below short MA
+                current_price < ind['ema9'],             # Price below short MA
                 volatility < 3.0                         # Low volatility environment
             ]
             
@@ -572,20 +525,20 @@ class TradingStrategy:
                 decision = "buy"
                 # Tighter stop loss in volatile conditions
                 sl_distance = atr * (1 + (volatility * 0.1))  # Adjust for volatility
-                stop_loss = float(data[0][4]) - sl_distance
-                take_profit = float(data[0][4]) + (sl_distance * 3)  # 3:1 reward:risk
+                stop_loss = current_price - sl_distance
+                take_profit = current_price + (sl_distance * 3)  # 3:1 reward:risk
                 
             elif sell_score >= 7:
                 decision = "sell"
                 sl_distance = atr * (1 + (volatility * 0.1))
-                stop_loss = float(data[0][4]) + sl_distance
-                take_profit = float(data[0][4]) - (sl_distance * 3)
+                stop_loss = current_price + sl_distance
+                take_profit = current_price - (sl_distance * 3)
                 
             return {
                 "decision": decision,
                 "stop_loss": round(stop_loss, 2) if stop_loss else None,
                 "take_profit": round(take_profit, 2) if take_profit else None,
-                "price": float(data[0][4]),
+                "price": current_price,
                 "volume": current_volume,
                 "volatility": volatility
             }
@@ -0,0 +1,60 @@
+"""
+Ticker Snapshot
+One get_tickers call for the whole linear category, cached for a short TTL and
+indexed by symbol, so price lookups for many symbols cost a single round-trip.
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger('ticker_snapshot')
+
+
+class TickerSnapshot:
+    """Shared, periodically refreshed view of every ticker in a category"""
+
+    def __init__(self, client=None, ttl=2.0, category="linear", clock=time.time):
+        self.client = client
+        self.ttl = ttl  # Seconds a snapshot is served before the next refresh
+        self.category = category
+        self.clock = clock  # Replaced by a virtual clock in replays
+        self.fetched_at = 0.0
+        self._tickers = {}
+        self._lock = threading.Lock()
+
+    def _download(self):
+        response = self.client.get_tickers(category=self.category)
+        if response.get('retCode') != 0:
+            raise RuntimeError(f"Ticker request failed: {response.get('retMsg')}")
+        return {t['symbol']: t for t in response.get('result', {}).get('list') or []}
+
+    def refresh(self, force=False):
+        """Return the symbol -> ticker map, downloading it if older than the TTL"""
+        if not force and self.clock() - self.fetched_at < self.ttl:
+            return self._tickers
+        with self._lock:
+            # Another thread may have refreshed while we waited
+            if not force and self.clock() - self.fetched_at < self.ttl:
+                return self._tickers
+            self._tickers = self._download()
+            self.fetched_at = self.clock()
+            return self._tickers
+
+    def get(self, symbol):
+        """Ticker dict for a symbol, or None if the exchange does not list it"""
+        return self.refresh().get(symbol)
+
+    def price(self, symbol):
+        """Last traded price for a symbol, or None"""
+        ticker = self.get(symbol)
+        return float(ticker['lastPrice']) if ticker else None
+
+    def prices(self, symbols):
+        """Last prices for several symbols from one snapshot (missing symbols are omitted)"""
+        tickers = self.refresh()
+        return {s: float(tickers[s]['lastPrice']) for s in symbols if s in tickers}
+
+    def all(self):
+        """Every ticker in the snapshot"""
+        return list(self.refresh().values())